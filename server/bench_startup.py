@@ -0,0 +1,87 @@
+# bench_startup.py
+"""
+Cold-start benchmark for the server entry points.
+
+Every measurement runs in a fresh interpreter, so module caches, the
+connection pool and the hot caches all start cold:
+
+    python bench_startup.py            # import times only
+    python bench_startup.py --db       # also time main.App startup against the database
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent
+
+# Entry points as (label, working directory, module)
+ENTRY_POINTS = [
+    ("main", SERVER_DIR, "main"),
+    ("scheduler", SERVER_DIR, "scheduler"),
+    ("get_data", SERVER_DIR, "get_data"),
+    ("ingest", SERVER_DIR / "db", "ingest"),
+    ("fetch_listings", SERVER_DIR / "db", "fetch_listings"),
+]
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import {module}
+print(time.perf_counter() - t)
+"""
+
+READY_SNIPPET = """
+import asyncio, json, time
+t = time.perf_counter()
+import main
+imported = time.perf_counter() - t
+
+async def run():
+    app = main.App(main.AsyncPostgresConnector(min_size=2))
+    await app.start()
+    await app.stop()
+    return app.startup_seconds
+
+warm = asyncio.run(run())
+print(json.dumps({"import": imported, "warmup": warm, "total": time.perf_counter() - t}))
+"""
+
+
+def _run(snippet: str, cwd: Path) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet], cwd=cwd, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def _summary(samples: list[float]) -> str:
+    return f"median {statistics.median(samples) * 1000:7.1f} ms   min {min(samples) * 1000:7.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the server entry points")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--db", action="store_true", help="also measure App warm-up against the database")
+    args = parser.parse_args()
+
+    print(f"Module import time in a fresh interpreter, {args.runs} runs each")
+    for label, cwd, module in ENTRY_POINTS:
+        try:
+            samples = [float(_run(IMPORT_SNIPPET.format(module=module), cwd)) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"  {label:<16}import failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"  {label:<16}{_summary(samples)}")
+
+    if args.db:
+        print("main.App cold start (import + pool + hot caches until ready)")
+        runs = [json.loads(_run(READY_SNIPPET, SERVER_DIR)) for _ in range(args.runs)]
+        for key in ("import", "warmup", "total"):
+            print(f"  {key:<16}{_summary([r[key] for r in runs])}")
+
+
+if __name__ == "__main__":
+    main()
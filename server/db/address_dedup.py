@@ -0,0 +1,302 @@
+# address_dedup.py
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# USPS Publication 28 abbreviations for the suffixes and directionals seen in the listings feed
+STREET_SUFFIXES = {
+    "STREET": "ST", "STR": "ST", "AVENUE": "AVE", "AV": "AVE", "BOULEVARD": "BLVD",
+    "DRIVE": "DR", "ROAD": "RD", "LANE": "LN", "COURT": "CT", "CIRCLE": "CIR",
+    "PLACE": "PL", "TERRACE": "TER", "PARKWAY": "PKWY", "HIGHWAY": "HWY",
+    "TRAIL": "TRL", "SQUARE": "SQ", "PLAZA": "PLZ", "CROSSING": "XING",
+    "EXPRESSWAY": "EXPY", "FREEWAY": "FWY", "POINT": "PT", "MOUNT": "MT",
+}
+DIRECTIONALS = {
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW",
+}
+ABBREVIATIONS = {**STREET_SUFFIXES, **DIRECTIONALS}
+
+_WORD_RE = re.compile(r"\b(" + "|".join(sorted(ABBREVIATIONS, key=len, reverse=True)) + r")\b")
+_UNIT_RE = re.compile(r"(?:\b(?:APARTMENT|APT|UNIT|SUITE|STE|NO)\b\.?|#)\s*#?\s*([A-Z0-9-]+)")
+
+# A normalized address split into house number, directionals, street-name core,
+# suffix and unit. Only the core is ever compared fuzzily.
+_DIRECTIONAL = "|".join(sorted(set(DIRECTIONALS.values()), key=len, reverse=True))
+_SUFFIX = "|".join(sorted(set(STREET_SUFFIXES.values()), key=len, reverse=True))
+_PARTS_RE = (
+    r"^(?P<house>\d+[A-Z]?)?\s*"
+    rf"(?:(?P<pre>{_DIRECTIONAL})\s+)?"
+    r"(?P<core>.+?)"
+    rf"(?:\s+(?P<suffix>{_SUFFIX}))?"
+    rf"(?:\s+(?P<post>{_DIRECTIONAL}))?"
+    r"(?:\s+UNIT\s+(?P<unit>\S+))?$"
+)
+_UNIT_SUFFIX_RE = r"\sUNIT\s+(\S+)$"
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# Blocking keys for fuzzy matching: everything but the street-name core must agree exactly
+BLOCK_COLUMNS = ["zip", "house", "unit", "pre", "suffix", "post"]
+
+SIMILARITY_THRESHOLD = 0.9
+PARALLEL_MIN_BLOCKS = 2000    # below this, worker startup costs more than it saves
+BLOCKS_PER_TASK = 500
+
+
+def normalize_addresses(addresses: pd.Series) -> pd.Series:
+    """
+    Canonicalize street addresses with vectorized string operations.
+
+    Uppercases, strips punctuation, rewrites unit designators ("Apt 4", "#4",
+    "Suite 4") to "UNIT 4", abbreviates suffixes and directionals, and
+    collapses whitespace, so "123 Main Street, Apt. 4" and "123 MAIN ST #4"
+    both become "123 MAIN ST UNIT 4".
+    """
+    s = addresses.fillna("").astype(str).str.upper()
+    s = s.str.replace(r"[.,;]", " ", regex=True)
+    s = s.str.replace(_UNIT_RE, r" UNIT \1", regex=True)
+    s = s.str.replace(_WORD_RE, lambda m: ABBREVIATIONS[m.group(1)], regex=True)
+    return s.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def normalize_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of `df` with address, city, state and zip canonicalized."""
+    out = df.copy()
+    out["address"] = normalize_addresses(out["address"])
+    out["city"] = out["city"].fillna("").astype(str).str.upper().str.replace(r"\s+", " ", regex=True).str.strip()
+    out["state"] = out["state"].fillna("").astype(str).str.upper().str.strip()
+    zips = out["zip"].fillna("").astype(str).str.strip()
+    out["zip"] = zips.str.extract(r"^(\d{5})", expand=False).fillna(zips)
+    return out
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = np.arange(n)
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+    def roots(self) -> np.ndarray:
+        """Root of every element, resolved with vectorized pointer jumping."""
+        parent = self.parent
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                return parent
+            parent = jumped
+
+
+def _match_block(cores: list[str]) -> list[tuple[int, int]]:
+    """Pairs of positions within one block whose street-name cores are similar enough to merge."""
+    # Numbered streets ("121ST" / "122ND") are different streets however similar they look
+    digits = [_NON_DIGIT_RE.sub("", core) for core in cores]
+    pairs = []
+    for i in range(len(cores)):
+        for j in range(i + 1, len(cores)):
+            if digits[i] == digits[j] and SequenceMatcher(None, cores[i], cores[j]).ratio() >= SIMILARITY_THRESHOLD:
+                pairs.append((i, j))
+    return pairs
+
+
+def _match_blocks(blocks: list[list[str]]) -> list[list[tuple[int, int]]]:
+    return [_match_block(block) for block in blocks]
+
+
+def cluster_listings(df: pd.DataFrame, workers: int | None = None) -> np.ndarray:
+    """
+    Assign every listing a cluster id so that rows for the same property share one.
+
+    Rows are merged when they have the same normalized address in the same zip,
+    the same non-empty parcel and unit in the same zip, or near-identical street
+    names with everything else equal: zip, house number, unit, directionals and
+    suffix. "123 MAIN ST" therefore never merges with "123 MAIN CT",
+    "123 N MAIN ST" or "123 MAIN ST UNIT 2". Fuzzy comparison only runs inside
+    those small blocks, over distinct street-name cores, so the work stays
+    close to linear in the number of rows. Large inputs spread the blocks
+    across a process pool.
+
+    Args:
+        df: Listings with address, zip and parcel columns; addresses should already be normalized
+        workers: Process count for fuzzy matching (None lets the executor decide)
+
+    Returns:
+        Array of cluster ids, the lowest row position in each cluster
+    """
+    n = len(df)
+    uf = _UnionFind(n)
+    positions = np.arange(n)
+
+    def union_groups(keys: list[pd.Series], mask: np.ndarray) -> None:
+        codes = pd.MultiIndex.from_arrays([k[mask] for k in keys]).factorize()[0]
+        sub = positions[mask]
+        first = pd.Series(sub).groupby(codes).transform("min").to_numpy()
+        for i, f in zip(sub[first != sub], first[first != sub]):
+            uf.union(i, f)
+
+    zips = df["zip"].astype(str)
+    addresses = df["address"].astype(str)
+    union_groups([zips, addresses], np.ones(n, dtype=bool))
+
+    # A parcel can be a whole building, so units on it stay apart
+    parcels = df["parcel"].fillna("").astype(str).str.strip()
+    units = addresses.str.extract(_UNIT_SUFFIX_RE, expand=False).fillna("")
+    union_groups([zips, parcels, units], (parcels != "").to_numpy())
+
+    parts = addresses.str.extract(_PARTS_RE)
+    parts["zip"] = zips.to_numpy()
+    parts["pos"] = positions
+    parts = parts.dropna(subset=["house"]).fillna({c: "" for c in ["pre", "suffix", "post", "unit"]})
+
+    # One entry per distinct core within each block; pos keeps a representative row
+    distinct = parts.drop_duplicates(BLOCK_COLUMNS + ["core"])
+    sizes = distinct.groupby(BLOCK_COLUMNS)["core"].transform("size")
+    distinct = distinct[sizes > 1]
+    if distinct.empty:
+        return uf.roots()
+
+    # Sort so each block is a contiguous run, then slice instead of iterating a groupby
+    distinct = distinct.sort_values(BLOCK_COLUMNS, kind="stable")
+    codes = distinct.groupby(BLOCK_COLUMNS, sort=False).ngroup().to_numpy()
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    block_streets = [a.tolist() for a in np.split(distinct["core"].to_numpy(), bounds)]
+    block_positions = np.split(distinct["pos"].to_numpy(), bounds)
+
+    if len(block_streets) >= PARALLEL_MIN_BLOCKS:
+        chunks = [block_streets[i:i + BLOCKS_PER_TASK] for i in range(0, len(block_streets), BLOCKS_PER_TASK)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [pairs for chunk in pool.map(_match_blocks, chunks) for pairs in chunk]
+    else:
+        results = _match_blocks(block_streets)
+
+    for pos, pairs in zip(block_positions, results):
+        for i, j in pairs:
+            uf.union(pos[i], pos[j])
+
+    # Rows sharing a representative's core share its whole address, so the exact pass joined them
+    return uf.roots()
+
+
+def cluster_survivors(normalized: pd.DataFrame, clusters: np.ndarray) -> np.ndarray:
+    """
+    Position of the row that represents each row's cluster.
+
+    The row with the latest last_change wins; position (file or id order)
+    breaks ties in favour of the later row.
+    """
+    order = pd.DataFrame({
+        "cluster": clusters,
+        "last_change": pd.to_datetime(normalized["last_change"], errors="coerce"),
+        "pos": np.arange(len(normalized)),
+    }).sort_values(["cluster", "last_change", "pos"], na_position="first")
+    winners = order.drop_duplicates("cluster", keep="last").set_index("cluster")["pos"]
+    return winners.reindex(clusters).to_numpy()
+
+
+def dedupe_listings(df: pd.DataFrame, workers: int | None = None) -> pd.DataFrame:
+    """
+    Normalize listing keys and collapse rows that describe the same property.
+
+    Within each cluster the row with the latest last_change wins (file order
+    breaks ties), and it keeps its own normalized address as the canonical key.
+
+    Args:
+        df: Listings with the property_listings columns
+        workers: Process count for fuzzy matching
+
+    Returns:
+        One row per property, in original order
+    """
+    if df.empty:
+        return df
+
+    normalized = normalize_keys(df).reset_index(drop=True)
+    keep = np.unique(cluster_survivors(normalized, cluster_listings(normalized, workers)))
+
+    dropped = len(normalized) - len(keep)
+    if dropped:
+        logger.info(f"Collapsed {dropped} duplicate listings into {len(keep)} properties")
+    return normalized.iloc[keep]
+
+
+
+class StoredKeys:
+    """
+    Canonical keys of the listings already stored, for matching new batches against.
+
+    Keys are kept as a list of frames (the stored table, then each batch's new
+    listings) and only the rows in a batch's zips are pulled out for
+    clustering, since no rule merges across zips.
+    """
+
+    COLUMNS = ["address", "city", "state", "zip", "parcel"]
+
+    def __init__(self, stored: pd.DataFrame):
+        self._frames = [stored[self.COLUMNS].reset_index(drop=True)]
+
+    def __len__(self) -> int:
+        return sum(len(f) for f in self._frames)
+
+    def candidates(self, zips: pd.Series) -> pd.DataFrame:
+        """Stored keys in any of `zips`."""
+        wanted = pd.unique(zips.astype(str))
+        parts = [f[f["zip"].isin(wanted)] for f in self._frames]
+        return pd.concat(parts, ignore_index=True)
+
+    def add(self, keys: pd.DataFrame) -> None:
+        """Record keys that were just inserted so later batches match them."""
+        if not keys.empty:
+            self._frames.append(keys[self.COLUMNS].reset_index(drop=True))
+
+
+def match_stored(batch: pd.DataFrame, stored: StoredKeys, workers: int | None = None) -> pd.DataFrame:
+    """
+    Give every row of a deduplicated batch that matches a stored listing that listing's key.
+
+    The batch is clustered together with the stored keys in its zips using
+    the same rules as cluster_listings. Stored rows come first, so a cluster
+    whose lowest position is a stored row is an existing listing, and the
+    merge updates it instead of inserting a near-duplicate. Unmatched rows
+    keep their own canonical key and are added to `stored`.
+
+    Args:
+        batch: Output of dedupe_listings
+        stored: Keys already in the table; updated in place
+        workers: Process count for fuzzy matching
+
+    Returns:
+        The batch with key columns rewritten where a stored listing matched
+    """
+    if batch.empty:
+        return batch
+    known = stored.candidates(batch["zip"])
+    out = batch.reset_index(drop=True)
+
+    if not known.empty:
+        combined = pd.concat([known, out[StoredKeys.COLUMNS]], ignore_index=True)
+        roots = cluster_listings(combined, workers)[len(known):]
+        matched = roots < len(known)
+        if matched.any():
+            out = out.copy()
+            key_columns = StoredKeys.COLUMNS[:-1]
+            out.loc[matched, key_columns] = known.iloc[roots[matched]][key_columns].to_numpy()
+            logger.info(f"Matched {int(matched.sum())} listings to stored keys")
+        stored.add(out[~matched])
+    else:
+        stored.add(out)
+    return out
@@ -0,0 +1,29 @@
+# backfill_listing_keys.py
+"""
+One-off migration: canonicalize listing keys stored before address normalization.
+
+Run once before the first normalized listings load; regular loads only read
+the stored keys. Safe to re-run: a canonical table is left unchanged.
+
+    python backfill_listing_keys.py
+"""
+import asyncio
+import logging
+
+from postgres_connector import AsyncPostgresConnector
+from listings_merge import backfill_stored_keys
+
+
+async def main():
+    connector = AsyncPostgresConnector()
+    await connector.connect()
+    try:
+        renamed, merged = await backfill_stored_keys(connector)
+        print(f"Backfilled listing keys: {renamed} renamed, {merged} merged")
+    finally:
+        await connector.disconnect()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
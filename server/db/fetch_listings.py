@@ -0,0 +1,205 @@
+# fetch_listings.py
+import asyncio
+import logging
+import random
+from pathlib import Path
+from urllib.parse import urlparse
+
+import httpx
+import lxml.html
+
+from postgres_connector import AsyncPostgresConnector
+
+logger = logging.getLogger(__name__)
+
+LISTINGS_INDEX_URLS = [
+    "https://www.realestatedataset.com/download/us/for-sale/",
+]
+DOWNLOAD_DIR = Path("./downloads")
+DATA_EXTENSIONS = (".csv", ".tsv")
+
+MAX_CONCURRENCY = 8       # simultaneous downloads, also the connection pool size
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5        # seconds, doubled on every retry
+STREAM_CHUNK_SIZE = 1 << 20
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class RetryableStatus(Exception):
+    """Server answered with a status worth retrying (throttling or 5xx)."""
+
+
+def extract_download_links(html: str, base_url: str) -> list[str]:
+    """
+    Find every data-file link on a listings index page.
+
+    Args:
+        html: Page markup
+        base_url: URL the page was fetched from, used to resolve relative links
+
+    Returns:
+        Absolute download URLs in page order, without duplicates
+    """
+    tree = lxml.html.fromstring(html)
+    tree.make_links_absolute(base_url)
+
+    links = {}
+    for href in tree.xpath("//a/@href"):
+        if urlparse(href).path.lower().endswith(DATA_EXTENSIONS):
+            links[href] = None
+    return list(links)
+
+
+async def _with_retry(operation, url: str):
+    """Run `operation()` retrying transport errors and retryable statuses with jittered backoff."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return await operation()
+        except (httpx.TransportError, RetryableStatus) as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = BACKOFF_BASE * 2 ** attempt * (1 + random.random())
+            logger.warning(f"{url} failed ({e!r}), retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def _check_status(response: httpx.Response) -> None:
+    if response.status_code in RETRYABLE_STATUS:
+        raise RetryableStatus(f"HTTP {response.status_code}")
+    response.raise_for_status()
+
+
+async def fetch_index(client: httpx.AsyncClient, url: str) -> list[str]:
+    """Fetch one index page and return the data-file links on it."""
+    async def get():
+        response = await client.get(url)
+        _check_status(response)
+        return response
+
+    response = await _with_retry(get, url)
+    return extract_download_links(response.text, str(response.url))
+
+
+async def download_file(
+    client: httpx.AsyncClient,
+    url: str,
+    dest_dir: Path,
+    semaphore: asyncio.Semaphore,
+) -> Path:
+    """
+    Stream one file to disk.
+
+    The body is written to a `.part` file in chunks and renamed only once it is
+    complete, so a partial download is never mistaken for a finished one.
+
+    Args:
+        client: Shared HTTP client
+        url: File to download
+        dest_dir: Directory to write into
+        semaphore: Bounds the number of concurrent downloads
+
+    Returns:
+        Path of the downloaded file
+    """
+    dest = dest_dir / Path(urlparse(url).path).name
+    part = dest.with_name(dest.name + ".part")
+
+    async def stream():
+        async with client.stream("GET", url) as response:
+            _check_status(response)
+            with open(part, "wb") as f:
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+
+    async with semaphore:
+        await _with_retry(stream, url)
+    part.replace(dest)
+    logger.info(f"Downloaded {dest}")
+    return dest
+
+
+async def fetch_listing_files(
+    index_urls: list[str] = LISTINGS_INDEX_URLS,
+    dest_dir: Path = DOWNLOAD_DIR,
+    concurrency: int = MAX_CONCURRENCY,
+    on_downloaded=None,
+) -> list[Path]:
+    """
+    Download every listings file linked from the index pages concurrently.
+
+    Downloads run in a TaskGroup: if one fails for good, the others are
+    cancelled and awaited before the HTTP client closes, and the error is
+    raised (inside an ExceptionGroup).
+
+    Args:
+        index_urls: Index pages (per state or per page) to scan for links
+        dest_dir: Directory to write files into
+        concurrency: Maximum simultaneous downloads
+        on_downloaded: Optional async callback awaited with each file's path as it completes
+
+    Returns:
+        Paths of all downloaded files, in completion order
+    """
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60, follow_redirects=True) as client:
+        pages = await asyncio.gather(*(fetch_index(client, url) for url in index_urls))
+        links = list(dict.fromkeys(link for page in pages for link in page))
+        if not links:
+            raise ValueError("No listings download links found")
+        logger.info(f"Found {len(links)} listings files")
+
+        paths = []
+
+        async def fetch(url: str) -> None:
+            path = await download_file(client, url, dest_dir, semaphore)
+            paths.append(path)
+            if on_downloaded is not None:
+                await on_downloaded(path)
+
+        async with asyncio.TaskGroup() as tg:
+            for url in links:
+                tg.create_task(fetch(url))
+    return paths
+
+
+async def main():
+    # The loaders are pandas/pyarrow based; importing them here keeps `import fetch_listings`
+    # light for callers that only need the download helpers (the scheduler's fingerprint)
+    from get_individual_listings import load_tsv
+    from listings_merge import load_stored_keys
+    from sampling import refresh_sample
+    from snapshots import archive_delimited
+
+    connector = AsyncPostgresConnector()
+    await connector.connect()
+
+    # Load on a single consumer so downloads keep the pipe full while earlier files are inserted
+    queue: asyncio.Queue[Path | None] = asyncio.Queue()
+
+    try:
+        stored = await load_stored_keys(connector)
+
+        async def loader():
+            while (path := await queue.get()) is not None:
+                await asyncio.to_thread(archive_delimited, path)
+                await load_tsv(connector, str(path), stored)
+
+        try:
+            # A failure on either side cancels the other, so neither outlives the run
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(loader())
+                await fetch_listing_files(on_downloaded=queue.put)
+                await queue.put(None)
+        finally:
+            # Even a partial load changed property_listings, so the sample follows it
+            await refresh_sample(connector)
+    finally:
+        await connector.disconnect()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
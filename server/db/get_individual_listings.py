@@ -1,88 +1,75 @@
 # get_individual_listings.py
 import asyncio
-import csv
+import logging
+import pandas as pd
 from postgres_connector import AsyncPostgresConnector
-from psycopg import sql
-from datetime import datetime
+from listings_merge import LISTING_COLUMNS, TABLE_NAME, load_stored_keys, merge_listings
+from address_dedup import StoredKeys, dedupe_listings, match_stored
+from sampling import refresh_sample
+from validation import LISTINGS_SCHEMA, frame_to_rows, quarantine_rows, validate_frame
 
 TSV_FILE = "./realestateUS.tsv"
-TABLE_NAME = "property_listings"
 CHUNK_SIZE = 10000
 
-# Postgres table column names
-COLUMNS = [
-    "address", "city", "state", "zip", "sqft", "beds", "baths",
-    "built_year", "property_type", "status", "price", "agent",
-    "broker", "lat", "lon", "parcel", "last_change"
-]
+# Postgres table column names, in the order rows are built below
+COLUMNS = LISTING_COLUMNS
 
-async def insert_batch(connector, batch):
-    """Insert a batch of rows safely using ON CONFLICT to avoid duplicates."""
-    columns_sql = sql.SQL(", ").join(sql.Identifier(c) for c in COLUMNS)
-    values_sql = sql.SQL(", ").join(sql.Placeholder() * len(COLUMNS))
-    
-    query = sql.SQL("""
-        INSERT INTO {table} ({columns})
-        VALUES ({values})
-        ON CONFLICT (address, city, state, zip) DO NOTHING
-    """).format(
-        table=sql.Identifier(TABLE_NAME),
-        columns=columns_sql,
-        values=values_sql
+# TSV headers that differ from the table's column names
+TSV_COLUMN_MAP = {"built": "built_year", "type": "property_type"}
+
+async def insert_batch(
+    connector,
+    batch: pd.DataFrame,
+    stored: StoredKeys | None = None,
+):
+    """Merge a validated batch, updating changed listings and recording their history instead of dropping them."""
+    # Canonical addresses keep "123 Main Street" and "123 MAIN ST" on one key,
+    # and matching against stored keys catches duplicates from earlier batches and runs
+    deduped = dedupe_listings(batch)
+    if stored is not None:
+        deduped = match_stored(deduped, stored)
+    await merge_listings(connector, frame_to_rows(deduped, COLUMNS))
+
+async def load_tsv(
+    connector,
+    tsv_file: str = TSV_FILE,
+    stored: StoredKeys | None = None,
+):
+    """
+    Load one listings TSV (or CSV export) into Postgres in CHUNK_SIZE batches.
+
+    Pass the same `stored` keys to every file of a run; without them the
+    stored keys are loaded here.
+    """
+    if stored is None:
+        stored = await load_stored_keys(connector)
+    delimiter = "," if tsv_file.lower().endswith(".csv") else "\t"
+    chunks = pd.read_csv(
+        tsv_file, sep=delimiter, dtype=str, keep_default_na=False,
+        chunksize=CHUNK_SIZE, encoding="utf-8",
     )
-    
-    await connector.execute_many(query, batch)
+    total = rejected = 0
+    for chunk in chunks:
+        # Whole-chunk type/range checks; bad rows go to quarantine instead of failing the load
+        valid, rejects = validate_frame(chunk.rename(columns=TSV_COLUMN_MAP), LISTINGS_SCHEMA)
+        if not rejects.empty:
+            rejected += await quarantine_rows(connector, TABLE_NAME, rejects)
+        if not valid.empty:
+            await insert_batch(connector, valid, stored)
+        total += len(chunk)
+        print(f"Inserted {total} rows")
+    print(f"Inserted total {total} rows from {tsv_file} ({rejected} quarantined)")
 
-async def load_tsv_to_postgres():
+async def load_tsv_to_postgres(tsv_file: str = TSV_FILE):
     connector = AsyncPostgresConnector()
     await connector.connect()
     
     try:
-        with open(TSV_FILE, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f, delimiter="\t")
-            batch = []
-            for i, row in enumerate(reader, 1):
-                # Convert values, handling empty strings
-                last_change = None
-                if row.get("last_change"):
-                    try:
-                        last_change = datetime.strptime(row["last_change"], "%Y-%m-%d").date()
-                    except ValueError:
-                        last_change = None  # invalid dates become NULL
-                
-                batch.append((
-                    row["address"],
-                    row["city"],
-                    row["state"],
-                    row["zip"],
-                    int(row["sqft"]) if row.get("sqft") else None,
-                    int(row["beds"]) if row.get("beds") else None,
-                    int(row["baths"]) if row.get("baths") else None,
-                    int(row["built"]) if row.get("built") else None,
-                    row["type"],
-                    row["status"],
-                    float(row["price"]) if row.get("price") else None,
-                    row["agent"],
-                    row["broker"],
-                    float(row["lat"]) if row.get("lat") else None,
-                    float(row["lon"]) if row.get("lon") else None,
-                    row["parcel"],
-                    last_change
-                ))
-                
-                # Insert in chunks
-                if i % CHUNK_SIZE == 0:
-                    await insert_batch(connector, batch)
-                    print(f"Inserted {i} rows")
-                    batch.clear()
-            
-            # Insert remaining rows
-            if batch:
-                await insert_batch(connector, batch)
-                print(f"Inserted total {i} rows")
-    
+        await load_tsv(connector, tsv_file)
+        await refresh_sample(connector)
     finally:
         await connector.disconnect()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(load_tsv_to_postgres())
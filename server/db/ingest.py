@@ -1,128 +1,103 @@
 # async_ingest.py
-import csv
 import asyncio
 import logging
-from io import StringIO
-import requests
 
+from metro import prepare_metro_rows
 from postgres_connector import AsyncPostgresConnector
-from psycopg import sql
+from partitions import reload_metro
+from regions import REGION_INSERT_SQL, prepare_region_rows
+from series import SeriesTable
+from payload_cache import build_payloads, publish_payloads
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 ZILLOW_URL = (
     "https://files.zillowstatic.com/research/public_csvs/"
     "zhvi/Metro_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv"
 )
+ZILLOW_FILE = ZILLOW_URL.rsplit("/", 1)[1]
 
-REGION_INSERT_SQL = """
-INSERT INTO regions (region_id, region_name, state_name)
-VALUES (%s, %s, %s)
-ON CONFLICT (region_id) DO NOTHING;
-"""
+# Month-over-month ZHVI moves beyond this many standard deviations get flagged
+OUTLIER_SIGMA = 6.0
 
-METRO_COPY_COLUMNS = ["region_id", "size_rank", "date", "avg_cost"]
 
+def fetch_raw_data() -> bytes:
+    """Download the Zillow CSV exactly as served."""
+    import requests
 
-def fetch_raw_data() -> list[dict]:
-    """Fetch Zillow CSV and convert wide format to long format."""
     logger.info("Fetching Zillow data...")
     resp = requests.get(ZILLOW_URL)
     resp.raise_for_status()  # make sure HTTP errors raise exceptions
+    return resp.content
 
-    reader = csv.DictReader(StringIO(resp.text))
-    rows = []
-
-    for row in reader:
-        region_id = int(row["RegionID"])
-        region_name = row["RegionName"]
-        state_name = row["StateName"]
-        size_rank = int(row["SizeRank"])
-
-        # Loop over all monthly columns (skip metadata)
-        for date_str, avg_cost_str in row.items():
-            if date_str in ("RegionID", "RegionName", "RegionType", "StateName", "SizeRank"):
-                continue
-            try:
-                avg_cost = float(avg_cost_str) if avg_cost_str else None
-                rows.append({
-                    "region_id": region_id,
-                    "region_name": region_name,
-                    "state_name": state_name,
-                    "size_rank": size_rank,
-                    "date": date_str,  # YYYY-MM-DD format from CSV
-                    "avg_cost": avg_cost
-                })
-            except ValueError as e:
-                logger.warning(f"Skipping cell {date_str} for region {region_name}: {e}")
-
-    logger.info(f"Fetched {len(rows)} rows")
-    return rows
-
-
-
-def prepare_metro_rows(raw_rows: list[dict]) -> list[tuple]:
-    """Prepare metro_us rows for COPY ingestion."""
-    return [
-        (
-            r["region_id"],
-            r["size_rank"],
-            r["date"],
-            r["avg_cost"]
-        )
-        for r in raw_rows
-    ]
-def prepare_region_rows(raw_rows: list[dict]) -> list[tuple]:
-    """
-    Deduplicate regions and prepare tuples for insertion into the `regions` table.
-
-    Each tuple is: (region_id, region_name, state_name)
-    """
-    regions = {}
-    for r in raw_rows:
-        # Keep only one entry per region_id
-        regions[r["region_id"]] = (
-            r["region_id"],
-            r["region_name"],
-            r["state_name"]
-        )
-    return list(regions.values())
 
+def parse_raw_data(raw: bytes) -> SeriesTable:
+    """Parse the Zillow CSV into a compact wide SeriesTable (no per-cell row objects)."""
+    table = SeriesTable.from_csv(raw.decode("utf-8-sig").splitlines())
+    logger.info(
+        f"Fetched {len(table.regions)} regions x {table.n_months} months "
+        f"({table.nbytes() / 1e6:.1f} MB of series buffers)"
+    )
+    return table
 
 
 async def main():
-    raw_rows = fetch_raw_data()
-    region_rows = prepare_region_rows(raw_rows)
-    metro_rows = prepare_metro_rows(raw_rows)
+    # pandas and pyarrow back the archive, validation and similarity steps; importing
+    # them here keeps `import ingest` (scheduler, tests, tooling) from paying for them
+    from snapshots import archive_csv_bytes
+    from similarity import SimilarityIndex, store_neighbors
+    from validation import quarantine_rows, series_jumps, validate_series
+
+    raw = fetch_raw_data()
+    # Keep the file as fetched, before parsing drops columns, rows or cells, so any past
+    # load can be reproduced
+    archive_csv_bytes(raw, ZILLOW_FILE)
+    table = parse_raw_data(raw)
+    region_rows = prepare_region_rows(table)
+
+    # Validate the whole series up front so one bad cell can't abort the COPY halfway.
+    # Everything below reads the wide buffer; no long per-cell frame is built.
+    metro_rejects = validate_series(table)
+    jumps = series_jumps(table, OUTLIER_SIGMA)
 
     connector = AsyncPostgresConnector()
     await connector.connect()
 
     try:
+        await quarantine_rows(connector, "metro_us", metro_rejects)
+        # Outliers are still loaded; quarantine just records them for review
+        await quarantine_rows(
+            connector,
+            "metro_us",
+            jumps.assign(reason=f"outlier (loaded): avg_cost jump > {OUTLIER_SIGMA} sigma"),
+        )
+
         # Insert regions
         logger.info(f"Inserting {len(region_rows)} regions...")
         await connector.execute_many(REGION_INSERT_SQL, region_rows)
         logger.info("Regions inserted successfully.")
 
-        # Bulk insert metro_us using COPY
-        logger.info(f"Inserting {len(metro_rows)} metro_us rows via COPY...")
-        copy_query = sql.SQL("COPY {} ({}) FROM STDIN").format(
-            sql.Identifier("metro_us"),
-            sql.SQL(", ").join(sql.Identifier(c) for c in METRO_COPY_COLUMNS)
+        # Full reload: each year's partition is rebuilt from generated rows and swapped in,
+        # so re-running ingest replaces the data instead of colliding with it
+        logger.info(f"Reloading {table.n_cells()} metro_us rows by yearly partition...")
+        await reload_metro(
+            connector, {year: prepare_metro_rows(table, year) for year in table.years()}
         )
-        async with connector._get_connection() as conn:
-            async with conn.cursor() as cur:
-                async with cur.copy(copy_query) as copy:
-                    for row in metro_rows:
-                        await copy.write_row(row)
+        logger.info("Metro_us data reloaded successfully.")
+
+        # Pre-render the dashboard views so the read path never re-queries or re-shapes
+        await publish_payloads(connector, build_payloads(table))
+
+        # Precompute "metros that move like this one" so lookups are a single indexed read
+        await store_neighbors(connector, SimilarityIndex.from_table(table))
         await connector.disconnect()
-        logger.info("Metro_us data inserted successfully.")
 
     except Exception as e:
         logger.exception(f"Error during ingestion: {e}")
         await connector.disconnect()
+        raise   # non-zero exit so the scheduler sees the failure
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
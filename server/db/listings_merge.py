@@ -0,0 +1,287 @@
+# listings_merge.py
+import hashlib
+import logging
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from address_dedup import StoredKeys, cluster_listings, cluster_survivors, normalize_keys
+from postgres_connector import AsyncPostgresConnector
+from psycopg import sql
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "property_listings"
+STAGING_TABLE = "listings_staging"
+
+# Natural key of a listing; matches the property_listings_unique constraint
+KEY_COLUMNS = ["address", "city", "state", "zip"]
+
+# Columns that can change between refreshes and feed row_hash
+MUTABLE_COLUMNS = [
+    "sqft", "beds", "baths", "built_year", "property_type", "status", "price",
+    "agent", "broker", "lat", "lon", "parcel", "last_change",
+]
+
+LISTING_COLUMNS = KEY_COLUMNS + MUTABLE_COLUMNS
+
+
+def _canonical(value) -> str:
+    """Text form of one field that doesn't depend on how it was parsed (100000, 100000.0, Decimal)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (int, float, Decimal, np.number)) and not isinstance(value, bool):
+        return format(float(value), ".15g")
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def row_hash(row: tuple) -> bytes:
+    """Digest of a listing row's mutable fields, in LISTING_COLUMNS order."""
+    text = "\x1f".join(_canonical(v) for v in row[len(KEY_COLUMNS):])
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).digest()
+
+
+def _dedupe(rows: list[tuple]) -> list[tuple]:
+    """Keep the last row per key so the set-based UPDATE never matches twice."""
+    key_len = len(KEY_COLUMNS)
+    return list({row[:key_len]: row for row in rows}.values())
+
+
+def _columns(names: list[str], prefix: str = "") -> sql.Composable:
+    return sql.SQL(", ").join(
+        sql.SQL(prefix) + sql.Identifier(c) if prefix else sql.Identifier(c) for c in names
+    )
+
+
+def _key_match(left: str, right: str) -> sql.Composable:
+    return sql.SQL(" AND ").join(
+        sql.SQL("{}.{} = {}.{}").format(
+            sql.Identifier(left), sql.Identifier(c), sql.Identifier(right), sql.Identifier(c)
+        )
+        for c in KEY_COLUMNS
+    )
+
+
+def _build_statements() -> dict[str, sql.Composable]:
+    table = sql.Identifier(TABLE_NAME)
+    staging = sql.Identifier(STAGING_TABLE)
+    all_columns = LISTING_COLUMNS + ["row_hash"]
+    # An older copy of a listing (a stale duplicate in a later batch) never overwrites a newer one
+    match = sql.SQL("{} AND (s.last_change IS NULL OR p.last_change IS NULL OR s.last_change >= p.last_change)").format(
+        _key_match("p", "s")
+    )
+
+    return {
+        "create": sql.SQL(
+            "CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            "SELECT {columns} FROM {table} WITH NO DATA"
+        ).format(staging=staging, columns=_columns(all_columns), table=table),
+
+        "copy": sql.SQL("COPY {staging} ({columns}) FROM STDIN").format(
+            staging=staging, columns=_columns(all_columns)
+        ),
+
+        # Record what changed before the UPDATE overwrites the old values.
+        # Rows with no stored hash predate change tracking and are only backfilled.
+        "events": sql.SQL("""
+            INSERT INTO listing_events (listing_id, event_type, old_price, new_price, old_status, new_status)
+            SELECT p.id,
+                   CASE
+                       WHEN p.status IS DISTINCT FROM s.status THEN 'status_change'
+                       WHEN s.price < p.price THEN 'price_cut'
+                       WHEN s.price > p.price THEN 'price_increase'
+                       WHEN p.price IS DISTINCT FROM s.price THEN 'price_change'
+                       ELSE 'updated'
+                   END,
+                   p.price, s.price, p.status, s.status
+            FROM {staging} s
+            JOIN {table} p ON {match}
+            WHERE p.row_hash IS NOT NULL AND p.row_hash <> s.row_hash
+        """).format(staging=staging, table=table, match=match),
+
+        "update": sql.SQL("""
+            UPDATE {table} p
+            SET {assignments}
+            FROM {staging} s
+            WHERE {match} AND p.row_hash IS DISTINCT FROM s.row_hash
+        """).format(
+            table=table,
+            staging=staging,
+            match=match,
+            assignments=sql.SQL(", ").join(
+                sql.SQL("{c} = s.{c}").format(c=sql.Identifier(c))
+                for c in MUTABLE_COLUMNS + ["row_hash"]
+            ),
+        ),
+
+        "insert": sql.SQL("""
+            WITH inserted AS (
+                INSERT INTO {table} ({columns})
+                SELECT {staged_columns} FROM {staging} s
+                WHERE NOT EXISTS (SELECT 1 FROM {table} p WHERE {key_match})
+                ON CONFLICT ({key}) DO NOTHING
+                RETURNING id, price, status
+            )
+            INSERT INTO listing_events (listing_id, event_type, new_price, new_status)
+            SELECT id, 'listed', price, status FROM inserted
+        """).format(
+            table=table,
+            staging=staging,
+            key_match=_key_match("p", "s"),
+            columns=_columns(all_columns),
+            staged_columns=_columns(all_columns, "s."),
+            key=_columns(KEY_COLUMNS),
+        ),
+    }
+
+
+MERGE_STATEMENTS = _build_statements()
+
+
+async def merge_listings(connector: AsyncPostgresConnector, rows: list[tuple]) -> tuple[int, int]:
+    """
+    Merge a batch of listings, writing only the rows that are new or changed.
+
+    The batch is hashed and COPYed into a temp table, then compared with the
+    stored hashes in three set-based statements inside one transaction:
+    changed rows get a listing_events entry and are updated in place, and
+    unseen keys are inserted with a 'listed' event. Unchanged rows cost a
+    hash comparison and nothing else.
+
+    Args:
+        connector: Connected database connector
+        rows: Listing tuples in LISTING_COLUMNS order
+
+    Returns:
+        (inserted, updated) row counts
+    """
+    staged = [row + (row_hash(row),) for row in _dedupe(rows)]
+
+    async with connector.transaction() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(MERGE_STATEMENTS["create"])
+            async with cur.copy(MERGE_STATEMENTS["copy"]) as copy:
+                for row in staged:
+                    await copy.write_row(row)
+
+            await cur.execute(MERGE_STATEMENTS["events"])
+            await cur.execute(MERGE_STATEMENTS["update"])
+            updated = cur.rowcount
+            await cur.execute(MERGE_STATEMENTS["insert"])
+            inserted = cur.rowcount
+
+    logger.info(f"Merged {len(staged)} listings: {inserted} new, {updated} changed")
+    return inserted, updated
+
+
+STORED_KEYS_SQL = """
+SELECT address, city, state, zip, parcel
+FROM property_listings
+ORDER BY id
+"""
+
+BACKFILL_KEYS_SQL = """
+SELECT id, address, city, state, zip, parcel, last_change
+FROM property_listings
+ORDER BY id
+"""
+
+# Listings merged away by the key backfill hand their history to the surviving row
+BACKFILL_STATEMENTS = {
+    "create": """
+        CREATE TEMP TABLE listing_key_backfill (
+            id bigint, survivor_id bigint, address text, city text, state text, zip text
+        ) ON COMMIT DROP
+    """,
+    "copy": "COPY listing_key_backfill (id, survivor_id, address, city, state, zip) FROM STDIN",
+    "events": """
+        UPDATE listing_events e SET listing_id = b.survivor_id
+        FROM listing_key_backfill b
+        WHERE e.listing_id = b.id AND b.survivor_id <> b.id
+    """,
+    "delete": """
+        DELETE FROM property_listings p
+        USING listing_key_backfill b
+        WHERE p.id = b.id AND b.survivor_id <> b.id
+    """,
+    "rename": """
+        UPDATE property_listings p
+        SET address = b.address, city = b.city, state = b.state, zip = b.zip
+        FROM listing_key_backfill b
+        WHERE p.id = b.id AND b.survivor_id = b.id
+    """,
+}
+
+
+async def load_stored_keys(connector: AsyncPostgresConnector) -> StoredKeys:
+    """
+    Read the stored listing keys for matching new batches against.
+
+    Keys are read as stored: merge_listings only writes canonical keys, and
+    rows loaded before address normalization are canonicalized once by
+    backfill_stored_keys (backfill_listing_keys.py).
+
+    Args:
+        connector: Connected database connector
+
+    Returns:
+        The key of every stored listing
+    """
+    rows = await connector.fetch_all(STORED_KEYS_SQL)
+    return StoredKeys(pd.DataFrame(rows, columns=StoredKeys.COLUMNS))
+
+
+async def backfill_stored_keys(connector: AsyncPostgresConnector, workers: int | None = None) -> tuple[int, int]:
+    """
+    One-off migration that brings listing keys stored before address normalization into canonical form.
+
+    Rows written before normalization keep their raw keys ("123 Main
+    Street"). Left alone, the first normalized load would insert every one of
+    them again under its canonical key. So stored rows are normalized and
+    clustered with the same rules as a batch. In each cluster, the latest
+    row survives under its canonical key, and the others move their
+    listing_events to it and are deleted.
+
+    This reads and rewrites the whole table, so it is not part of a regular
+    load. Run it once, before the first normalized load.
+
+    Args:
+        connector: Connected database connector
+        workers: Process count for fuzzy matching
+
+    Returns:
+        (renamed, merged) row counts
+    """
+    rows = await connector.fetch_all(BACKFILL_KEYS_SQL)
+    stored = pd.DataFrame(rows, columns=["id", *KEY_COLUMNS, "parcel", "last_change"])
+    if stored.empty:
+        return 0, 0
+
+    normalized = normalize_keys(stored)
+    survivors = cluster_survivors(normalized, cluster_listings(normalized, workers))
+    positions = np.arange(len(stored))
+    merged = survivors != positions
+    renamed = ~merged & (normalized[KEY_COLUMNS] != stored[KEY_COLUMNS]).any(axis=1).to_numpy()
+
+    if merged.any() or renamed.any():
+        ids = stored["id"].to_numpy()
+        changes = normalized.loc[merged | renamed, ["id", *KEY_COLUMNS]].assign(
+            survivor_id=ids[survivors[merged | renamed]]
+        )
+        async with connector.transaction() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(BACKFILL_STATEMENTS["create"])
+                async with cur.copy(BACKFILL_STATEMENTS["copy"]) as copy:
+                    for row in changes[["id", "survivor_id", *KEY_COLUMNS]].itertuples(index=False):
+                        await copy.write_row(row)
+                await cur.execute(BACKFILL_STATEMENTS["events"])
+                for statement in ("delete", "rename"):
+                    await cur.execute(BACKFILL_STATEMENTS[statement])
+    logger.info(
+        f"Canonicalized listing keys: {int(renamed.sum())} renamed, "
+        f"{int(merged.sum())} duplicates merged into their survivors"
+    )
+    return int(renamed.sum()), int(merged.sum())
@@ -1,3 +1,7 @@
+from typing import Iterator
+
+from series import SeriesTable
+
 METRO_INSERT_SQL = """
 INSERT INTO metro_us (region_id, size_rank, date, avg_cost)
 VALUES (%s, %s, %s, %s)
@@ -5,13 +9,6 @@ ON CONFLICT (region_id, date)
 DO UPDATE SET avg_cost = EXCLUDED.avg_cost;
 """
 
-def prepare_metro_rows(raw_rows: list[dict]) -> list[tuple]:
-    return [
-        (
-            r["region_id"],
-            r["size_rank"],
-            r["date"],
-            r["avg_cost"]
-        )
-        for r in raw_rows
-    ]
\ No newline at end of file
+def prepare_metro_rows(table: SeriesTable, year: int | None = None) -> Iterator[tuple]:
+    """Generate metro_us rows on demand, optionally for a single year's partition."""
+    return table.metro_rows(year)
@@ -0,0 +1,171 @@
+import logging
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from datetime import date
+
+from postgres_connector import AsyncPostgresConnector
+from psycopg import sql
+
+logger = logging.getLogger(__name__)
+
+METRO_TABLE = "metro_us"
+METRO_COPY_COLUMNS = ["region_id", "size_rank", "date", "avg_cost"]
+
+
+def metro_partition_name(year: int) -> str:
+    """Name of the yearly metro_us partition holding `year`."""
+    return f"{METRO_TABLE}_y{year}"
+
+
+def row_year(value) -> int:
+    """Year of a row's date, accepting either a date or a YYYY-MM-DD string."""
+    if isinstance(value, date):
+        return value.year
+    return int(str(value)[:4])
+
+
+def _bounds(year: int) -> tuple[str, str]:
+    return f"{year}-01-01", f"{year + 1}-01-01"
+
+
+def group_rows_by_year(rows: list[tuple], date_index: int = 2) -> dict[int, list[tuple]]:
+    """Bucket COPY rows by the year of their date column."""
+    groups: dict[int, list[tuple]] = defaultdict(list)
+    for row in rows:
+        groups[row_year(row[date_index])].append(row)
+    return groups
+
+
+async def replace_metro_partition(
+    connector: AsyncPostgresConnector,
+    year: int,
+    rows: Iterable[tuple],
+    columns: list[str] = METRO_COPY_COLUMNS,
+) -> int:
+    """
+    Atomically replace one year of metro_us with a freshly loaded table.
+
+    The new data is COPYed into a standalone staging table that readers cannot
+    see, indexed and analyzed, then swapped in with DETACH/ATTACH inside a
+    single short transaction. A CHECK constraint matching the partition bounds
+    lets ATTACH skip its validation scan.
+
+    Args:
+        connector: Connected database connector
+        year: Calendar year being reloaded
+        rows: Complete set of rows for that year, ordered as `columns`
+        columns: Column names
+
+    Returns:
+        Number of rows loaded
+    """
+    partition = metro_partition_name(year)
+    staging = f"{partition}_staging"
+    lower, upper = _bounds(year)
+
+    await connector.execute(
+        sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging))
+    )
+    await connector.execute(
+        sql.SQL(
+            "CREATE TABLE {staging} (LIKE {parent} INCLUDING DEFAULTS); "
+            "ALTER TABLE {staging} ADD CONSTRAINT {check} "
+            "CHECK (date >= {lower} AND date < {upper})"
+        ).format(
+            staging=sql.Identifier(staging),
+            parent=sql.Identifier(METRO_TABLE),
+            check=sql.Identifier(f"{partition}_bounds"),
+            lower=sql.Literal(lower),
+            upper=sql.Literal(upper),
+        )
+    )
+
+    count = await connector.copy_from(staging, rows, columns)
+
+    # Build the indexes once over the loaded data instead of maintaining them per row
+    await connector.execute(
+        sql.SQL(
+            "ALTER TABLE {staging} ADD CONSTRAINT {unique} "
+            "UNIQUE (region_id, date) INCLUDE (avg_cost); "
+            "CREATE INDEX {brin} ON {staging} USING brin (date); "
+            "ANALYZE {staging}"
+        ).format(
+            staging=sql.Identifier(staging),
+            unique=sql.Identifier(f"{staging}_region_date_unique"),
+            brin=sql.Identifier(f"{staging}_date_brin"),
+        )
+    )
+
+    async with connector.transaction() as conn:
+        # Fail fast rather than queue every dashboard read behind the exclusive lock
+        await conn.execute("SET LOCAL lock_timeout = '5s'")
+        exists = await conn.execute(
+            "SELECT to_regclass(%s) IS NOT NULL", (partition,)
+        )
+        if (await exists.fetchone())[0]:
+            await conn.execute(
+                sql.SQL("ALTER TABLE {parent} DETACH PARTITION {partition}").format(
+                    parent=sql.Identifier(METRO_TABLE),
+                    partition=sql.Identifier(partition),
+                )
+            )
+            await conn.execute(
+                sql.SQL("DROP TABLE {}").format(sql.Identifier(partition))
+            )
+        # Index names are unique per schema, so they only take the partition's
+        # names once the old partition and its indexes are gone
+        await conn.execute(
+            sql.SQL(
+                "ALTER TABLE {staging} RENAME TO {partition}; "
+                "ALTER TABLE {partition} RENAME CONSTRAINT {staging_unique} TO {unique}; "
+                "ALTER INDEX {staging_brin} RENAME TO {brin}"
+            ).format(
+                staging=sql.Identifier(staging),
+                partition=sql.Identifier(partition),
+                staging_unique=sql.Identifier(f"{staging}_region_date_unique"),
+                unique=sql.Identifier(f"{partition}_region_date_unique"),
+                staging_brin=sql.Identifier(f"{staging}_date_brin"),
+                brin=sql.Identifier(f"{partition}_date_brin"),
+            )
+        )
+        await conn.execute(
+            sql.SQL(
+                "ALTER TABLE {parent} ATTACH PARTITION {partition} "
+                "FOR VALUES FROM ({lower}) TO ({upper})"
+            ).format(
+                parent=sql.Identifier(METRO_TABLE),
+                partition=sql.Identifier(partition),
+                lower=sql.Literal(lower),
+                upper=sql.Literal(upper),
+            )
+        )
+
+    logger.info(f"Replaced partition {partition} with {count} rows")
+    return count
+
+
+async def reload_metro(
+    connector: AsyncPostgresConnector,
+    rows: Iterable[tuple] | Mapping[int, Iterable[tuple]],
+    columns: list[str] = METRO_COPY_COLUMNS,
+) -> int:
+    """
+    Full reload of metro_us, swapping in each year's partition atomically.
+
+    Safe to run repeatedly: every year present in `rows` is replaced as a
+    whole rather than appended to.
+
+    Args:
+        connector: Connected database connector
+        rows: Every metro_us row ordered as `columns`, or a mapping of year to
+            that year's rows (which may be generators)
+        columns: Column names; must include "date"
+
+    Returns:
+        Number of rows loaded
+    """
+    groups = rows if isinstance(rows, Mapping) else group_rows_by_year(rows, columns.index("date"))
+    total = 0
+    for year in sorted(groups):
+        total += await replace_metro_partition(connector, year, groups[year], columns)
+    return total
@@ -0,0 +1,238 @@
+# payload_cache.py
+import gzip
+import json
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from postgres_connector import AsyncPostgresConnector
+
+# The server only reads blobs through PayloadCache; numpy and the series
+# module (pandas) are needed only to build payloads during ingest
+if TYPE_CHECKING:
+    import numpy as np
+
+    from series import SeriesTable
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_TABLE = "dashboard_payloads"
+FILTERS_KEY = "filters"
+
+# Older generations kept so readers that resolved one just before a publish still find it
+KEEP_GENERATIONS = 2
+
+# Seconds a reader serves its generation before checking for a newer one
+GENERATION_MAX_AGE = 60.0
+
+MARK_READY_SQL = """
+UPDATE payload_generations SET ready = true WHERE generation = %s
+"""
+
+PRUNE_SQL = """
+DELETE FROM payload_generations WHERE generation <= %s
+"""
+
+CURRENT_GENERATION_SQL = """
+SELECT max(generation) FROM payload_generations WHERE ready
+"""
+
+FETCH_PAYLOAD_SQL = """
+SELECT body FROM dashboard_payloads
+WHERE generation = %s AND payload_key = %s AND format = %s
+"""
+
+
+def region_key(region_id: int) -> str:
+    return f"region:{region_id}"
+
+
+def _region_payload(dates: list[str], values: list[float], years: list[int], months: list[int]) -> dict:
+    """Year arrays and month-of-year buckets for one region's date-sorted series."""
+    by_year: dict[str, dict] = {}
+    by_month = [{"dates": [], "values": []} for _ in range(12)]
+    for d, v, y, m in zip(dates, values, years, months):
+        bucket = by_year.setdefault(str(y), {"dates": [], "values": []})
+        bucket["dates"].append(d)
+        bucket["values"].append(v)
+        by_month[m - 1]["dates"].append(d)
+        by_month[m - 1]["values"].append(v)
+
+    return {"years": by_year, "month_of_year": by_month}
+
+
+def _encode_json(payload: dict) -> bytes:
+    return gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), compresslevel=6)
+
+
+def _encode_arrow(dates: "np.ndarray", values: "np.ndarray") -> bytes:
+    import pyarrow as pa
+
+    table = pa.table({
+        "date": pa.array(dates, pa.date32()),
+        "avg_cost": pa.array(values, pa.float64()),
+    })
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def build_payloads(
+    table: "SeriesTable",
+    formats: tuple[str, ...] = ("json",),
+) -> dict[tuple[str, str], bytes]:
+    """
+    Pre-render every dashboard payload from the loaded data.
+
+    Each region gets its series pre-split into per-year arrays and the 12
+    month-of-year buckets the dashboards chart, and one "filters" payload
+    carries the region, state and year dropdown lists. Regions are read row
+    by row from the validated regions x months buffer; date strings are
+    formatted once per month column, not once per cell.
+
+    Args:
+        table: Validated series (rejected cells already blanked)
+        formats: "json" (gzip-compressed JSON) and/or "arrow" (zstd Arrow IPC stream of the raw series)
+
+    Returns:
+        Encoded blobs keyed by (payload_key, format)
+    """
+    import numpy as np
+
+    values = table.matrix()
+    column_dates = table.column_dates()
+    order = np.argsort(column_dates, kind="stable")
+    column_dates = column_dates[order]
+    date_strings = np.array(np.datetime_as_string(column_dates, unit="D"), dtype=object)
+    years = column_dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    months = column_dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+
+    regions = table.regions
+    payloads: dict[tuple[str, str], bytes] = {}
+    loaded_years: set[int] = set()
+    for i, region_id in enumerate(regions.region_ids):
+        row = values[i, order]
+        present = ~np.isnan(row)
+        if not present.any():
+            continue
+        loaded_years.update(np.unique(years[present]).tolist())
+        key = region_key(region_id)
+        if "json" in formats:
+            payload = {
+                "region_id": region_id,
+                **_region_payload(
+                    date_strings[present].tolist(),
+                    np.round(row[present], 2).tolist(),
+                    years[present].tolist(),
+                    months[present].tolist(),
+                ),
+                "region_name": regions.names[i],
+                "state_name": regions.states[i],
+            }
+            payloads[(key, "json")] = _encode_json(payload)
+        if "arrow" in formats:
+            payloads[(key, "arrow")] = _encode_arrow(column_dates[present], row[present])
+
+    listed = sorted(table.region_rows(), key=lambda r: (r[2], r[1]))
+    filters = {
+        "states": sorted({state for _, _, state in listed}),
+        "regions": [
+            {"region_id": r, "region_name": n, "state_name": s} for r, n, s in listed
+        ],
+        "years": sorted(loaded_years, reverse=True),
+    }
+    payloads[(FILTERS_KEY, "json")] = _encode_json(filters)
+    return payloads
+
+
+async def publish_payloads(
+    connector: AsyncPostgresConnector,
+    payloads: dict[tuple[str, str], bytes],
+) -> int:
+    """
+    Store a new generation of payloads and make it current atomically.
+
+    Blobs are COPYed under a fresh generation number that readers ignore until
+    it is marked ready, so a reader always sees one complete generation.
+
+    Args:
+        connector: Connected database connector
+        payloads: Output of build_payloads
+
+    Returns:
+        The published generation number
+    """
+    generation = await connector.execute(
+        "INSERT INTO payload_generations DEFAULT VALUES RETURNING generation",
+        returning=True,
+    )
+    rows = [(generation, key, fmt, body) for (key, fmt), body in payloads.items()]
+    await connector.copy_from(PAYLOAD_TABLE, rows, ["generation", "payload_key", "format", "body"])
+    async with connector.transaction() as conn:
+        await conn.execute(MARK_READY_SQL, (generation,))
+        await conn.execute(PRUNE_SQL, (generation - KEEP_GENERATIONS,))
+
+    size = sum(len(body) for body in payloads.values())
+    logger.info(f"Published payload generation {generation}: {len(rows)} blobs, {size / 1e6:.1f} MB")
+    return generation
+
+
+class PayloadCache:
+    """
+    Read path for pre-rendered payloads.
+
+    Blobs are fetched once per generation and kept in memory, so serving a
+    view is a dictionary lookup returning ready-to-send bytes. The current
+    generation is re-checked every `max_age` seconds, and on any miss, so a
+    long-running reader follows publishes and survives its generation being
+    pruned.
+    """
+
+    def __init__(self, connector: AsyncPostgresConnector, max_age: float = GENERATION_MAX_AGE):
+        self.connector = connector
+        self.max_age = max_age
+        self.generation: int | None = None
+        self._checked: float | None = None
+        self._blobs: dict[tuple[str, str], bytes] = {}
+        connector.register_statement("payload", FETCH_PAYLOAD_SQL)
+        connector.register_statement("payload_generation", CURRENT_GENERATION_SQL)
+
+    async def refresh(self) -> int | None:
+        """Pick up the latest ready generation, dropping blobs from older ones."""
+        row = await self.connector.fetch_prepared("payload_generation", one=True)
+        current = row[0] if row else None
+        self._checked = time.monotonic()
+        if current != self.generation:
+            self.generation = current
+            self._blobs.clear()
+        return current
+
+    def _stale(self) -> bool:
+        return self._checked is None or time.monotonic() - self._checked >= self.max_age
+
+    async def get(self, key: str, fmt: str = "json") -> bytes | None:
+        """
+        Return the encoded payload for `key` ("filters" or region_key(id)).
+
+        Returns:
+            The stored blob (gzip JSON or Arrow IPC), or None if it doesn't exist
+        """
+        refreshed = self._stale()
+        if refreshed:
+            await self.refresh()
+        cached = self._blobs.get((key, fmt))
+        if cached is not None:
+            return cached
+
+        row = await self.connector.fetch_prepared("payload", (self.generation, key, fmt), one=True)
+        if row is None and not refreshed:
+            # The generation may have been pruned, or the key only exists in a newer one
+            previous = self.generation
+            if await self.refresh() != previous:
+                row = await self.connector.fetch_prepared("payload", (self.generation, key, fmt), one=True)
+        if row is None:
+            return None
+        self._blobs[(key, fmt)] = row[0]
+        return row[0]
@@ -0,0 +1,52 @@
+# queries.py
+from postgres_connector import AsyncPostgresConnector
+
+# Statements behind every dashboard page load, registered as prepared statements
+DASHBOARD_STATEMENTS = {
+    # Answered from the covering (region_id, date) INCLUDE (avg_cost) index
+    "region_series": """
+        SELECT date, avg_cost
+        FROM metro_us
+        WHERE region_id = %s
+        ORDER BY date
+    """,
+    "regions": """
+        SELECT region_id, region_name, state_name
+        FROM regions
+        ORDER BY state_name, region_name
+    """,
+    "years": """
+        SELECT DISTINCT EXTRACT(YEAR FROM date)::int AS year
+        FROM metro_us
+        ORDER BY year DESC
+    """,
+}
+
+
+def register_dashboard_statements(connector: AsyncPostgresConnector) -> None:
+    """Register the dashboard statements on a connector."""
+    for name, query in DASHBOARD_STATEMENTS.items():
+        connector.register_statement(name, query)
+
+
+async def fetch_dashboard(connector: AsyncPostgresConnector, region_id: int) -> dict:
+    """
+    Fetch everything the dashboard page needs in a single round trip.
+
+    Args:
+        connector: Connected connector with the dashboard statements registered
+        region_id: Selected region
+
+    Returns:
+        Dict with "series" (date, avg_cost rows), "regions" and "years"
+    """
+    async with connector.batch() as batch:
+        series = batch.fetch_prepared("region_series", (region_id,))
+        regions = batch.fetch_prepared("regions", as_dict=True)
+        years = batch.fetch_prepared("years")
+
+    return {
+        "series": series.result(),
+        "regions": regions.result(),
+        "years": [row[0] for row in years.result()],
+    }
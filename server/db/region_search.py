@@ -0,0 +1,206 @@
+# region_search.py
+import bisect
+import logging
+import re
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from payload_cache import CURRENT_GENERATION_SQL, GENERATION_MAX_AGE
+from postgres_connector import AsyncPostgresConnector
+
+logger = logging.getLogger(__name__)
+
+# Latest size_rank per region, read through the (region_id, date) index
+REGIONS_SQL = """
+SELECT r.region_id, r.region_name, r.state_name, m.size_rank
+FROM regions r
+LEFT JOIN LATERAL (
+    SELECT size_rank FROM metro_us
+    WHERE region_id = r.region_id
+    ORDER BY date DESC
+    LIMIT 1
+) m ON true
+"""
+
+DEFAULT_LIMIT = 10
+FUZZY_THRESHOLD = 0.5       # minimum share of the query's trigrams a typo match must contain
+UNRANKED = np.iinfo(np.int64).max
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {' '.join(_tokens(text))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class RegionMatch:
+    region_id: int
+    region_name: str
+    state_name: str
+    size_rank: int | None
+    score: float
+
+
+class RegionIndex:
+    """
+    Immutable search index over region names and states.
+
+    Prefix matching uses one sorted list of (token, region) pairs, which
+    answers "tokens starting with q" with two binary searches, like walking a
+    trie. Every query token has to prefix some token of the region's name or
+    state, so "san fr" finds "San Francisco, CA". When nothing matches that
+    way, a trigram index finds near misses ("sna francisco"), ranked by how
+    much of the whole query the full name accounts for.
+    """
+
+    def __init__(self, rows: list[tuple]):
+        self.region_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.names = [r[1] or "" for r in rows]
+        self.states = [r[2] or "" for r in rows]
+        self.size_ranks = np.array([UNRANKED if r[3] is None else r[3] for r in rows], dtype=np.int64)
+        self.folded_names = [name.casefold() for name in self.names]
+
+        pairs = sorted(
+            {(token, i) for i in range(len(rows)) for token in _tokens(f"{self.names[i]} {self.states[i]}")}
+        )
+        self._tokens = [token for token, _ in pairs]
+        self._token_regions = np.array([i for _, i in pairs], dtype=np.int64)
+
+        grams: dict[str, list[int]] = {}
+        self._gram_counts = np.zeros(len(rows), dtype=np.int64)
+        for i, name in enumerate(self.names):
+            region_grams = _trigrams(f"{name} {self.states[i]}")
+            self._gram_counts[i] = len(region_grams)
+            for gram in region_grams:
+                grams.setdefault(gram, []).append(i)
+        self._grams = {gram: np.array(ids, dtype=np.int64) for gram, ids in grams.items()}
+
+    def __len__(self) -> int:
+        return len(self.region_ids)
+
+    def _prefixed(self, token: str) -> np.ndarray:
+        """Positions of regions with a token starting with `token`."""
+        lo = bisect.bisect_left(self._tokens, token)
+        hi = bisect.bisect_left(self._tokens, token + "\uffff", lo)
+        return np.unique(self._token_regions[lo:hi])
+
+    def _prefix_candidates(self, query_tokens: list[str]) -> np.ndarray:
+        candidates = None
+        for token in query_tokens:
+            found = self._prefixed(token)
+            candidates = found if candidates is None else np.intersect1d(candidates, found, assume_unique=True)
+            if len(candidates) == 0:
+                break
+        return candidates
+
+    def _fuzzy_candidates(self, query: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Near misses with their query coverage and Jaccard similarity."""
+        query_grams = _trigrams(query)
+        hits = [self._grams[g] for g in query_grams if g in self._grams]
+        if not hits:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self))
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+        # Share of the query's trigrams found in the full name: "sna francisco" covers
+        # more of "San Francisco" than of "Francisco", which only matches one word.
+        # Jaccard similarity then prefers the tighter of two equally covering names.
+        coverage = shared / len(query_grams)
+        jaccard = shared / (len(query_grams) + self._gram_counts[candidates] - shared)
+        keep = coverage >= FUZZY_THRESHOLD
+        return candidates[keep], coverage[keep], jaccard[keep]
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, state: str | None = None) -> list[RegionMatch]:
+        """
+        Top matches for a partial region name, largest regions first.
+
+        Regions whose name starts with the query rank ahead of regions that
+        merely contain a matching word; within each tier, lower size_rank
+        (bigger market) wins. Typo matches only appear when there are no
+        prefix matches and are ranked by the share of the query's trigrams
+        the full name contains.
+
+        Args:
+            query: What the user has typed so far
+            limit: Maximum number of suggestions
+            state: Only return regions in this state
+
+        Returns:
+            Matches, best first
+        """
+        query_tokens = _tokens(query)
+        if not query_tokens:
+            positions = np.arange(len(self))
+            scores = np.zeros(len(self))
+            ties = scores
+        else:
+            positions = self._prefix_candidates(query_tokens)
+            if len(positions):
+                folded = " ".join(query_tokens)
+                scores = np.array(
+                    [1.0 if self.folded_names[i].startswith(folded) else 0.5 for i in positions]
+                )
+                ties = np.zeros(len(positions))
+            else:
+                positions, scores, ties = self._fuzzy_candidates(query)
+
+        if state is not None and len(positions):
+            in_state = np.array([self.states[i] == state for i in positions], dtype=bool)
+            positions, scores, ties = positions[in_state], scores[in_state], ties[in_state]
+
+        order = np.lexsort((self.size_ranks[positions], -ties, -scores))[:limit]
+        return [
+            RegionMatch(
+                region_id=int(self.region_ids[i]),
+                region_name=self.names[i],
+                state_name=self.states[i],
+                size_rank=None if self.size_ranks[i] == UNRANKED else int(self.size_ranks[i]),
+                score=round(float(s), 3),
+            )
+            for i, s in zip(positions[order], scores[order])
+        ]
+
+
+class RegionSearch:
+    """
+    Region suggestions served from memory, rebuilt when ingest publishes.
+
+    The index is tied to the payload generation that publish_payloads bumps
+    at the end of every ingest. Like PayloadCache, the generation is
+    re-checked every `max_age` seconds, so refresh() is one small query while
+    the data is unchanged and a rebuild after a new load.
+    """
+
+    def __init__(self, connector: AsyncPostgresConnector, max_age: float = GENERATION_MAX_AGE):
+        self.connector = connector
+        self.max_age = max_age
+        self.generation: int | None = None
+        self.index: RegionIndex | None = None
+        self._checked: float | None = None
+        connector.register_statement("payload_generation", CURRENT_GENERATION_SQL)
+
+    async def refresh(self) -> int | None:
+        """Rebuild the index if the published generation changed since the last build."""
+        row = await self.connector.fetch_prepared("payload_generation", one=True)
+        current = row[0] if row else None
+        self._checked = time.monotonic()
+        if self.index is None or current != self.generation:
+            rows = await self.connector.fetch_all(REGIONS_SQL)
+            self.index = RegionIndex(rows)
+            self.generation = current
+            logger.info(f"Built region search index over {len(rows)} regions (generation {current})")
+        return current
+
+    async def search(self, query: str, limit: int = DEFAULT_LIMIT, state: str | None = None) -> list[RegionMatch]:
+        """Suggestions for `query`; see RegionIndex.search."""
+        if self._checked is None or time.monotonic() - self._checked >= self.max_age:
+            await self.refresh()
+        return self.index.search(query, limit, state)
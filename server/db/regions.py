@@ -1,4 +1,4 @@
-from collections import defaultdict
+from series import SeriesTable
 
 REGION_INSERT_SQL = """
 INSERT INTO regions (region_id, region_name, state_name)
@@ -6,17 +6,8 @@ VALUES (%s, %s, %s)
 ON CONFLICT (region_id) DO NOTHING;
 """  
 
-def prepare_region_rows(raw_rows: list[dict]) -> list[tuple]:
+def prepare_region_rows(table: SeriesTable) -> list[tuple]:
     """
-    Remove duplicate regions from raw data
+    Remove duplicate regions from the loaded series
     """
-    regions = {}
-
-    for r in raw_rows:
-        regions[r["region_id"]] = (
-            r["region_id"],
-            r["region_name"],
-            r["state_name"]
-        )
-
-    return list(regions.values())
\ No newline at end of file
+    return table.region_rows()
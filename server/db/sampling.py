@@ -0,0 +1,353 @@
+# sampling.py
+import logging
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from psycopg import sql
+
+from postgres_connector import AsyncPostgresConnector
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_TABLE = "listing_sample"
+STRATA_TABLE = "listing_sample_strata"
+
+STRATUM_COLUMNS = ["state", "property_type"]
+CATEGORY_COLUMNS = ["state", "property_type", "status"]
+VALUE_COLUMNS = ["price", "sqft", "beds", "baths", "built_year"]
+SAMPLE_COLUMNS = STRATUM_COLUMNS + ["status"] + VALUE_COLUMNS
+STRATA_COLUMNS = STRATUM_COLUMNS + ["population"]
+
+STRATUM_CAPACITY = 2000    # sampled listings kept per (state, property_type)
+SAMPLE_SEED = 685          # fixed, so a listing's priority is the same on every rebuild
+
+# Metric name -> SQL expression over property_listings (exact path)
+METRICS = {
+    "price": "price",
+    "sqft": "sqft",
+    "beds": "beds",
+    "baths": "baths",
+    "built_year": "built_year",
+    "price_per_sqft": "price / NULLIF(sqft, 0)",
+}
+STATS = ("mean", "median", "sum", "count")
+
+# Every listing gets a pseudo-random priority from a keyed hash of its natural key,
+# and each stratum keeps its `capacity` lowest priorities (bottom-k sampling).
+# Rebuilt from the current table, so repeat loads cannot bias the sample and
+# listings that left the table leave the sample with them.
+REBUILD_SAMPLE_SQL = """
+WITH ranked AS (
+    SELECT state, COALESCE(property_type, '') AS property_type,
+           status, price, sqft, beds, baths, built_year,
+           row_number() OVER (
+               PARTITION BY state, COALESCE(property_type, '')
+               ORDER BY hashtextextended(concat_ws(E'\\x1f', address, city, state, zip), %(seed)s)
+           ) AS priority_rank
+    FROM property_listings
+)
+INSERT INTO listing_sample (state, property_type, status, price, sqft, beds, baths, built_year)
+SELECT state, property_type, status, price, sqft, beds, baths, built_year
+FROM ranked
+WHERE priority_rank <= %(capacity)s
+"""
+
+REBUILD_STRATA_SQL = """
+INSERT INTO listing_sample_strata (state, property_type, population)
+SELECT state, COALESCE(property_type, ''), count(*)
+FROM property_listings
+GROUP BY 1, 2
+"""
+
+
+async def refresh_sample(
+    connector: AsyncPostgresConnector,
+    capacity: int = STRATUM_CAPACITY,
+    seed: int = SAMPLE_SEED,
+) -> int:
+    """
+    Rebuild the stratified listing sample and population counts from property_listings.
+
+    Each (state, property_type) stratum keeps the `capacity` listings with
+    the lowest hashed priority, which is a uniform sample of the stratum's
+    current listings (all of them when it is smaller). Run after every load;
+    both tables are replaced in one transaction, so ListingSample never
+    reads a sample that disagrees with its populations.
+
+    Returns:
+        Number of sampled listings
+    """
+    async with connector.transaction() as conn:
+        await conn.execute(f"DELETE FROM {SAMPLE_TABLE}")
+        cur = await conn.execute(REBUILD_SAMPLE_SQL, {"seed": seed, "capacity": capacity})
+        count = cur.rowcount
+        await conn.execute(f"DELETE FROM {STRATA_TABLE}")
+        cur = await conn.execute(REBUILD_STRATA_SQL)
+        strata = cur.rowcount
+    logger.info(f"Rebuilt listing sample: {count} listings over {strata} strata")
+    return count
+
+
+def _stratum_variance(z: np.ndarray, strata: np.ndarray, population: np.ndarray, sampled: np.ndarray) -> float:
+    """
+    Variance of the stratified total of z (zero outside the domain), with
+    finite population correction, so fully sampled strata contribute nothing.
+    """
+    n_strata = len(population)
+    total = np.bincount(strata, weights=z, minlength=n_strata)
+    squares = np.bincount(strata, weights=z * z, minlength=n_strata)
+    usable = sampled > 1
+    n = sampled[usable]
+    s2 = (squares[usable] - total[usable] ** 2 / n) / (n - 1)
+    N = population[usable]
+    return float(np.sum(N * N * (1 - n / N) * np.maximum(s2, 0) / n))
+
+
+def _weighted_quantile(values: np.ndarray, weights: np.ndarray, q: float) -> float:
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    position = np.searchsorted(cumulative, q * cumulative[-1])
+    return float(values[order][min(position, len(values) - 1)])
+
+
+class ListingSample:
+    """
+    In-memory NumPy copy of the listing sample for interactive aggregates.
+
+    Every sampled listing is weighted by its stratum's population / sample
+    size. Means and medians are domain ratio estimates with linearized
+    stratified variances, and median intervals come from Woodruff's method
+    (inverting the interval of the estimated CDF at the median).
+    """
+
+    def __init__(self, sample: pd.DataFrame, strata: pd.DataFrame):
+        strata = strata.reset_index(drop=True)
+        codes = {key: i for i, key in enumerate(zip(strata["state"], strata["property_type"]))}
+        self.stratum = np.array(
+            [codes[key] for key in zip(sample["state"], sample["property_type"])], dtype=np.int64
+        )
+        self.population = strata["population"].to_numpy(dtype=np.float64)
+        self.sampled = np.bincount(self.stratum, minlength=len(strata)).astype(np.float64)
+        # Strata whose listings have all left the table carry no weight
+        self.population = np.where(self.sampled > 0, np.maximum(self.population, self.sampled), 0.0)
+
+        self.categories = {
+            c: pd.Categorical(sample[c].fillna("").astype(str)) for c in CATEGORY_COLUMNS
+        }
+        values = {c: pd.to_numeric(sample[c], errors="coerce").to_numpy(dtype=np.float64) for c in VALUE_COLUMNS}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = values["price"] / values["sqft"]
+        values["price_per_sqft"] = np.where(np.isfinite(ratio), ratio, np.nan)
+        self.values = values
+
+    @classmethod
+    async def load(cls, connector: AsyncPostgresConnector) -> "ListingSample":
+        sample = pd.DataFrame(
+            await connector.fetch_all(f"SELECT {', '.join(SAMPLE_COLUMNS)} FROM {SAMPLE_TABLE}"),
+            columns=SAMPLE_COLUMNS,
+        )
+        strata = pd.DataFrame(
+            await connector.fetch_all(f"SELECT {', '.join(STRATA_COLUMNS)} FROM {STRATA_TABLE}"),
+            columns=STRATA_COLUMNS,
+        )
+        return cls(sample, strata)
+
+    def __len__(self) -> int:
+        return len(self.stratum)
+
+    def _mask(self, where: dict | None) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+        for column, condition in (where or {}).items():
+            if column in self.categories:
+                wanted = condition if isinstance(condition, (list, tuple, set)) else [condition]
+                mask &= np.isin(np.asarray(self.categories[column]), list(wanted))
+            elif column in self.values:
+                low, high = condition
+                v = self.values[column]
+                if low is not None:
+                    mask &= v >= low
+                if high is not None:
+                    mask &= v <= high
+            else:
+                raise ValueError(f"Cannot filter on {column!r}")
+        return mask
+
+    def _estimate(self, stat: str, y: np.ndarray, strata: np.ndarray, z_score: float) -> tuple[float, float, float]:
+        w = self._weights(strata)
+        if stat in ("sum", "count"):
+            total = float(np.sum(w * y))
+            se = np.sqrt(_stratum_variance(y, strata, self.population, self.sampled))
+            return total, total - z_score * se, total + z_score * se
+
+        size = np.sum(w)
+        if stat == "mean":
+            mean = float(np.sum(w * y) / size)
+            se = np.sqrt(_stratum_variance((y - mean) / size, strata, self.population, self.sampled))
+            return mean, mean - z_score * se, mean + z_score * se
+
+        median = _weighted_quantile(y, w, 0.5)
+        below = (y <= median).astype(np.float64)
+        p = np.sum(w * below) / size
+        se = np.sqrt(_stratum_variance((below - p) / size, strata, self.population, self.sampled))
+        low = _weighted_quantile(y, w, max(0.0, 0.5 - z_score * se))
+        high = _weighted_quantile(y, w, min(1.0, 0.5 + z_score * se))
+        return median, low, high
+
+    def _weights(self, strata: np.ndarray) -> np.ndarray:
+        """Population / sample size of each listing's stratum."""
+        return (self.population / np.maximum(self.sampled, 1))[strata]
+
+    def aggregate(
+        self,
+        stat: str,
+        metric: str = "price",
+        group_by: str | None = None,
+        where: dict | None = None,
+        confidence: float = 0.95,
+    ) -> pd.DataFrame:
+        """
+        Estimate an aggregate over property_listings from the sample.
+
+        Args:
+            stat: "mean", "median", "sum" or "count"
+            metric: Key of METRICS (ignored for count)
+            group_by: "state", "property_type" or "status", or None for one row
+            where: Column -> value or list of values (state, property_type,
+                status) or (low, high) range with None for open ends (numeric)
+            confidence: Confidence level of the interval
+
+        Returns:
+            One row per group with estimate, ci_low, ci_high, sample_rows and
+            estimated_rows (estimated listings matching the filter)
+        """
+        if stat not in STATS:
+            raise ValueError(f"Unknown stat {stat!r}; expected one of {STATS}")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; expected one of {list(METRICS)}")
+        z_score = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+        mask = self._mask(where)
+        y_all = np.ones(len(self)) if stat == "count" else self.values[metric]
+        mask &= ~np.isnan(y_all)
+        rows = np.flatnonzero(mask)
+
+        if group_by is None:
+            groups = [(None, rows)]
+        else:
+            labels = np.asarray(self.categories[group_by])[rows]
+            order = np.argsort(labels, kind="stable")
+            names, starts = np.unique(labels[order], return_index=True)
+            groups = zip(names, np.split(rows[order], starts[1:]))
+
+        records = []
+        for name, members in groups:
+            if len(members) == 0:
+                continue
+            strata = self.stratum[members]
+            estimate, low, high = self._estimate(stat, y_all[members], strata, z_score)
+            record = {} if group_by is None else {group_by: name}
+            record.update(
+                estimate=estimate,
+                ci_low=low,
+                ci_high=high,
+                sample_rows=len(members),
+                estimated_rows=float(np.sum(self._weights(strata))),
+                exact=False,
+            )
+            records.append(record)
+        return pd.DataFrame.from_records(records)
+
+
+def _category_expr(column: str) -> sql.Composable:
+    return sql.SQL("COALESCE({}, '')").format(sql.Identifier(column))
+
+
+async def exact_aggregate(
+    connector: AsyncPostgresConnector,
+    stat: str,
+    metric: str = "price",
+    group_by: str | None = None,
+    where: dict | None = None,
+) -> pd.DataFrame:
+    """Same contract as ListingSample.aggregate, computed with a full scan of property_listings."""
+    if stat not in STATS:
+        raise ValueError(f"Unknown stat {stat!r}; expected one of {STATS}")
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; expected one of {list(METRICS)}")
+    expr = sql.SQL(METRICS[metric])
+    aggregate = {
+        "mean": sql.SQL("avg({})::float8"),
+        "median": sql.SQL("percentile_cont(0.5) WITHIN GROUP (ORDER BY {})"),
+        "sum": sql.SQL("sum({})::float8"),
+        "count": sql.SQL("count(*)::float8"),
+    }[stat].format(expr)
+
+    conditions, params = [], []
+    if stat != "count":
+        conditions.append(sql.SQL("{} IS NOT NULL").format(expr))
+    for column, condition in (where or {}).items():
+        if column in CATEGORY_COLUMNS:
+            wanted = condition if isinstance(condition, (list, tuple, set)) else [condition]
+            conditions.append(sql.SQL("{} = ANY(%s)").format(_category_expr(column)))
+            params.append(list(wanted))
+        elif column in METRICS:
+            low, high = condition
+            if low is not None:
+                conditions.append(sql.SQL("{} >= %s").format(sql.SQL(METRICS[column])))
+                params.append(low)
+            if high is not None:
+                conditions.append(sql.SQL("{} <= %s").format(sql.SQL(METRICS[column])))
+                params.append(high)
+        else:
+            raise ValueError(f"Cannot filter on {column!r}")
+
+    group = _category_expr(group_by) if group_by else None
+    query = sql.SQL("SELECT {select} {aggregate}, count(*) FROM property_listings {where} {group}").format(
+        select=group + sql.SQL(",") if group else sql.SQL(""),
+        aggregate=aggregate,
+        where=sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""),
+        group=sql.SQL("GROUP BY 1 ORDER BY 1") if group else sql.SQL(""),
+    )
+    rows = await connector.fetch_all(query, tuple(params))
+
+    records = []
+    for row in rows:
+        *name, estimate, count = row
+        if count == 0:
+            continue
+        record = {group_by: name[0]} if group_by else {}
+        record.update(
+            estimate=estimate,
+            ci_low=estimate,
+            ci_high=estimate,
+            sample_rows=count,
+            estimated_rows=float(count),
+            exact=True,
+        )
+        records.append(record)
+    return pd.DataFrame.from_records(records)
+
+
+async def listing_aggregate(
+    connector: AsyncPostgresConnector,
+    sample: ListingSample,
+    stat: str,
+    metric: str = "price",
+    group_by: str | None = None,
+    where: dict | None = None,
+    exact: bool = False,
+    confidence: float = 0.95,
+) -> pd.DataFrame:
+    """
+    Answer an exploratory aggregate from the sample, or exactly when asked.
+
+    Args:
+        connector: Connected connector, used only when exact is True
+        sample: Loaded ListingSample
+        exact: Run a full scan instead of estimating
+        stat, metric, group_by, where, confidence: As for ListingSample.aggregate
+    """
+    if exact:
+        return await exact_aggregate(connector, stat, metric, group_by, where)
+    return sample.aggregate(stat, metric, group_by, where, confidence)
@@ -6,19 +6,73 @@ CREATE TABLE IF NOT EXISTS public.regions(
     CONSTRAINT regions_pkey PRIMARY KEY (region_id)
 );
 
--- Metro-level time series data
+-- Metro-level time series data, range partitioned by date.
+-- One partition per calendar year is swapped in by partitions.reload_metro;
+-- the default partition only catches dates outside the loaded years.
+-- Partitioned tables cannot use identity columns before PG17, so id is fed by an explicit sequence.
+
+-- Migration: a database created before partitioning has a plain metro_us heap.
+-- Move it (and the names of its identity sequence and constraints) aside so the
+-- partitioned table can be created; its rows are copied back in below.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = 'metro_us' AND c.relkind = 'r'
+    ) THEN
+        ALTER TABLE public.metro_us RENAME TO metro_us_unpartitioned;
+        ALTER SEQUENCE IF EXISTS public.metro_us_id_seq RENAME TO metro_us_unpartitioned_id_seq;
+        ALTER TABLE public.metro_us_unpartitioned RENAME CONSTRAINT metro_us_pkey TO metro_us_unpartitioned_pkey;
+        ALTER TABLE public.metro_us_unpartitioned
+            RENAME CONSTRAINT metro_us_region_date_unique TO metro_us_unpartitioned_region_date_unique;
+        ALTER TABLE public.metro_us_unpartitioned
+            RENAME CONSTRAINT metro_us_region_fk TO metro_us_unpartitioned_region_fk;
+    END IF;
+END $$;
+
+CREATE SEQUENCE IF NOT EXISTS public.metro_us_id_seq AS bigint;
+
 CREATE TABLE IF NOT EXISTS public.metro_us(
-    id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    id bigint NOT NULL DEFAULT nextval('public.metro_us_id_seq'),
     region_id bigint NOT NULL,
     size_rank integer NOT NULL,
     date date NOT NULL,
     avg_cost numeric(15,2),
 
-    CONSTRAINT metro_us_region_date_unique UNIQUE (region_id, date),
+    -- Covers the dashboard's per-region series lookups as index-only scans
+    CONSTRAINT metro_us_region_date_unique UNIQUE (region_id, date) INCLUDE (avg_cost),
     CONSTRAINT metro_us_region_fk
         FOREIGN KEY (region_id)
         REFERENCES public.regions (region_id)
-);
+) PARTITION BY RANGE (date);
+
+ALTER SEQUENCE public.metro_us_id_seq OWNED BY public.metro_us.id;
+
+CREATE TABLE IF NOT EXISTS public.metro_us_default
+    PARTITION OF public.metro_us DEFAULT;
+
+-- Migration, continued: copy the old heap into yearly partitions (created first,
+-- so no rows land in the default partition), then drop it.
+DO $$
+DECLARE
+    y int;
+BEGIN
+    IF to_regclass('public.metro_us_unpartitioned') IS NOT NULL THEN
+        FOR y IN SELECT DISTINCT extract(year FROM date)::int FROM public.metro_us_unpartitioned LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.metro_us FOR VALUES FROM (%L) TO (%L)',
+                'metro_us_y' || y, make_date(y, 1, 1), make_date(y + 1, 1, 1)
+            );
+        END LOOP;
+        INSERT INTO public.metro_us (id, region_id, size_rank, date, avg_cost)
+        SELECT id, region_id, size_rank, date, avg_cost FROM public.metro_us_unpartitioned;
+        PERFORM setval('public.metro_us_id_seq', (SELECT coalesce(max(id), 0) + 1 FROM public.metro_us), false);
+        DROP TABLE public.metro_us_unpartitioned;
+    END IF;
+END $$;
+
+-- Rows arrive in date order, so a BRIN index keeps year/range filters cheap at a fraction of a btree's size
+CREATE INDEX IF NOT EXISTS idx_metro_us_date_brin ON public.metro_us USING brin (date);
 
 -- Individual property listings
 CREATE TABLE IF NOT EXISTS public.property_listings(
@@ -29,7 +83,7 @@ CREATE TABLE IF NOT EXISTS public.property_listings(
     zip text NOT NULL,
     sqft integer,
     beds integer,
-    baths integer,
+    baths numeric(4,1),
     built_year integer,
     property_type text,
     status text,
@@ -41,6 +95,8 @@ CREATE TABLE IF NOT EXISTS public.property_listings(
     parcel text,
     last_change date,
     region_id bigint,
+    -- digest of the mutable columns, compared by listings_merge to find changed rows
+    row_hash bytea,
     CONSTRAINT property_listings_unique UNIQUE (address, city, state, zip),
     CONSTRAINT property_listings_region_fk 
         FOREIGN KEY (region_id) 
@@ -50,4 +106,97 @@ CREATE TABLE IF NOT EXISTS public.property_listings(
 CREATE INDEX IF NOT EXISTS idx_listings_state ON property_listings(state);
 CREATE INDEX IF NOT EXISTS idx_listings_price ON property_listings(price);
 CREATE INDEX IF NOT EXISTS idx_listings_status ON property_listings(status);
-CREATE INDEX IF NOT EXISTS idx_listings_region_id ON property_listings(region_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_listings_region_id ON property_listings(region_id);
+
+ALTER TABLE public.property_listings ADD COLUMN IF NOT EXISTS row_hash bytea;
+-- Half baths ("2.5") are common in the listings feed. Only databases created
+-- with an integer baths column need the rewrite (and its exclusive lock).
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'property_listings' AND column_name = 'baths'
+          AND (data_type <> 'numeric' OR numeric_precision IS DISTINCT FROM 4 OR numeric_scale IS DISTINCT FROM 1)
+    ) THEN
+        ALTER TABLE public.property_listings ALTER COLUMN baths TYPE numeric(4,1);
+    END IF;
+END $$;
+
+-- Append-only history of listing changes written by listings_merge
+CREATE TABLE IF NOT EXISTS public.listing_events(
+    id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    listing_id bigint NOT NULL,
+    event_type text NOT NULL,
+    old_price numeric(15,2),
+    new_price numeric(15,2),
+    old_status text,
+    new_status text,
+    observed_at timestamptz NOT NULL DEFAULT now(),
+    CONSTRAINT listing_events_listing_fk
+        FOREIGN KEY (listing_id)
+        REFERENCES public.property_listings(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_listing_events_listing ON listing_events(listing_id, observed_at);
+CREATE INDEX IF NOT EXISTS idx_listing_events_type ON listing_events(event_type, observed_at);
+
+-- Rows rejected by validation.validate_frame, kept with the rule(s) they failed
+CREATE TABLE IF NOT EXISTS public.load_quarantine(
+    id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    target_table text NOT NULL,
+    reason text NOT NULL,
+    row_data jsonb NOT NULL,
+    quarantined_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_load_quarantine_table ON load_quarantine(target_table, quarantined_at);
+
+-- Pre-rendered dashboard payloads (payload_cache.py). A generation becomes
+-- visible to readers only once every blob in it is written and ready is set.
+CREATE TABLE IF NOT EXISTS public.payload_generations(
+    generation bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    built_at timestamptz NOT NULL DEFAULT now(),
+    ready boolean NOT NULL DEFAULT false
+);
+
+CREATE TABLE IF NOT EXISTS public.dashboard_payloads(
+    generation bigint NOT NULL,
+    payload_key text NOT NULL,
+    format text NOT NULL,
+    body bytea NOT NULL,
+    CONSTRAINT dashboard_payloads_pkey PRIMARY KEY (generation, payload_key, format),
+    CONSTRAINT dashboard_payloads_generation_fk
+        FOREIGN KEY (generation)
+        REFERENCES public.payload_generations(generation)
+        ON DELETE CASCADE
+);
+
+-- Top-k most similar regions by price trajectory, rebuilt by similarity.py on every ingest
+CREATE TABLE IF NOT EXISTS public.region_neighbors(
+    region_id bigint NOT NULL,
+    rank smallint NOT NULL,
+    neighbor_id bigint NOT NULL,
+    score real NOT NULL,
+    CONSTRAINT region_neighbors_pkey PRIMARY KEY (region_id, rank)
+);
+
+-- Stratified sample of property_listings (sampling.py), rebuilt after every
+-- listings load for approximate exploratory aggregates
+CREATE TABLE IF NOT EXISTS public.listing_sample(
+    state text NOT NULL,
+    property_type text NOT NULL,
+    status text,
+    price numeric(15,2),
+    sqft integer,
+    beds integer,
+    baths numeric(4,1),
+    built_year integer
+);
+
+CREATE TABLE IF NOT EXISTS public.listing_sample_strata(
+    state text NOT NULL,
+    property_type text NOT NULL,
+    -- listings in the table
+    population bigint NOT NULL,
+    CONSTRAINT listing_sample_strata_pkey PRIMARY KEY (state, property_type)
+);
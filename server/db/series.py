@@ -0,0 +1,254 @@
+# series.py
+import csv
+import math
+import re
+import sys
+from array import array
+from datetime import date
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+import numpy as np
+
+# pandas is only needed for to_frame (validation); loaders that just copy rows skip it
+if TYPE_CHECKING:
+    import pandas as pd
+
+DATE_COLUMN_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+NAN = float("nan")
+
+
+class RegionTable:
+    """
+    Region metadata stored once per region in parallel arrays.
+
+    Names and states are interned, so the few dozen distinct state strings
+    are shared by every region instead of being copied per row.
+    """
+
+    __slots__ = ("region_ids", "size_ranks", "names", "states")
+
+    def __init__(self):
+        self.region_ids = array("q")
+        self.size_ranks = array("l")
+        self.names: list[str] = []
+        self.states: list[str] = []
+
+    def append(self, region_id: int, size_rank: int, name: str, state: str) -> None:
+        self.region_ids.append(region_id)
+        self.size_ranks.append(size_rank)
+        self.names.append(sys.intern(name))
+        self.states.append(sys.intern(state))
+
+    def __len__(self) -> int:
+        return len(self.region_ids)
+
+    def rows(self) -> Iterator[tuple[int, str, str]]:
+        """(region_id, region_name, state_name) tuples for the regions table."""
+        return zip(self.region_ids, self.names, self.states)
+
+
+class SeriesTable:
+    """
+    Compact in-memory form of a wide ZHVI file: one region per row, one month per column.
+
+    Values live in a single flat array('d') of regions x months (8 bytes per
+    cell, NaN where Zillow has no value); months are integer offsets
+    (year * 12 + month - 1) plus the day Zillow stamps each column with.
+    COPY tuples and DataFrames are produced on demand from these buffers.
+
+    Rows and cells that fail to parse are not loaded; they are kept in
+    `rejects` as records with a "reason" for quarantine.
+    """
+
+    __slots__ = ("regions", "months", "days", "values", "rejects")
+
+    def __init__(
+        self,
+        regions: RegionTable,
+        months: array,
+        days: array,
+        values: array,
+        rejects: list[dict] | None = None,
+    ):
+        self.regions = regions
+        self.months = months
+        self.days = days
+        self.values = values
+        self.rejects = rejects if rejects is not None else []
+
+    @classmethod
+    def from_csv(cls, lines: Iterable[str]) -> "SeriesTable":
+        """
+        Parse a Zillow wide CSV (Metro, County, Zip... files).
+
+        Columns named like YYYY-MM-DD are months; RegionID, SizeRank,
+        RegionName and StateName are read and any other metadata is ignored.
+        Rows with the wrong number of fields or an unreadable RegionID or
+        SizeRank are skipped, and cells that aren't numbers ("N/A") are
+        left empty; both are recorded in `rejects`.
+        """
+        reader = csv.reader(lines)
+        header = next(reader)
+        date_positions = [i for i, name in enumerate(header) if DATE_COLUMN_RE.match(name)]
+        first, last = date_positions[0], date_positions[-1] + 1
+        if date_positions != list(range(first, last)):
+            raise ValueError("Expected the month columns to be contiguous")
+
+        column = {name: i for i, name in enumerate(header)}
+        id_col, rank_col = column["RegionID"], column["SizeRank"]
+        name_col, state_col = column["RegionName"], column["StateName"]
+
+        months = array("l")
+        days = array("b")
+        for name in header[first:last]:
+            y, m, d = (int(part) for part in name.split("-"))
+            date(y, m, d)   # raises on an impossible column date
+            months.append(y * 12 + m - 1)
+            days.append(d)
+
+        regions = RegionTable()
+        values = array("d")
+        rejects: list[dict] = []
+        width = len(header)
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            if len(row) != width:
+                rejects.append({"line": line, "fields": row, "reason": f"{len(row)} fields, expected {width}"})
+                continue
+            try:
+                region_id, size_rank = int(row[id_col]), int(row[rank_col])
+            except ValueError:
+                rejects.append({"line": line, "fields": row, "reason": "RegionID or SizeRank invalid"})
+                continue
+
+            cells = row[first:last]
+            try:
+                # Built as a list first so a bad cell can't leave the buffer half-extended
+                values.extend([float(v) if v else NAN for v in cells])
+            except ValueError:
+                for j, v in enumerate(cells):
+                    try:
+                        values.append(float(v) if v else NAN)
+                    except ValueError:
+                        values.append(NAN)
+                        rejects.append({
+                            "line": line,
+                            "region_id": region_id,
+                            "date": header[first + j],
+                            "avg_cost": v,
+                            "reason": "avg_cost invalid",
+                        })
+            regions.append(region_id, size_rank, row[name_col], row[state_col])
+
+        return cls(regions, months, days, values, rejects)
+
+    @property
+    def n_months(self) -> int:
+        return len(self.months)
+
+    def matrix(self) -> np.ndarray:
+        """Writable regions x months view of the value buffer (no copy)."""
+        return np.frombuffer(self.values, dtype=np.float64).reshape(len(self.regions), self.n_months)
+
+    def column_dates(self) -> np.ndarray:
+        """The date of every month column, as datetime64[D]."""
+        months = np.asarray(self.months, dtype=np.int64) - 1970 * 12
+        days = np.asarray(self.days, dtype=np.int64) - 1
+        return months.astype("datetime64[M]").astype("datetime64[D]") + days
+
+    def n_cells(self) -> int:
+        """Number of non-empty cells."""
+        return int(np.count_nonzero(~np.isnan(np.frombuffer(self.values, dtype=np.float64))))
+
+    def cells(self) -> np.ndarray:
+        """Flat positions of the non-empty cells, region-major."""
+        return np.flatnonzero(~np.isnan(np.frombuffer(self.values, dtype=np.float64)))
+
+    def _dates(self) -> list[date]:
+        return [date(m // 12, m % 12 + 1, d) for m, d in zip(self.months, self.days)]
+
+    def years(self) -> set[int]:
+        return {m // 12 for m in self.months}
+
+    def region_rows(self) -> list[tuple[int, str, str]]:
+        """Deduplicated (region_id, region_name, state_name) tuples for the regions table."""
+        return list({r[0]: r for r in self.regions.rows()}.values())
+
+    def metro_rows(self, year: int | None = None) -> Iterator[tuple]:
+        """
+        Yield (region_id, size_rank, date, avg_cost) COPY tuples, skipping empty cells.
+
+        Args:
+            year: Only yield months of this calendar year (one partition's worth)
+        """
+        dates = self._dates()
+        columns = [j for j, m in enumerate(self.months) if year is None or m // 12 == year]
+        n = self.n_months
+        values = self.values
+        for i, (region_id, size_rank) in enumerate(zip(self.regions.region_ids, self.regions.size_ranks)):
+            base = i * n
+            for j in columns:
+                v = values[base + j]
+                if not math.isnan(v):
+                    yield (region_id, size_rank, dates[j], v)
+
+    def zillow_rows(self) -> Iterator[tuple]:
+        """
+        Yield denormalized zillow_data tuples, skipping empty cells.
+
+        Each tuple is (id, region_id, size_rank, region_name, state_name, date,
+        avg_cost). Ids count up from 1, which is safe because every load
+        replaces the whole table.
+        """
+        dates = self._dates()
+        n = self.n_months
+        values = self.values
+        regions = self.regions
+        next_id = 1
+        for i, (region_id, size_rank) in enumerate(zip(regions.region_ids, regions.size_ranks)):
+            name, state = regions.names[i], regions.states[i]
+            base = i * n
+            for j in range(n):
+                v = values[base + j]
+                if not math.isnan(v):
+                    yield (next_id, region_id, size_rank, name, state, dates[j], v)
+                    next_id += 1
+
+    def to_frame(self, cells: np.ndarray | None = None) -> "pd.DataFrame":
+        """
+        Long-format DataFrame (region_id, size_rank, date, avg_cost).
+
+        Built with NumPy straight from the buffers. The index is each cell's
+        position in the flat value array, which drop_cells accepts back.
+
+        Args:
+            cells: Flat cell positions to include (default: every non-empty cell)
+        """
+        import pandas as pd
+
+        if cells is None:
+            cells = self.cells()
+        region_pos, month_pos = np.divmod(cells, self.n_months)
+        return pd.DataFrame(
+            {
+                "region_id": np.frombuffer(self.regions.region_ids, dtype=np.int64)[region_pos],
+                "size_rank": np.asarray(self.regions.size_ranks, dtype=np.int64)[region_pos],
+                "date": self.column_dates()[month_pos],
+                "avg_cost": np.frombuffer(self.values, dtype=np.float64)[cells],
+            },
+            index=cells,
+        )
+
+    def drop_cells(self, cells: Iterable[int]) -> None:
+        """Blank out cells (positions from to_frame's index) so they are never loaded."""
+        np.frombuffer(self.values, dtype=np.float64)[np.asarray(cells, dtype=np.int64)] = NAN
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the buffers, excluding the shared interned strings."""
+        return (
+            self.values.itemsize * len(self.values)
+            + self.months.itemsize * len(self.months)
+            + len(self.days)
+            + (self.regions.region_ids.itemsize + self.regions.size_ranks.itemsize) * len(self.regions)
+        )
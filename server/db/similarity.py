@@ -0,0 +1,215 @@
+# similarity.py
+import logging
+
+import numpy as np
+import pandas as pd
+
+from postgres_connector import AsyncPostgresConnector
+from series import SeriesTable
+
+logger = logging.getLogger(__name__)
+
+NEIGHBORS_TABLE = "region_neighbors"
+NEIGHBOR_COLUMNS = ["region_id", "rank", "neighbor_id", "score"]
+
+TOP_K = 10
+WINDOW_MONTHS = 120       # trailing window the trajectories are compared over
+MIN_OBSERVATIONS = 24     # regions with less history than this are left out
+BLOCK_ROWS = 1024         # rows scored per matrix product, bounds memory at BLOCK_ROWS x regions
+
+NEIGHBORS_SQL = """
+SELECT n.neighbor_id, r.region_name, r.state_name, n.score
+FROM region_neighbors n
+JOIN regions r ON r.region_id = n.neighbor_id
+WHERE n.region_id = %s
+ORDER BY n.rank
+"""
+
+
+def trajectory_matrix(
+    series: pd.DataFrame,
+    window: int = WINDOW_MONTHS,
+    min_observations: int = MIN_OBSERVATIONS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Build the z-normalized region x month matrix of monthly log returns.
+
+    Returns are compared instead of price levels because nearly every metro
+    trends upward, which would make raw levels correlate with everything.
+    Each row is z-normalized over the months it has, and missing months are
+    set to 0 (the row mean), so a plain dot product divided by the window
+    length approximates the Pearson correlation.
+
+    Args:
+        series: metro_us rows with region_id, date and avg_cost
+        window: Trailing number of months to compare
+        min_observations: Minimum non-missing returns for a region to be included
+
+    Returns:
+        (region_ids, matrix) with matrix of shape (regions, window), float32
+    """
+    wide = series.pivot_table(index="region_id", columns="date", values="avg_cost", aggfunc="last")
+    wide = wide.reindex(columns=sorted(wide.columns)).astype(float)
+    return level_trajectories(wide.index.to_numpy(), wide.to_numpy(), window, min_observations)
+
+
+def level_trajectories(
+    region_ids: np.ndarray,
+    levels: np.ndarray,
+    window: int = WINDOW_MONTHS,
+    min_observations: int = MIN_OBSERVATIONS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """trajectory_matrix over an existing regions x months array of levels, in date order."""
+    # Only the trailing window of returns is used, so only its levels are transformed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(levels[:, -(window + 1):]), axis=1)
+    returns[~np.isfinite(returns)] = np.nan
+
+    keep = np.sum(~np.isnan(returns), axis=1) >= min_observations
+    returns = returns[keep]
+
+    mean = np.nanmean(returns, axis=1, keepdims=True)
+    std = np.nanstd(returns, axis=1, keepdims=True)
+    std[std == 0] = 1.0
+    z = np.nan_to_num((returns - mean) / std, nan=0.0)
+    return region_ids[keep], z.astype(np.float32)
+
+
+def reduce_dimensions(matrix: np.ndarray, n_components: int) -> np.ndarray:
+    """
+    Project rows onto their top principal components, rescaled so that dot
+    products divided by n_components are cosine similarities. Cuts scoring
+    cost by a factor of window / n_components.
+    """
+    centered = matrix - matrix.mean(axis=0, keepdims=True)
+    _, _, vt = np.linalg.svd(centered, full_matrices=False)
+    projected = matrix @ vt[:n_components].T
+    norms = np.linalg.norm(projected, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (projected / norms * np.sqrt(n_components)).astype(np.float32)
+
+
+def top_k_neighbors(matrix: np.ndarray, k: int = TOP_K) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k most correlated rows for every row.
+
+    Scores are computed BLOCK_ROWS rows at a time as one matrix product, and
+    argpartition picks each row's k best without a full sort.
+
+    Args:
+        matrix: z-normalized rows (from trajectory_matrix or reduce_dimensions)
+        k: Neighbors per row
+
+    Returns:
+        (indices, scores), both shaped (rows, k), best first; k is capped at
+        rows - 1, so fewer than two rows give empty (rows, 0) arrays
+    """
+    n, width = matrix.shape
+    k = max(min(k, n - 1), 0)
+    indices = np.empty((n, k), dtype=np.int64)
+    scores = np.empty((n, k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+
+    for start in range(0, n, BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, n)
+        block = matrix[start:stop] @ matrix.T / width
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf   # never your own neighbor
+
+        part = np.argpartition(block, -k, axis=1)[:, -k:]
+        part_scores = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(-part_scores, axis=1)
+        indices[start:stop] = np.take_along_axis(part, order, axis=1)
+        scores[start:stop] = np.take_along_axis(part_scores, order, axis=1)
+
+    return indices, scores
+
+
+class SimilarityIndex:
+    """In-memory top-k neighbor table for answering "metros that move like this one"."""
+
+    def __init__(self, region_ids: np.ndarray, indices: np.ndarray, scores: np.ndarray):
+        self.region_ids = region_ids
+        self.indices = indices
+        self.scores = scores
+        self._position = {int(r): i for i, r in enumerate(region_ids)}
+
+    @classmethod
+    def build(
+        cls,
+        series: pd.DataFrame,
+        k: int = TOP_K,
+        n_components: int | None = None,
+        window: int = WINDOW_MONTHS,
+    ) -> "SimilarityIndex":
+        """
+        Score every region against every other and keep the top k.
+
+        Args:
+            series: metro_us rows with region_id, date and avg_cost
+            k: Neighbors kept per region
+            n_components: Reduce to this many principal components first (approximate, for zip-level scale)
+            window: Trailing number of months to compare
+        """
+        return cls._from_trajectories(*trajectory_matrix(series, window), k, n_components)
+
+    @classmethod
+    def from_table(
+        cls,
+        table: SeriesTable,
+        k: int = TOP_K,
+        n_components: int | None = None,
+        window: int = WINDOW_MONTHS,
+    ) -> "SimilarityIndex":
+        """build() straight from a validated SeriesTable's regions x months buffer, without pivoting."""
+        dates = table.column_dates()
+        levels = table.matrix()
+        if np.any(dates[1:] < dates[:-1]):
+            levels = levels[:, np.argsort(dates, kind="stable")]
+        region_ids = np.frombuffer(table.regions.region_ids, dtype=np.int64).copy()
+        trajectories = level_trajectories(region_ids, levels, window)
+        return cls._from_trajectories(*trajectories, k, n_components)
+
+    @classmethod
+    def _from_trajectories(
+        cls,
+        region_ids: np.ndarray,
+        matrix: np.ndarray,
+        k: int,
+        n_components: int | None,
+    ) -> "SimilarityIndex":
+        if n_components is not None and n_components < matrix.shape[1] and len(matrix) > 1:
+            matrix = reduce_dimensions(matrix, n_components)
+        indices, scores = top_k_neighbors(matrix, k)
+        logger.info(f"Built similarity index over {len(region_ids)} regions")
+        return cls(region_ids, indices, scores)
+
+    def neighbors(self, region_id: int, k: int | None = None) -> list[tuple[int, float]]:
+        """(neighbor region_id, correlation) pairs, most similar first; empty if the region isn't indexed."""
+        position = self._position.get(int(region_id))
+        if position is None:
+            return []
+        found = self.indices[position][:k]
+        return [
+            (int(self.region_ids[i]), float(s))
+            for i, s in zip(found, self.scores[position][:k])
+        ]
+
+    def rows(self) -> list[tuple]:
+        """COPY rows for the region_neighbors table."""
+        k = self.indices.shape[1]
+        region = np.repeat(self.region_ids, k)
+        rank = np.tile(np.arange(1, k + 1), len(self.region_ids))
+        neighbor = self.region_ids[self.indices.ravel()]
+        score = np.round(self.scores.ravel().astype(float), 4)
+        return list(zip(region.tolist(), rank.tolist(), neighbor.tolist(), score.tolist()))
+
+
+async def store_neighbors(connector: AsyncPostgresConnector, index: SimilarityIndex) -> int:
+    """Replace region_neighbors with the index's top-k lists in one atomic swap."""
+    return await connector.reload_table(NEIGHBORS_TABLE, index.rows(), NEIGHBOR_COLUMNS)
+
+
+async def fetch_neighbors(connector: AsyncPostgresConnector, region_id: int) -> list[dict]:
+    """Precomputed neighbors of a region, most similar first."""
+    return await connector.fetch_all(NEIGHBORS_SQL, (region_id,), as_dict=True, prepare=True)
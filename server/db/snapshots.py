@@ -0,0 +1,265 @@
+# snapshots.py
+import csv
+import io
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from series import DATE_COLUMN_RE
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path("./archive")
+
+ZHVI_DATASET = "zhvi_metro"
+LISTINGS_DATASET = "listings"
+
+COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 128 * 1024
+
+# Natural key and compared values per dataset, for diff_snapshots
+DIFF_KEYS = {
+    ZHVI_DATASET: (["RegionID", "date"], ["avg_cost"]),
+    LISTINGS_DATASET: (["address", "city", "state", "zip"], ["price", "status"]),
+}
+
+# Datasets archived wide (one column per month), and the columns identifying a row
+WIDE_ID_COLUMNS = {ZHVI_DATASET: ["RegionID"]}
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    dataset: str
+    fetch_date: date
+    path: Path
+
+
+def _partition(dataset: str, fetch_date: date, root: Path) -> Path:
+    return root / f"dataset={dataset}" / f"fetch_date={fetch_date.isoformat()}"
+
+
+def _read_header(f: io.TextIOBase, delimiter: str) -> list[str]:
+    """
+    Column names of a delimited file, unquoted by the csv module.
+
+    `f` must be opened as utf-8-sig: a BOM left in front of a quoted first
+    name would stop the csv module from unquoting it.
+    """
+    return next(csv.reader(f, delimiter=delimiter), [])
+
+
+def _archive_text(
+    source: Path | pa.NativeFile,
+    header: list[str],
+    delimiter: str,
+    dataset: str,
+    name: str,
+    fetch_date: date | None,
+    root: Path,
+) -> tuple[Path, int]:
+    """Stream a delimited file into `name`.parquet with every column as text."""
+    fetch_date = fetch_date or date.today()
+    dest = _partition(dataset, fetch_date, root) / f"{name}.parquet"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+
+    # The header is parsed here, not by pyarrow, so every column can be declared as
+    # text up front; inferred types would drop leading zeros ("01234") and reformat numbers
+    reader = pacsv.open_csv(
+        source,
+        read_options=pacsv.ReadOptions(column_names=header, skip_rows=1),
+        parse_options=pacsv.ParseOptions(delimiter=delimiter, newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types={column: pa.string() for column in header},
+            strings_can_be_null=False,
+        ),
+    )
+    rows = 0
+    with pq.ParquetWriter(tmp, reader.schema, compression=COMPRESSION, use_dictionary=True) as writer:
+        for batch in reader:
+            writer.write_batch(batch, row_group_size=ROW_GROUP_SIZE)
+            rows += batch.num_rows
+    os.replace(tmp, dest)
+    return dest, rows
+
+
+def archive_delimited(
+    source: Path,
+    dataset: str = LISTINGS_DATASET,
+    fetch_date: date | None = None,
+    root: Path = ARCHIVE_DIR,
+) -> Path:
+    """
+    Convert a downloaded CSV/TSV to Parquet without loading it all into memory.
+
+    Every column is kept as text exactly as it appeared in the file, so the
+    snapshot reproduces the source even for rows that later fail validation.
+    Each source file becomes its own file in the day's partition.
+
+    Returns:
+        Path of the written file
+    """
+    source = Path(source)
+    delimiter = "," if source.suffix.lower() == ".csv" else "\t"
+    with open(source, encoding="utf-8-sig", newline="") as f:
+        header = _read_header(f, delimiter)
+    dest, rows = _archive_text(source, header, delimiter, dataset, source.stem, fetch_date, root)
+
+    logger.info(
+        f"Archived {rows} {dataset} rows from {source.name} to {dest} "
+        f"({source.stat().st_size / 1e6:.1f} MB -> {dest.stat().st_size / 1e6:.1f} MB)"
+    )
+    return dest
+
+
+def archive_csv_bytes(
+    data: bytes,
+    name: str,
+    dataset: str = ZHVI_DATASET,
+    fetch_date: date | None = None,
+    root: Path = ARCHIVE_DIR,
+) -> Path:
+    """
+    Archive a CSV fetched into memory, as archive_delimited does for files.
+
+    Called with the body exactly as downloaded, before it is parsed, so
+    columns the loader ignores (RegionType) and rows or cells it rejects are
+    kept too. A second fetch on the same day replaces that day's snapshot.
+
+    Args:
+        data: Raw CSV body
+        name: File name the snapshot is stored under (its stem is used)
+
+    Returns:
+        Path of the written file
+    """
+    with io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="") as f:
+        header = _read_header(f, ",")
+    dest, rows = _archive_text(
+        pa.BufferReader(data), header, ",", dataset, Path(name).stem, fetch_date, root
+    )
+    logger.info(f"Archived {rows} {dataset} rows to {dest} ({dest.stat().st_size / 1e6:.1f} MB)")
+    return dest
+
+
+def list_snapshots(dataset: str, root: Path = ARCHIVE_DIR) -> list[Snapshot]:
+    """Archived snapshots of a dataset, oldest first."""
+    base = root / f"dataset={dataset}"
+    if not base.exists():
+        return []
+    snapshots = []
+    for partition in base.glob("fetch_date=*"):
+        if any(partition.glob("*.parquet")):
+            fetch_date = datetime.strptime(partition.name.split("=", 1)[1], "%Y-%m-%d").date()
+            snapshots.append(Snapshot(dataset, fetch_date, partition))
+    return sorted(snapshots, key=lambda s: s.fetch_date)
+
+
+def find_snapshot(dataset: str, as_of: date | None = None, root: Path = ARCHIVE_DIR) -> Snapshot:
+    """
+    The snapshot that was current on `as_of`: the latest one fetched on or before it.
+
+    Raises:
+        LookupError: If no snapshot is that old
+    """
+    snapshots = [s for s in list_snapshots(dataset, root) if as_of is None or s.fetch_date <= as_of]
+    if not snapshots:
+        raise LookupError(f"No {dataset} snapshot archived on or before {as_of or 'today'}")
+    return snapshots[-1]
+
+
+def read_snapshot(
+    dataset: str,
+    as_of: date | None = None,
+    columns: list[str] | None = None,
+    filters: ds.Expression | list | None = None,
+    root: Path = ARCHIVE_DIR,
+) -> pd.DataFrame:
+    """
+    Load a dataset as it was fetched on a given day.
+
+    Only the requested columns are decoded, and filters are pushed down to
+    the Parquet reader, which skips row groups whose min/max statistics
+    cannot match.
+
+    Args:
+        dataset: Dataset name, e.g. ZHVI_DATASET or LISTINGS_DATASET
+        as_of: Read the latest snapshot fetched on or before this date (None for the newest)
+        columns: Columns to read (None for all)
+        filters: A pyarrow.dataset expression, e.g. ds.field("StateName") == "TX",
+            or DNF tuples such as [("state", "in", ["TX", "OK"])]
+        root: Archive directory
+
+    Returns:
+        The snapshot's rows, every column as text as it was fetched
+    """
+    snapshot = find_snapshot(dataset, as_of, root)
+    if isinstance(filters, list):
+        filters = pq.filters_to_expression(filters)
+    data = ds.dataset(sorted(snapshot.path.glob("*.parquet")), format="parquet")
+    return data.to_table(columns=columns, filter=filters).to_pandas()
+
+
+def _months_long(frame: pd.DataFrame, ids: list[str], value: str) -> pd.DataFrame:
+    """Melt a wide snapshot's month columns into (ids..., date, value), dropping empty cells."""
+    months = [c for c in frame.columns if DATE_COLUMN_RE.match(c)]
+    long = frame.melt(id_vars=ids, value_vars=months, var_name="date", value_name=value)
+    return long[long[value] != ""]
+
+
+def diff_snapshots(
+    dataset: str,
+    old: date,
+    new: date | None = None,
+    filters: ds.Expression | list | None = None,
+    root: Path = ARCHIVE_DIR,
+) -> pd.DataFrame:
+    """
+    Rows added, removed or changed between two snapshots of a dataset.
+
+    Values are compared as archived, i.e. as text. Zillow files are compared
+    month by month, so "changed" rows are revisions of history (the same
+    region and month with a different value) and a newly published month
+    shows up as "added".
+
+    Args:
+        dataset: A dataset listed in DIFF_KEYS
+        old: Snapshot current on this date
+        new: Snapshot current on this date (None for the newest)
+        filters: Pushed down to both reads, as in read_snapshot
+
+    Returns:
+        Key columns, then <value>_old and <value>_new for each compared value,
+        and a "change" column: "added", "removed" or "changed"
+    """
+    key, values = DIFF_KEYS[dataset]
+    if dataset in WIDE_ID_COLUMNS:
+        # Month columns differ between snapshots, so read them all and compare in long form
+        ids = WIDE_ID_COLUMNS[dataset]
+        before = _months_long(read_snapshot(dataset, old, None, filters, root), ids, values[0])
+        after = _months_long(read_snapshot(dataset, new, None, filters, root), ids, values[0])
+    else:
+        before = read_snapshot(dataset, old, key + values, filters, root)
+        after = read_snapshot(dataset, new, key + values, filters, root)
+
+    merged = before.merge(after, on=key, how="outer", suffixes=("_old", "_new"), indicator=True)
+    changed = np.zeros(len(merged), dtype=bool)
+    for v in values:
+        o, n = merged[f"{v}_old"], merged[f"{v}_new"]
+        changed |= ((o != n) & ~(o.isna() & n.isna())).to_numpy()
+
+    merged["change"] = np.select(
+        [merged["_merge"] == "right_only", merged["_merge"] == "left_only", changed],
+        ["added", "removed", "changed"],
+        default="",
+    )
+    return merged[merged["change"] != ""].drop(columns="_merge").reset_index(drop=True)
@@ -0,0 +1,284 @@
+# validation.py
+import json
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from series import SeriesTable
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_TABLE = "load_quarantine"
+
+# numeric(15,2) holds 13 integer digits
+NUMERIC_15_2_MAX = 1e13 - 0.01
+INT4_MAX = 2_147_483_647
+
+JUMP_BLOCK_ROWS = 1024     # regions scored at a time, bounds series_jumps temporaries
+
+
+@dataclass(frozen=True)
+class Column:
+    """
+    Validation rule for one target column.
+
+    kind is "int", "float", "date" or "text". Values that fail to parse or fall
+    outside [min, max] reject the row, unless invalid="null", in which case
+    they are loaded as NULL instead.
+    """
+    kind: str
+    nullable: bool = True
+    min: float | None = None
+    max: float | None = None
+    invalid: str = "reject"
+
+
+LISTINGS_SCHEMA = {
+    "address": Column("text", nullable=False),
+    "city": Column("text", nullable=False),
+    "state": Column("text", nullable=False),
+    "zip": Column("text", nullable=False),
+    "sqft": Column("int", min=0, max=INT4_MAX),
+    "beds": Column("int", min=0, max=1000),
+    "baths": Column("float", min=0, max=999.9),
+    "built_year": Column("int", min=1600, max=2100),
+    "property_type": Column("text"),
+    "status": Column("text"),
+    "price": Column("float", min=0, max=NUMERIC_15_2_MAX),
+    "agent": Column("text"),
+    "broker": Column("text"),
+    "lat": Column("float", min=-90, max=90),
+    "lon": Column("float", min=-180, max=180),
+    "parcel": Column("text"),
+    "last_change": Column("date", invalid="null"),
+}
+
+METRO_SCHEMA = {
+    "region_id": Column("int", nullable=False, min=1),
+    "size_rank": Column("int", nullable=False, min=0, max=INT4_MAX),
+    "date": Column("date", nullable=False),
+    "avg_cost": Column("float", min=0, max=NUMERIC_15_2_MAX),
+}
+
+
+def _missing(raw: pd.Series) -> pd.Series:
+    # read_csv(dtype=str) gives object or string dtype depending on the pandas version
+    if raw.dtype == object or pd.api.types.is_string_dtype(raw.dtype):
+        return raw.isna() | (raw.astype(str).str.strip() == "")
+    return raw.isna()
+
+
+def _parse(raw: pd.Series, kind: str) -> pd.Series:
+    if kind == "int":
+        return pd.to_numeric(raw, errors="coerce")
+    if kind == "float":
+        # to_numeric returns int64 when every value in the chunk is integral
+        return pd.to_numeric(raw, errors="coerce").astype("float64")
+    if kind == "date":
+        return pd.to_datetime(raw, errors="coerce", format="%Y-%m-%d")
+    return raw.astype(object)
+
+
+def validate_frame(df: pd.DataFrame, schema: dict[str, Column]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Check a whole chunk against a table schema with vectorized masks.
+
+    Each column is parsed once for the entire chunk and every rule becomes a
+    boolean mask, so no Python code runs per row.
+
+    Args:
+        df: Raw chunk; values may be strings straight from the source file
+        schema: Column name to rule, in target-table order
+
+    Returns:
+        (valid, rejects): valid holds the parsed schema columns of passing rows,
+        typed for COPY; rejects holds the original failing rows plus a
+        "reason" column naming every failed rule
+    """
+    parsed = {}
+    reasons = np.full(len(df), "", dtype=object)
+
+    for name, rule in schema.items():
+        if name not in df:
+            raw = pd.Series(None, index=df.index, dtype=object)
+        else:
+            raw = df[name]
+
+        missing = _missing(raw)
+        values = _parse(raw.where(~missing), rule.kind)
+
+        bad = values.isna() & ~missing
+        if rule.kind == "int":
+            bad |= values.notna() & (values % 1 != 0)
+        if rule.min is not None:
+            bad |= values < rule.min
+        if rule.max is not None:
+            bad |= values > rule.max
+
+        if rule.invalid == "null":
+            values = values.where(~bad)
+        elif bad.any():
+            reasons = reasons + np.where(bad.to_numpy(), f"{name} invalid; ", "")
+
+        if not rule.nullable:
+            null = missing.to_numpy()
+            if null.any():
+                reasons = reasons + np.where(null, f"{name} missing; ", "")
+
+        if rule.kind == "int":
+            values = values.astype("Int64")
+        elif rule.kind == "date":
+            values = values.dt.date.astype(object).where(values.notna(), None)
+        parsed[name] = values
+
+    rejected = reasons != ""
+    valid = pd.DataFrame(parsed, index=df.index)[~rejected]
+    rejects = df[rejected].assign(reason=[r.rstrip("; ") for r in reasons[rejected]])
+    return valid, rejects
+
+
+def flag_jumps(
+    df: pd.DataFrame,
+    sigma: float = 6.0,
+    key: str = "region_id",
+    date: str = "date",
+    value: str = "avg_cost",
+) -> pd.Series:
+    """
+    Flag month-over-month changes more than `sigma` standard deviations from
+    that series' typical change.
+
+    Args:
+        df: Long-format series (one row per key and date)
+        sigma: Threshold in standard deviations
+        key, date, value: Column names
+
+    Returns:
+        Boolean mask aligned with df
+    """
+    ordered = df.sort_values([key, date])
+    change = ordered.groupby(key)[value].pct_change()
+    grouped = change.groupby(ordered[key])
+    z = (change - grouped.transform("mean")) / grouped.transform("std")
+    return (z.abs() > sigma).reindex(df.index, fill_value=False)
+
+
+def _out_of_range(values: np.ndarray, rule: Column) -> np.ndarray:
+    """Mask of present values outside a rule's bounds (infinities always are)."""
+    bad = np.isinf(values)
+    if rule.min is not None:
+        bad |= values < rule.min
+    if rule.max is not None:
+        bad |= values > rule.max
+    return bad
+
+
+def validate_series(table: SeriesTable, schema: dict[str, Column] = METRO_SCHEMA) -> pd.DataFrame:
+    """
+    Check a wide SeriesTable against the metro_us rules in place.
+
+    The rules run as NumPy masks over the regions x months buffer, so no
+    long-format frame is built: a region with an out-of-range region_id or
+    size_rank loses all its cells, and out-of-range values lose only theirs.
+    Rejected cells are blanked so they are never loaded.
+
+    Args:
+        table: Parsed series; modified in place
+        schema: Rules for region_id, size_rank and avg_cost
+
+    Returns:
+        Rejected cells (region_id, size_rank, date, avg_cost, reason) followed
+        by the rows and cells from_csv could not parse
+    """
+    values = table.matrix()
+    present = ~np.isnan(values)
+
+    region_reasons = np.full(len(table.regions), "", dtype=object)
+    for name, column in (("region_id", table.regions.region_ids), ("size_rank", table.regions.size_ranks)):
+        bad = _out_of_range(np.asarray(column, dtype=np.float64), schema[name])
+        region_reasons = region_reasons + np.where(bad, f"{name} invalid; ", "")
+
+    with np.errstate(invalid="ignore"):
+        bad_value = present & _out_of_range(values, schema["avg_cost"])
+    rejected = present & ((region_reasons != "")[:, None] | bad_value)
+
+    cells = np.flatnonzero(rejected)
+    reasons = region_reasons[cells // table.n_months] + np.where(bad_value.ravel()[cells], "avg_cost invalid; ", "")
+    rejects = table.to_frame(cells).assign(reason=[r.rstrip("; ") for r in reasons])
+    table.drop_cells(cells)
+
+    if table.rejects:
+        rejects = pd.concat([rejects.astype(object), pd.DataFrame(table.rejects, dtype=object)], ignore_index=True)
+    return rejects
+
+
+def series_jumps(table: SeriesTable, sigma: float = 6.0) -> pd.DataFrame:
+    """
+    flag_jumps over a wide SeriesTable: cells whose change from the region's
+    previous value is more than `sigma` standard deviations from that
+    region's typical change.
+
+    Regions are scored JUMP_BLOCK_ROWS at a time, so the temporaries stay
+    small however many regions the file has.
+
+    Returns:
+        The flagged cells (region_id, size_rank, date, avg_cost)
+    """
+    matrix = table.matrix()
+    n_regions, n_months = matrix.shape
+    flagged = []
+
+    for start in range(0, n_regions, JUMP_BLOCK_ROWS):
+        values = matrix[start:start + JUMP_BLOCK_ROWS]
+        present = ~np.isnan(values)
+
+        # Position of each cell's previous non-empty month, as pct_change over the long series sees it
+        seen = np.maximum.accumulate(np.where(present, np.arange(n_months), -1), axis=1)
+        previous = np.full_like(seen, -1)
+        previous[:, 1:] = seen[:, :-1]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            prior = np.take_along_axis(values, np.maximum(previous, 0), axis=1)
+            change = np.where(present & (previous >= 0), values / prior - 1, np.nan)
+            change[np.isinf(change)] = np.nan
+            counts = np.sum(~np.isnan(change), axis=1, keepdims=True)
+            mean = np.nansum(change, axis=1, keepdims=True) / counts
+            std = np.sqrt(np.nansum((change - mean) ** 2, axis=1, keepdims=True) / (counts - 1))
+            block = np.flatnonzero(np.abs((change - mean) / std) > sigma)
+        flagged.append(block + start * n_months)
+
+    cells = np.concatenate(flagged) if flagged else np.empty(0, dtype=np.int64)
+    return table.to_frame(cells)
+
+
+def frame_to_rows(df: pd.DataFrame, columns: list[str]) -> list[tuple]:
+    """Convert a validated frame to COPY tuples, with None for every missing value."""
+    frame = df[columns].astype(object)
+    return list(frame.where(frame.notna(), None).itertuples(index=False, name=None))
+
+
+async def quarantine_rows(connector, table: str, rejects: pd.DataFrame) -> int:
+    """
+    COPY rejected rows into the load_quarantine table as JSON documents.
+
+    Args:
+        connector: Connected database connector
+        table: Table the rows were meant for
+        rejects: Rejected rows with a "reason" column
+
+    Returns:
+        Number of rows quarantined
+    """
+    if rejects.empty:
+        return 0
+    data = rejects.drop(columns="reason").astype(object)
+    data = data.where(data.notna(), None)
+    rows = [
+        (table, reason, json.dumps(record, default=str))
+        for reason, record in zip(rejects["reason"], data.to_dict("records"))
+    ]
+    count = await connector.copy_from(QUARANTINE_TABLE, rows, ["target_table", "reason", "row_data"])
+    logger.warning(f"Quarantined {count} {table} rows")
+    return count
@@ -1,59 +1,40 @@
 import asyncio
-from io import StringIO
+import logging
+import sys
+from pathlib import Path
+from typing import Iterable
 
 import httpx
-import pandas as pd
 
 from infrastructure.postgres_connector import AsyncPostgresConnector
 
+# SeriesTable lives with the loaders in db/, which import each other by bare name
+DB_DIR = Path(__file__).resolve().parent / "db"
+sys.path.insert(0, str(DB_DIR))
+from series import SeriesTable  # noqa: E402
+
 
 ZILLOW_URL = (
     "https://files.zillowstatic.com/research/public_csvs/"
     "zhvi/Metro_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv"
 )
+ZILLOW_FILE = ZILLOW_URL.rsplit("/", 1)[1]
 
 
-async def fetch_zillow_df() -> pd.DataFrame:
+async def fetch_zillow_csv() -> bytes:
+    """Download the Zillow CSV exactly as served."""
     async with httpx.AsyncClient(timeout=60) as client:
         r = await client.get(ZILLOW_URL)
         r.raise_for_status()
+    return r.content
 
-    return pd.read_csv(StringIO(r.text))
-
-
-def transform_zillow_df(df: pd.DataFrame) -> list[tuple]:
-    """
-    Transform Zillow CSV into rows that match zillow_data table
-    """
-
-    # Only columns that start with a digit are dates
-    date_columns = [c for c in df.columns if c[0].isdigit()]
-
-    df_long = df.melt(
-        id_vars=["RegionID", "SizeRank", "RegionName", "StateName"],
-        value_vars=date_columns,
-        var_name="date",
-        value_name="avg_cost",
-    )
-
-    # Parse dates safely (Zillow uses YYYY-MM-DD)
-    df_long["date"] = pd.to_datetime(df_long["date"], errors="raise").dt.date
-
-    # Drop missing values
-    df_long = df_long.dropna(subset=["avg_cost"])
-
-    # Generate IDs (required because DB does NOT auto-generate)
-    df_long["id"] = range(1, len(df_long) + 1)
-
-    # Order columns to match SQL table
-    df_long = df_long[
-        ["id", "RegionID", "SizeRank", "RegionName", "StateName", "date", "avg_cost"]
-    ]
 
-    return list(df_long.itertuples(index=False, name=None))
+def parse_zillow_csv(raw: bytes) -> SeriesTable:
+    """Parse the Zillow CSV into a compact wide SeriesTable (no long per-cell frame)."""
+    return SeriesTable.from_csv(raw.decode("utf-8-sig").splitlines())
 
 
-async def insert_zillow_data(db: AsyncPostgresConnector, rows: list[tuple]):
+async def insert_zillow_data(db: AsyncPostgresConnector, rows: Iterable[tuple]) -> int:
     columns = [
         "id",
         "region_id",
@@ -64,15 +45,19 @@ async def insert_zillow_data(db: AsyncPostgresConnector, rows: list[tuple]):
         "avg_cost",
     ]
 
-    await db.copy_from("zillow_data", rows, columns)
+    # Swap in a fully loaded copy so reruns never duplicate rows or expose a half-loaded table
+    return await db.reload_table("zillow_data", rows, columns)
 
 
 async def main():
-    df = await fetch_zillow_df()
-    print("Fetched Zillow data")
+    # pyarrow (archive) is only needed when the script actually runs
+    from snapshots import ARCHIVE_DIR, archive_csv_bytes
 
-    rows = transform_zillow_df(df)
-    print(f"Prepared {len(rows):,} rows")
+    raw = await fetch_zillow_csv()
+    # Archived as fetched, before parsing, into the same archive ingest.py (run from db/) uses
+    archive_csv_bytes(raw, ZILLOW_FILE, root=DB_DIR / ARCHIVE_DIR)
+    table = parse_zillow_csv(raw)
+    print(f"Fetched {len(table.regions)} regions x {table.n_months} months")
 
     async with AsyncPostgresConnector(
         host="localhost",
@@ -82,9 +67,11 @@ async def main():
         password="devpassword",
     ) as db:
         print("Connected to Postgres")
-        await insert_zillow_data(db, rows)
-        print("Inserted rows into zillow_data")
+        # Rows are generated from the wide buffer as COPY consumes them
+        count = await insert_zillow_data(db, table.zillow_rows())
+        print(f"Reloaded zillow_data with {count:,} rows")
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
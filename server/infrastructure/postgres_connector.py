@@ -1,13 +1,220 @@
+import asyncio
 import logging
-from typing import Optional, Any, Iterator
+import re
+import select
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import Future
+from io import BytesIO
+from typing import Optional, Any, Iterable, Iterator
 import psycopg 
-from psycopg import sql, Error as PostgresError
+from psycopg import pq, sql, Error as PostgresError
 from psycopg.rows import dict_row, tuple_row
 from psycopg_pool import ConnectionPool, AsyncConnectionPool
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# An identifier as pg_get_indexdef prints it: bare, or double-quoted with "" escapes
+_IDENT = r'(?:"(?:[^"]|"")+"|[^\s."]+)'
+# Splits pg_get_indexdef() output so the index can be recreated under another name/table
+_INDEXDEF_RE = re.compile(
+    rf"^CREATE (UNIQUE )?INDEX {_IDENT} ON (?:ONLY )?(?:{_IDENT}\.)?{_IDENT} (USING .*)$"
+)
+
+# Catalog reads behind reload_table, each taking the table name
+_REFERENCED_SQL = "SELECT count(*) FROM pg_constraint WHERE confrelid = %s::regclass AND contype = 'f'"
+
+_CONSTRAINTS_SQL = """
+SELECT conname, pg_get_constraintdef(oid)
+FROM pg_constraint
+WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'x', 'f')
+ORDER BY contype DESC
+"""
+
+_INDEXES_SQL = """
+SELECT c.relname, pg_get_indexdef(i.indexrelid)
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+WHERE i.indrelid = %s::regclass
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)
+"""
+
+# Serial columns: LIKE copies the nextval() default, but the sequence itself
+# is owned by (and would be dropped with) the old table
+_OWNED_SEQUENCES_SQL = """
+SELECT d.objid::regclass::text, a.attname
+FROM pg_depend d
+JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+WHERE d.refobjid = %s::regclass AND d.classid = 'pg_class'::regclass AND d.deptype = 'a'
+"""
+
+
+class _ReloadPlan:
+    """The statements reload_table runs around its COPY, built from the catalog reads."""
+
+    def __init__(
+        self,
+        table: str,
+        constraints: list[tuple],
+        indexes: list[tuple],
+        owned_sequences: list[tuple],
+        logged: bool,
+    ):
+        self.shadow = f"{table}_shadow"
+        old = f"{table}_old"
+        table_id, shadow_id, old_id = sql.Identifier(table), sql.Identifier(self.shadow), sql.Identifier(old)
+
+        self.before_copy: list[sql.Composable] = [
+            sql.SQL("DROP TABLE IF EXISTS {}").format(shadow_id),
+            sql.SQL("DROP TABLE IF EXISTS {}").format(old_id),
+            sql.SQL(
+                "CREATE UNLOGGED TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+                "INCLUDING IDENTITY INCLUDING GENERATED)"
+            ).format(shadow_id, table_id),
+        ]
+
+        # Index names are unique per schema, so build under temporary names and rename after the swap
+        self.after_copy: list[sql.Composable] = []
+        if logged:
+            self.after_copy.append(sql.SQL("ALTER TABLE {} SET LOGGED").format(shadow_id))
+        renames: list[sql.Composable] = []
+        for name, definition in constraints:
+            temp = sql.Identifier(f"{name}_shadow")
+            self.after_copy.append(
+                sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(shadow_id, temp, sql.SQL(definition))
+            )
+            renames.append(
+                sql.SQL("ALTER TABLE {} RENAME CONSTRAINT {} TO {}").format(table_id, temp, sql.Identifier(name))
+            )
+        for name, definition in indexes:
+            match = _INDEXDEF_RE.match(definition)
+            if not match:
+                raise ValueError(f"Cannot rebuild index {name}: {definition}")
+            temp = sql.Identifier(f"{name}_shadow")
+            self.after_copy.append(
+                sql.SQL("CREATE {}INDEX {} ON {} {}").format(
+                    sql.SQL(match.group(1) or ""), temp, shadow_id, sql.SQL(match.group(2))
+                )
+            )
+            renames.append(sql.SQL("ALTER INDEX {} RENAME TO {}").format(temp, sql.Identifier(name)))
+        self.after_copy.append(sql.SQL("ANALYZE {}").format(shadow_id))
+
+        self.swap: list[sql.Composable] = [
+            # Fail fast rather than queue every new reader behind the exclusive lock
+            sql.SQL("SET LOCAL lock_timeout = '5s'"),
+            sql.SQL("ALTER TABLE {} RENAME TO {}").format(table_id, old_id),
+            sql.SQL("ALTER TABLE {} RENAME TO {}").format(shadow_id, table_id),
+            *(
+                sql.SQL("ALTER SEQUENCE {} OWNED BY {}").format(sql.SQL(sequence), sql.Identifier(table, column))
+                for sequence, column in owned_sequences
+            ),
+            sql.SQL("DROP TABLE {}").format(old_id),
+            *renames,
+        ]
+
+def _copy_out(pgconn: pq.abc.PGconn, query: bytes) -> bytes:
+    """
+    Run COPY ... TO STDOUT on a libpq connection and return its whole output.
+
+    psycopg's Copy object goes through its wait loop once per row; here every
+    row already received is drained before waiting on the socket again.
+    """
+    def wait_result() -> pq.abc.PGresult:
+        while True:
+            pgconn.consume_input()
+            if not pgconn.is_busy():
+                return pgconn.get_result()
+            select.select([pgconn.socket], [], [])
+
+    def finish(result: pq.abc.PGresult, expected: pq.ExecStatus) -> None:
+        while pgconn.get_result() is not None:
+            pass
+        if result.status != expected:
+            raise psycopg.errors.error_from_result(result)
+
+    pgconn.send_query(query)
+    while pgconn.flush():
+        select.select([], [pgconn.socket], [])
+    result = wait_result()
+    if result.status != pq.ExecStatus.COPY_OUT:
+        finish(result, pq.ExecStatus.COPY_OUT)
+
+    buffer = BytesIO()
+    write = buffer.write
+    while True:
+        size, data = pgconn.get_copy_data(1)
+        if size > 0:
+            write(data)
+        elif size == 0:
+            select.select([pgconn.socket], [], [])
+            pgconn.consume_input()
+        elif size == -1:
+            break
+        else:
+            raise psycopg.OperationalError(pgconn.error_message.decode("utf-8", "replace"))
+    finish(wait_result(), pq.ExecStatus.COMMAND_OK)
+    return buffer.getvalue()
+
+
+def _arrow_type(type_code: int, precision: Optional[int], scale: Optional[int]):
+    """pyarrow type for a result column, from its Postgres type; text for anything unlisted."""
+    import pyarrow as pa
+
+    info = psycopg.postgres.types.get(type_code)
+    name = info.name if info else None
+    if name == "numeric":
+        if precision is None:
+            return pa.float64()
+        return (pa.decimal128 if precision <= 38 else pa.decimal256)(precision, scale or 0)
+    return {
+        "bool": pa.bool_(),
+        "int2": pa.int16(),
+        "int4": pa.int32(),
+        "int8": pa.int64(),
+        "oid": pa.int64(),
+        "float4": pa.float32(),
+        "float8": pa.float64(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("us"),
+        "timestamptz": pa.timestamp("us", tz="UTC"),
+    }.get(name, pa.string())
+
+
+def _frame_from_csv(data: bytes, columns: list[tuple], column_types: Optional[dict[str, Any]] = None):
+    """
+    DataFrame of COPY CSV output, typed by each column's (name, type_code, precision, scale).
+
+    In COPY's CSV format NULL is an unquoted empty field and '' is quoted, so
+    only the former becomes missing.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    overrides = column_types or {}
+    names = [c[0] for c in columns]
+    types = [overrides.get(name) or _arrow_type(*rest) for name, *rest in columns]
+    # Positional names, since a result's column names need not be unique
+    keys = [f"c{i}" for i in range(len(columns))]
+    if data:
+        table = pacsv.read_csv(
+            pa.BufferReader(data),
+            read_options=pacsv.ReadOptions(column_names=keys),
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types=dict(zip(keys, types)),
+                null_values=[""],
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=False,
+                true_values=["t"],
+                false_values=["f"],
+            ),
+        )
+    else:
+        table = pa.schema(list(zip(keys, types))).empty_table()
+    return table.rename_columns(names).to_pandas(types_mapper=pd.ArrowDtype)
+
+
 class AsyncPostgresConnector:
     """An asynchronous PostgreSQL database connector with connection pooling support."""
 
@@ -22,6 +229,7 @@ class AsyncPostgresConnector:
         use_pool: bool = True,
         min_size: int = 1,
         max_size: int = 10,
+        prepare_threshold: Optional[int] = 5,
         **kwargs,
     ):
         """
@@ -36,6 +244,9 @@ class AsyncPostgresConnector:
             use_pool: Whether to use connection pooling
             min_size: Minimum connections in pool (if pooling enabled)
             max_size: Maximum connections in pool (if pooling enabled)
+            prepare_threshold: Executions of the same query on a connection before it is
+                prepared server-side (0 prepares everything, None disables; use None behind
+                a transaction-mode pgbouncer)
             **kwargs: Additional connection parameters
         """
         self.conninfo = psycopg.conninfo.make_conninfo(
@@ -49,6 +260,11 @@ class AsyncPostgresConnector:
         self.use_pool = use_pool
         self.min_size = min_size
         self.max_size = max_size
+        self.prepare_threshold = prepare_threshold
+
+        # Named statements, executed with prepare=True so each pooled connection
+        # parses and plans them once and reuses the plan afterwards
+        self._statements: dict[str, str] = {}
 
         self._connection: Optional[psycopg.AsyncConnection] = None
         self._pool: Optional[AsyncConnectionPool] = None
@@ -62,16 +278,33 @@ class AsyncPostgresConnector:
                     min_size=self.min_size,
                     max_size=self.max_size,
                     open=False,
+                    kwargs={"prepare_threshold": self.prepare_threshold},
                 )
                 await self._pool.open()
                 logger.info("Async connection pool initialized successfully")
             else:
-                self._connection = await psycopg.AsyncConnection.connect(self.conninfo)
+                self._connection = await psycopg.AsyncConnection.connect(
+                    self.conninfo, prepare_threshold=self.prepare_threshold
+                )
                 logger.info("Async connection established")
         except PostgresError as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
 
+    async def wait_ready(self, timeout: float = 30.0) -> None:
+        """
+        Wait until the pool holds min_size open connections.
+
+        connect() returns as soon as the pool starts filling in the background,
+        so startup work can overlap with connection setup; await this before
+        reporting the service ready.
+
+        Args:
+            timeout: Seconds to wait before raising psycopg_pool.PoolTimeout
+        """
+        if self.use_pool and self._pool:
+            await self._pool.wait(timeout)
+
     async def disconnect(self) -> None:
         """Close the async database connection or connection pool."""
         try:
@@ -131,6 +364,7 @@ class AsyncPostgresConnector:
         query: str,
         params: Optional[tuple | dict] = None,
         as_dict: bool = False,
+        prepare: Optional[bool] = None,
     ) -> Optional[Any]:
         """
         Fetch a single row asynchronously.
@@ -139,6 +373,7 @@ class AsyncPostgresConnector:
             query: SQL query string
             params: Query parameters
             as_dict: If True, return result as dictionary
+            prepare: True to prepare on first use, False never, None per prepare_threshold
 
         Returns:
             Single row result or None
@@ -146,7 +381,7 @@ class AsyncPostgresConnector:
         row_factory = dict_row if as_dict else tuple_row
         async with self._get_connection() as conn:
             async with conn.cursor(row_factory=row_factory) as cur:
-                await cur.execute(query, params)
+                await cur.execute(query, params, prepare=prepare)
                 return await cur.fetchone()
 
     async def fetch_all(
@@ -154,6 +389,7 @@ class AsyncPostgresConnector:
         query: str,
         params: Optional[tuple | dict] = None,
         as_dict: bool = False,
+        prepare: Optional[bool] = None,
     ) -> list:
         """
         Fetch all rows asynchronously.
@@ -162,6 +398,7 @@ class AsyncPostgresConnector:
             query: SQL query string
             params: Query parameters
             as_dict: If True, return results as dictionaries
+            prepare: True to prepare on first use, False never, None per prepare_threshold
 
         Returns:
             List of row results
@@ -169,9 +406,69 @@ class AsyncPostgresConnector:
         row_factory = dict_row if as_dict else tuple_row
         async with self._get_connection() as conn:
             async with conn.cursor(row_factory=row_factory) as cur:
-                await cur.execute(query, params)
+                await cur.execute(query, params, prepare=prepare)
                 return await cur.fetchall()
 
+    def register_statement(self, name: str, query: str) -> None:
+        """
+        Register a named statement for fetch_prepared and QueryBatch.fetch_prepared.
+
+        Args:
+            name: Name used to refer to the statement
+            query: SQL query string with placeholders
+        """
+        self._statements[name] = query
+
+    async def fetch_prepared(
+        self,
+        name: str,
+        params: Optional[tuple | dict] = None,
+        as_dict: bool = False,
+        one: bool = False,
+    ) -> Any:
+        """
+        Run a registered statement as a server-side prepared statement.
+
+        psycopg keeps one prepared statement per query per connection, so after
+        the first call on a pooled connection only the parameters are sent.
+
+        Args:
+            name: Name given to register_statement
+            params: Query parameters
+            as_dict: If True, return results as dictionaries
+            one: If True, return only the first row (or None)
+
+        Returns:
+            List of rows, or a single row if one=True
+        """
+        query = self._statements[name]
+        if one:
+            return await self.fetch_one(query, params, as_dict, prepare=True)
+        return await self.fetch_all(query, params, as_dict, prepare=True)
+
+    @asynccontextmanager
+    async def batch(self):
+        """
+        Collect independent queries and send them in one network round trip.
+
+        Queries added inside the block are queued; on exit they run on one
+        connection in pipeline mode and each returned future is resolved with
+        its rows. Nothing runs if the block raises.
+
+            async with db.batch() as batch:
+                series = batch.fetch_prepared("region_series", (region_id,))
+                regions = batch.fetch_prepared("regions")
+            series.result(), regions.result()
+
+        Yields:
+            A QueryBatch to add queries to
+        """
+        batch = QueryBatch(self._statements)
+        yield batch
+        if batch.queries:
+            async with self._get_connection() as conn:
+                await batch.run(conn)
+
     async def fetch_many(
         self,
         query: str,
@@ -200,7 +497,7 @@ class AsyncPostgresConnector:
     async def copy_from(
         self,
         table: str,
-        data: list[tuple],
+        data: Iterable[tuple],
         columns: Optional[list[str]] = None,
     ) -> int:
         """
@@ -208,7 +505,7 @@ class AsyncPostgresConnector:
 
         Args:
             table: Target table name
-            data: List of tuples to insert
+            data: Tuples to insert; any iterable, so rows can be generated on demand
             columns: Optional list of column names
 
         Returns:
@@ -225,11 +522,84 @@ class AsyncPostgresConnector:
         
         async with self._get_connection() as conn:
             async with conn.cursor() as cur:
+                count = 0
                 async with cur.copy(query) as copy:
                     for row in data:
                         await copy.write_row(row)
+                        count += 1
                 await conn.commit()
-                return len(data)
+                return count
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Open a transaction on a single connection asynchronously.
+
+        Everything executed on the yielded connection commits together when the
+        block exits, or rolls back if it raises.
+
+        Yields:
+            The connection the transaction is running on
+        """
+        async with self._get_connection() as conn:
+            async with conn.transaction():
+                yield conn
+
+    async def reload_table(
+        self,
+        table: str,
+        data: Iterable[tuple],
+        columns: Optional[list[str]] = None,
+        logged: bool = True,
+    ) -> int:
+        """
+        Replace the full contents of a table without readers ever seeing a partial load.
+
+        Rows are COPYed into an unlogged shadow copy of the table that has no
+        indexes or keys. The table's constraints and indexes are then built once
+        over the loaded data, the shadow is analyzed, and it is swapped in by
+        renaming inside one short transaction. Readers keep using the old table
+        until that transaction commits.
+
+        Sequences owned by the table's columns (serial defaults) are handed to
+        the new table before the old one is dropped, and a leftover {table}_old
+        from an interrupted run is dropped first.
+
+        Tables referenced by other tables' foreign keys cannot be swapped this
+        way, and partitioned tables should go through partitions.py instead.
+
+        Args:
+            table: Name of the table to replace
+            data: Complete new contents; any iterable of tuples
+            columns: Optional list of column names
+            logged: Convert the shadow to a logged table before indexing (crash safe)
+
+        Returns:
+            Number of rows loaded
+        """
+        referenced = await self.fetch_one(_REFERENCED_SQL, (table,))
+        if referenced and referenced[0]:
+            raise ValueError(f"{table} is referenced by foreign keys and cannot be swapped")
+        plan = _ReloadPlan(
+            table,
+            await self.fetch_all(_CONSTRAINTS_SQL, (table,)),
+            await self.fetch_all(_INDEXES_SQL, (table,)),
+            await self.fetch_all(_OWNED_SEQUENCES_SQL, (table,)),
+            logged,
+        )
+
+        for statement in plan.before_copy:
+            await self.execute(statement)
+        count = await self.copy_from(plan.shadow, data, columns)
+        for statement in plan.after_copy:
+            await self.execute(statement)
+
+        async with self.transaction() as conn:
+            for statement in plan.swap:
+                await conn.execute(statement)
+
+        logger.info(f"Reloaded {table} with {count} rows")
+        return count
 
     async def table_exists(self, table_name: str, schema: str = "public") -> bool:
         """
@@ -273,6 +643,533 @@ class AsyncPostgresConnector:
         return False
 
 
+class SyncPostgresConnector:
+    """
+    A synchronous PostgreSQL database connector with connection pooling support.
+
+    Mirrors AsyncPostgresConnector for batch and analytics code that runs in
+    plain threads. With pooling enabled every call checks out its own
+    connection from a psycopg_pool.ConnectionPool, so one instance can be
+    shared by all the workers of a ThreadPoolExecutor. Without pooling the
+    single connection must not be used from more than one thread at a time.
+    """
+
+    # TODO: move from hardcoded defaults to environment variables
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 5432,
+        dbname: str = "real_estate_db",
+        user: str = "realestate_user",
+        password: str = "devpassword",
+        use_pool: bool = True,
+        min_size: int = 1,
+        max_size: int = 10,
+        prepare_threshold: Optional[int] = 5,
+        **kwargs,
+    ):
+        """
+        Initialize the sync PostgreSQL connector.
+
+        Args:
+            host: Database server hostname
+            port: Database server port
+            dbname: Database name
+            user: Database username
+            password: Database password
+            use_pool: Whether to use connection pooling
+            min_size: Minimum connections in pool (if pooling enabled)
+            max_size: Maximum connections in pool (if pooling enabled); size it to the worker count
+            prepare_threshold: Executions of the same query on a connection before it is
+                prepared server-side (0 prepares everything, None disables)
+            **kwargs: Additional connection parameters
+        """
+        self.conninfo = psycopg.conninfo.make_conninfo(
+            host=host,
+            port=port,
+            dbname=dbname,
+            user=user,
+            password=password,
+            **kwargs,
+        )
+        self.use_pool = use_pool
+        self.min_size = min_size
+        self.max_size = max_size
+        self.prepare_threshold = prepare_threshold
+
+        # Named statements for fetch_prepared and batch, as on AsyncPostgresConnector
+        self._statements: dict[str, str] = {}
+
+        self._connection: Optional[psycopg.Connection] = None
+        self._pool: Optional[ConnectionPool] = None
+
+    def connect(self) -> None:
+        """Establish a database connection or initialize the connection pool."""
+        try:
+            if self.use_pool:
+                self._pool = ConnectionPool(
+                    self.conninfo,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    open=False,
+                    kwargs={"prepare_threshold": self.prepare_threshold},
+                )
+                self._pool.open()
+                logger.info("Connection pool initialized successfully")
+            else:
+                self._connection = psycopg.Connection.connect(
+                    self.conninfo, prepare_threshold=self.prepare_threshold
+                )
+                logger.info("Connection established")
+        except PostgresError as e:
+            logger.error(f"Failed to connect to database: {e}")
+            raise
+
+    def disconnect(self) -> None:
+        """Close the database connection or connection pool."""
+        try:
+            if self.use_pool and self._pool:
+                self._pool.close()
+                self._pool = None
+                logger.info("Connection pool closed")
+            elif self._connection:
+                self._connection.close()
+                self._connection = None
+                logger.info("Database connection closed")
+        except PostgresError as e:
+            logger.error(f"Error closing connection: {e}")
+            raise
+
+    def execute(
+        self,
+        query: str,
+        params: Optional[tuple | dict] = None,
+        returning: bool = False,
+    ) -> Optional[Any]:
+        """
+        Execute a SQL query.
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+            returning: If True, return the first column of the first row
+
+        Returns:
+            Result of RETURNING clause if returning=True, else None
+        """
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                conn.commit()
+                if returning:
+                    result = cur.fetchone()
+                    return result[0] if result else None
+                return None
+
+    def execute_many(self, query: str, params_seq: list[tuple | dict]) -> None:
+        """
+        Execute a SQL query multiple times with different parameters.
+
+        Args:
+            query: SQL query string
+            params_seq: Sequence of parameter tuples/dicts
+        """
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(query, params_seq)
+                conn.commit()
+
+    def fetch_one(
+        self,
+        query: str,
+        params: Optional[tuple | dict] = None,
+        as_dict: bool = False,
+        prepare: Optional[bool] = None,
+    ) -> Optional[Any]:
+        """
+        Fetch a single row.
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+            as_dict: If True, return result as dictionary
+            prepare: True to prepare on first use, False never, None per prepare_threshold
+
+        Returns:
+            Single row result or None
+        """
+        row_factory = dict_row if as_dict else tuple_row
+        with self._get_connection() as conn:
+            with conn.cursor(row_factory=row_factory) as cur:
+                cur.execute(query, params, prepare=prepare)
+                return cur.fetchone()
+
+    def fetch_all(
+        self,
+        query: str,
+        params: Optional[tuple | dict] = None,
+        as_dict: bool = False,
+        prepare: Optional[bool] = None,
+    ) -> list:
+        """
+        Fetch all rows.
+
+        Args:
+            query: SQL query string
+            params: Query parameters
+            as_dict: If True, return results as dictionaries
+            prepare: True to prepare on first use, False never, None per prepare_threshold
+
+        Returns:
+            List of row results
+        """
+        row_factory = dict_row if as_dict else tuple_row
+        with self._get_connection() as conn:
+            with conn.cursor(row_factory=row_factory) as cur:
+                cur.execute(query, params, prepare=prepare)
+                return cur.fetchall()
+
+    def register_statement(self, name: str, query: str) -> None:
+        """
+        Register a named statement for fetch_prepared and SyncQueryBatch.fetch_prepared.
+
+        Args:
+            name: Name used to refer to the statement
+            query: SQL query string with placeholders
+        """
+        self._statements[name] = query
+
+    def fetch_prepared(
+        self,
+        name: str,
+        params: Optional[tuple | dict] = None,
+        as_dict: bool = False,
+        one: bool = False,
+    ) -> Any:
+        """
+        Run a registered statement as a server-side prepared statement.
+
+        Args:
+            name: Name given to register_statement
+            params: Query parameters
+            as_dict: If True, return results as dictionaries
+            one: If True, return only the first row (or None)
+
+        Returns:
+            List of rows, or a single row if one=True
+        """
+        query = self._statements[name]
+        if one:
+            return self.fetch_one(query, params, as_dict, prepare=True)
+        return self.fetch_all(query, params, as_dict, prepare=True)
+
+    @contextmanager
+    def batch(self):
+        """
+        Collect independent queries and send them in one network round trip.
+
+        Same as AsyncPostgresConnector.batch: queries added inside the block
+        run on one connection in pipeline mode on exit, and each returned
+        concurrent.futures.Future then holds its rows.
+
+        Yields:
+            A SyncQueryBatch to add queries to
+        """
+        batch = SyncQueryBatch(self._statements)
+        yield batch
+        if batch.queries:
+            with self._get_connection() as conn:
+                batch.run(conn)
+
+    def fetch_many(
+        self,
+        query: str,
+        size: int,
+        params: Optional[tuple | dict] = None,
+        as_dict: bool = False,
+    ) -> list:
+        """
+        Fetch a specific number of rows.
+
+        Args:
+            query: SQL query string
+            size: Number of rows to fetch
+            params: Query parameters
+            as_dict: If True, return results as dictionaries
+
+        Returns:
+            List of row results (up to 'size' rows)
+        """
+        row_factory = dict_row if as_dict else tuple_row
+        with self._get_connection() as conn:
+            with conn.cursor(row_factory=row_factory) as cur:
+                cur.execute(query, params)
+                return cur.fetchmany(size)
+
+    def read_frame(
+        self,
+        query: str,
+        params: Optional[tuple | dict] = None,
+        column_types: Optional[dict[str, Any]] = None,
+    ):
+        """
+        Run a query and load its result into a pandas DataFrame via COPY.
+
+        Column types come from the query's result description, never from the
+        data: text stays text (zip "01234" keeps its zero), NULL is missing
+        while '' stays an empty string, and numeric(p, s) is an exact decimal.
+        Numeric results without a declared scale (avg(), casts) are float64.
+        Columns are Arrow-backed (pd.ArrowDtype).
+
+        The COPY output is drained straight off the libpq connection into one
+        buffer and parsed by pyarrow's CSV reader, so no Python object is built
+        per row or per value.
+
+        Args:
+            query: SELECT statement (without a trailing semicolon)
+            params: Query parameters
+            column_types: pyarrow types overriding the described type of named columns
+
+        Returns:
+            DataFrame with one column per result column
+        """
+        describe = sql.SQL("SELECT * FROM ({}) AS q LIMIT 0").format(sql.SQL(query))
+        copy_query = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv)").format(sql.SQL(query))
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(describe, params)
+                columns = [(c.name, c.type_code, c.precision, c.scale) for c in cur.description]
+            # COPY takes no bind parameters, so they are merged in client side
+            statement = psycopg.ClientCursor(conn).mogrify(copy_query, params)
+            data = _copy_out(conn.pgconn, statement.encode(conn.info.encoding))
+        return _frame_from_csv(data, columns, column_types)
+
+    def copy_from(
+        self,
+        table: str,
+        data: Iterable[tuple],
+        columns: Optional[list[str]] = None,
+    ) -> int:
+        """
+        Efficiently bulk insert data using COPY.
+
+        Args:
+            table: Target table name
+            data: Tuples to insert; any iterable, so rows can be generated on demand
+            columns: Optional list of column names
+
+        Returns:
+            Number of rows copied
+        """
+        col_clause = sql.SQL("({})").format(
+            sql.SQL(", ").join(sql.Identifier(c) for c in columns)
+        ) if columns else sql.SQL("")
+
+        query = sql.SQL("COPY {} {} FROM STDIN").format(
+            sql.Identifier(table),
+            col_clause,
+        )
+
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                count = 0
+                with cur.copy(query) as copy:
+                    for row in data:
+                        copy.write_row(row)
+                        count += 1
+                conn.commit()
+                return count
+
+    @contextmanager
+    def transaction(self):
+        """
+        Open a transaction on a single connection.
+
+        Everything executed on the yielded connection commits together when the
+        block exits, or rolls back if it raises.
+
+        Yields:
+            The connection the transaction is running on
+        """
+        with self._get_connection() as conn:
+            with conn.transaction():
+                yield conn
+
+    def reload_table(
+        self,
+        table: str,
+        data: Iterable[tuple],
+        columns: Optional[list[str]] = None,
+        logged: bool = True,
+    ) -> int:
+        """
+        Replace the full contents of a table without readers ever seeing a partial load.
+
+        Same shadow-table swap as AsyncPostgresConnector.reload_table.
+
+        Args:
+            table: Name of the table to replace
+            data: Complete new contents as tuples
+            columns: Optional list of column names
+            logged: Convert the shadow to a logged table before indexing (crash safe)
+
+        Returns:
+            Number of rows loaded
+        """
+        referenced = self.fetch_one(_REFERENCED_SQL, (table,))
+        if referenced and referenced[0]:
+            raise ValueError(f"{table} is referenced by foreign keys and cannot be swapped")
+        plan = _ReloadPlan(
+            table,
+            self.fetch_all(_CONSTRAINTS_SQL, (table,)),
+            self.fetch_all(_INDEXES_SQL, (table,)),
+            self.fetch_all(_OWNED_SEQUENCES_SQL, (table,)),
+            logged,
+        )
+
+        for statement in plan.before_copy:
+            self.execute(statement)
+        count = self.copy_from(plan.shadow, data, columns)
+        for statement in plan.after_copy:
+            self.execute(statement)
+
+        with self.transaction() as conn:
+            for statement in plan.swap:
+                conn.execute(statement)
+
+        logger.info(f"Reloaded {table} with {count} rows")
+        return count
+
+    def table_exists(self, table_name: str, schema: str = "public") -> bool:
+        """
+        Check if a table exists in the database.
+
+        Args:
+            table_name: Name of the table
+            schema: Schema name (default: public)
+
+        Returns:
+            True if table exists, False otherwise
+        """
+        query = """
+            SELECT EXISTS (
+                SELECT FROM information_schema.tables 
+                WHERE table_schema = %s AND table_name = %s
+            )
+        """
+        result = self.fetch_one(query, (schema, table_name))
+        return result[0] if result else False
+
+    def _get_connection(self):
+        """Get a connection context manager."""
+        if self.use_pool:
+            if not self._pool:
+                raise RuntimeError("Connection pool not initialized. Call connect() first.")
+            return self._pool.connection()
+        else:
+            if not self._connection:
+                raise RuntimeError("Not connected to database. Call connect() first.")
+            return _ConnectionWrapper(self._connection)
+
+    def __enter__(self):
+        """Context manager entry point."""
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit point."""
+        self.disconnect()
+        return False
+
+
+class QueryBatch:
+    """Queries queued by AsyncPostgresConnector.batch(), resolved together on exit."""
+
+    def __init__(self, statements: dict[str, str]):
+        self._statements = statements
+        self.queries: list[tuple[str, Any, bool, bool, Optional[bool], asyncio.Future]] = []
+
+    def _add(self, query, params, as_dict, one, prepare) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.queries.append((query, params, as_dict, one, prepare, future))
+        return future
+
+    def fetch_one(
+        self,
+        query: str,
+        params: Optional[tuple | dict] = None,
+        as_dict: bool = False,
+        prepare: Optional[bool] = None,
+    ) -> asyncio.Future:
+        """Queue a query; the future resolves to its first row or None."""
+        return self._add(query, params, as_dict, True, prepare)
+
+    def fetch_all(
+        self,
+        query: str,
+        params: Optional[tuple | dict] = None,
+        as_dict: bool = False,
+        prepare: Optional[bool] = None,
+    ) -> asyncio.Future:
+        """Queue a query; the future resolves to all of its rows."""
+        return self._add(query, params, as_dict, False, prepare)
+
+    def fetch_prepared(
+        self,
+        name: str,
+        params: Optional[tuple | dict] = None,
+        as_dict: bool = False,
+        one: bool = False,
+    ) -> asyncio.Future:
+        """Queue a registered statement as a prepared statement."""
+        return self._add(self._statements[name], params, as_dict, one, True)
+
+    async def run(self, conn: psycopg.AsyncConnection) -> None:
+        """Send every queued query in pipeline mode and resolve the futures."""
+        cursors = []
+        try:
+            async with conn.pipeline():
+                for query, params, as_dict, _, prepare, _ in self.queries:
+                    cur = conn.cursor(row_factory=dict_row if as_dict else tuple_row)
+                    await cur.execute(query, params, prepare=prepare)
+                    cursors.append(cur)
+        except BaseException:
+            for *_, future in self.queries:
+                future.cancel()
+            raise
+
+        for cur, (_, _, _, one, _, future) in zip(cursors, self.queries):
+            future.set_result(await cur.fetchone() if one else await cur.fetchall())
+            await cur.close()
+
+
+class SyncQueryBatch(QueryBatch):
+    """Queries queued by SyncPostgresConnector.batch(), resolved together on exit."""
+
+    def _add(self, query, params, as_dict, one, prepare) -> Future:
+        future = Future()
+        self.queries.append((query, params, as_dict, one, prepare, future))
+        return future
+
+    def run(self, conn: psycopg.Connection) -> None:
+        """Send every queued query in pipeline mode and resolve the futures."""
+        cursors = []
+        try:
+            with conn.pipeline():
+                for query, params, as_dict, _, prepare, _ in self.queries:
+                    cur = conn.cursor(row_factory=dict_row if as_dict else tuple_row)
+                    cur.execute(query, params, prepare=prepare)
+                    cursors.append(cur)
+        except BaseException:
+            for *_, future in self.queries:
+                future.cancel()
+            raise
+
+        for cur, (_, _, _, one, _, future) in zip(cursors, self.queries):
+            future.set_result(cur.fetchone() if one else cur.fetchall())
+            cur.close()
+
+
 class _AsyncConnectionWrapper:
     """Simple wrapper to use an existing connection as an async context manager."""
     
@@ -285,3 +1182,15 @@ class _AsyncConnectionWrapper:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         return False
 
+
+class _ConnectionWrapper:
+    """Simple wrapper to use an existing connection as a context manager."""
+
+    def __init__(self, connection: psycopg.Connection):
+        self._connection = connection
+
+    def __enter__(self):
+        return self._connection
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
@@ -1,54 +1,161 @@
 import asyncio
+import gzip
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
 from infrastructure.postgres_connector import AsyncPostgresConnector
-import pandas as pd
-import requests
-from io import StringIO
-from typing import Optional
-from selenium import webdriver  # assuming you're using Selenium
+
+# The read-path modules live in db/ with the loaders, which import each other by bare name
+sys.path.insert(0, str(Path(__file__).resolve().parent / "db"))
+from payload_cache import FILTERS_KEY, PayloadCache, region_key  # noqa: E402
+from queries import fetch_dashboard, register_dashboard_statements  # noqa: E402
+
+# The series module (pandas), requests and Selenium cost hundreds of milliseconds to
+# import and only the scraping/ETL helpers use them, so they are imported inside those functions
+if TYPE_CHECKING:
+    from region_search import RegionMatch, RegionSearch
+    from selenium import webdriver
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TIMEOUT = 30.0
 
 
 # Global state
-browser: Optional[webdriver.Chrome] = None
+browser: Optional["webdriver.Chrome"] = None
 current_page = 1
 db: Optional[AsyncPostgresConnector] = None
 
 
 async def fetch_zillow_data() -> list[tuple]:
+    import requests
+    from series import SeriesTable
+
     url = "https://files.zillowstatic.com/research/public_csvs/zhvi/Metro_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv?t=1769456072"
     response = requests.get(url)
-    csv_data = StringIO(response.text)
 
-    df = pd.read_csv(csv_data)
+    # One entry per month, built from the wide buffer instead of a pandas melt
+    table = SeriesTable.from_csv(response.text.splitlines())
+    return list(table.zillow_rows())
 
-    # Melt df so each month is an entry
-    df_long = df.melt(
-        id_vars = ["RegionID", "SizeRank", "RegionName", "StateName"],
-        var_name="date",
-        value_name="avg_cost"
-    )
 
-    # Convert date strings to datetime
-    df_long["date"] = pd.to_datetime(df["date"])
+class App:
+    """
+    Server process state with a fast, concurrent startup.
+
+    start() opens the connection pool without blocking on it, then fills the
+    pool and loads the hot caches at the same time; `ready` is set only once
+    all of them are done, so nothing is served from a cold cache.
+
+    Dashboard requests are answered from the payloads ingest pre-renders
+    (region_payload, filters_payload), returned as stored bytes, and region
+    suggestions from an in-memory index built during warm-up.
+    """
+
+    def __init__(self, connector: AsyncPostgresConnector):
+        self.db = connector
+        self.payloads = PayloadCache(connector)
+        register_dashboard_statements(connector)
+        self.ready = asyncio.Event()
+        self.regions: list[dict] = []
+        self.snapshot: Optional[dict] = None
+        self.snapshot_generation: Optional[int] = None
+        self.region_search: Optional["RegionSearch"] = None
+        self.startup_seconds: Optional[float] = None
 
-    # Create id column
-    df_long["id"] = range(1, len(df_long) + 1)
+    async def _load_regions(self) -> None:
+        self.regions = await self.db.fetch_prepared("regions", as_dict=True)
 
-    # Reorder columns 
-    df_long = df_long[["id", "RegionID", "SizeRank", "RegionName", "StateName", "date", "avg_cost"]]
-    df_long.columns = ["id", "region_id", "size_rank", "region_name", "state_name", "date", "avg_cost"]
+    async def _load_snapshot(self) -> None:
+        # Also pins the payload cache to the newest published generation
+        body = await self.payloads.get(FILTERS_KEY)
+        self.snapshot_generation = self.payloads.generation
+        if body is not None:
+            self.snapshot = json.loads(gzip.decompress(body))
 
-    return list(df_long.itertuples(index=False, name=None))
+    async def start(self, timeout: float = WARMUP_TIMEOUT) -> None:
+        """Open the pool and warm the caches; the pool is closed again if warm-up fails."""
+        # NumPy (search index) is only needed once the server actually starts
+        from region_search import RegionSearch
+
+        started = time.perf_counter()
+        self.region_search = RegionSearch(self.db)
+        await self.db.connect()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    self.db.wait_ready(timeout),
+                    self._load_regions(),
+                    self._load_snapshot(),
+                    self.region_search.refresh(),
+                ),
+                timeout,
+            )
+        except BaseException:
+            await self.db.disconnect()
+            raise
+        self.startup_seconds = time.perf_counter() - started
+        self.ready.set()
+        logger.info(
+            f"Ready in {self.startup_seconds * 1000:.0f} ms: {len(self.regions)} regions, "
+            f"snapshot generation {self.snapshot_generation}"
+        )
+
+    async def region_payload(self, region_id: int, fmt: str = "json") -> Optional[bytes]:
+        """
+        A region's pre-rendered dashboard payload, ready to send as is.
+
+        Returns:
+            gzip JSON (or Arrow IPC for fmt="arrow"), or None if the region is
+            not in the published generation
+        """
+        return await self.payloads.get(region_key(region_id), fmt)
+
+    async def filters_payload(self) -> Optional[bytes]:
+        """The gzip JSON region, state and year filter lists."""
+        return await self.payloads.get(FILTERS_KEY)
+
+    async def search_regions(
+        self, query: str, limit: int = 10, state: Optional[str] = None
+    ) -> list["RegionMatch"]:
+        """Region suggestions for a search box, best first; see RegionIndex.search."""
+        return await self.region_search.search(query, limit, state)
+
+    async def dashboard(self, region_id: int) -> dict:
+        """
+        Live series, regions and years for a region's page: three prepared
+        statements in one round trip. For data newer than the published
+        payloads, e.g. before the first ingest has published any.
+        """
+        return await fetch_dashboard(self.db, region_id)
+
+    async def stop(self) -> None:
+        self.ready.clear()
+        await self.db.disconnect()
 
 
 async def main():
-    async with AsyncPostgresConnector(
+    global db
+    db = AsyncPostgresConnector(
         host="localhost",
         port=5432,
-        dbname="real_estate_db",   # default when POSTGRES_DB not set
-        user="postgres",     # default when POSTGRES_USER not set
-        password="12345",
-    ) as db:
-        result = await db.fetch_one("SELECT * from properties LIMIT 1;")
-        print(f"Connected!\n{result}")
-
-asyncio.run(main())
\ No newline at end of file
+        dbname="real_estate_db",
+        user="realestate_user",
+        password="devpassword",
+        min_size=2,
+    )
+    app = App(db)
+    try:
+        await app.start()
+        print(f"Connected!\n{len(app.regions)} regions cached, ready in {app.startup_seconds:.3f}s")
+    finally:
+        await app.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
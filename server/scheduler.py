@@ -0,0 +1,434 @@
+# scheduler.py
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVER_DIR = Path(__file__).resolve().parent
+DB_DIR = SERVER_DIR / "db"
+
+ZILLOW_URL = (
+    "https://files.zillowstatic.com/research/public_csvs/"
+    "zhvi/Metro_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv"
+)
+LISTINGS_INDEX_URLS = [
+    "https://www.realestatedataset.com/download/us/for-sale/",
+]
+
+STATE_PATH = Path("./scheduler_state.json")
+REFRESH_INTERVAL = 6 * 60 * 60    # seconds between refresh cycles
+DEFAULT_LIMITS = {
+    "db": 2,                      # concurrent DB jobs; each job opens its own pool
+    "cpu": os.cpu_count() or 1,
+}
+
+PENDING, RUNNING, SUCCEEDED, SKIPPED, FAILED, BLOCKED = (
+    "pending", "running", "succeeded", "skipped", "failed", "blocked"
+)
+
+Fingerprint = Callable[[], Awaitable[Optional[str]]]
+
+
+@dataclass
+class Job:
+    """
+    One node of the refresh graph: a script run as a subprocess.
+
+    inputs returns a fingerprint of the job's external inputs (ETag, content
+    hash...); a job is skipped when that fingerprint and the outputs of all
+    its upstream jobs are unchanged since its last successful run. A job with
+    neither inputs nor dependencies, or whose fingerprint comes back None,
+    always runs.
+    """
+    name: str
+    command: list[str]
+    cwd: Path = SERVER_DIR
+    depends_on: tuple[str, ...] = ()
+    resources: dict[str, int] = field(default_factory=lambda: {"db": 1})
+    inputs: Fingerprint | None = None
+    timeout: float | None = None
+
+
+@dataclass
+class JobStatus:
+    state: str = PENDING
+    started_at: float | None = None
+    finished_at: float | None = None
+    returncode: int | None = None
+    error: str | None = None
+
+    @property
+    def duration(self) -> float | None:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class ResourcePool:
+    """
+    Counted resources (DB connections, CPU workers) acquired all-or-nothing.
+
+    Taking every unit a job needs in one step means two jobs can never each
+    hold part of what the other is waiting for.
+    """
+
+    def __init__(self, limits: dict[str, int]):
+        self.limits = dict(limits)
+        self.available = dict(limits)
+        self._changed = asyncio.Condition()
+
+    def _fits(self, need: dict[str, int]) -> bool:
+        return all(self.available.get(name, 0) >= units for name, units in need.items())
+
+    async def acquire(self, need: dict[str, int]) -> None:
+        for name, units in need.items():
+            if units > self.limits.get(name, 0):
+                raise ValueError(f"Job needs {units} {name} but the limit is {self.limits.get(name, 0)}")
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._fits(need))
+            for name, units in need.items():
+                self.available[name] -= units
+
+    async def release(self, need: dict[str, int]) -> None:
+        async with self._changed:
+            for name, units in need.items():
+                self.available[name] += units
+            self._changed.notify_all()
+
+
+def topological_order(jobs: list[Job]) -> list[str]:
+    """Job names with every job after its dependencies; raises ValueError on unknown names or cycles."""
+    by_name = {job.name: job for job in jobs}
+    order: list[str] = []
+    visiting: set[str] = set()
+
+    def visit(name: str, path: tuple[str, ...]) -> None:
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + (name,))}")
+        if name not in by_name:
+            raise ValueError(f"Unknown job {name!r} in {path[-1]!r} dependencies")
+        visiting.add(name)
+        for dep in by_name[name].depends_on:
+            visit(dep, path + (name,))
+        visiting.discard(name)
+        order.append(name)
+
+    for job in jobs:
+        visit(job.name, ())
+    return order
+
+
+class Scheduler:
+    """
+    Runs a job graph, each job as soon as its dependencies finish.
+
+    Independent jobs run concurrently within the resource limits, so a
+    refresh takes as long as its critical path rather than the sum of every
+    script. Each job's input key (its fingerprint plus the output versions of
+    its upstream jobs) is persisted, letting unchanged jobs be skipped across
+    restarts; a skipped job keeps its output version, so its dependents skip
+    too. A failed job blocks its dependents for the cycle and is retried on
+    the next one.
+    """
+
+    def __init__(
+        self,
+        jobs: list[Job],
+        limits: dict[str, int] = DEFAULT_LIMITS,
+        state_path: Path = STATE_PATH,
+    ):
+        self.order = topological_order(jobs)
+        self.jobs = {job.name: job for job in jobs}
+        self.limits = limits
+        self.state_path = state_path
+        self.state: dict[str, dict] = self._load_state()
+        self.statuses = {name: JobStatus() for name in self.order}
+        self.cycle_started_at: float | None = None
+
+    def _load_state(self) -> dict[str, dict]:
+        if self.state_path.exists():
+            return json.loads(self.state_path.read_text())
+        return {}
+
+    def _save_state(self) -> None:
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        tmp.replace(self.state_path)
+
+    def status(self) -> dict:
+        """Current state of every job, in dependency order."""
+        return {
+            "cycle_started_at": self.cycle_started_at,
+            "jobs": {
+                name: {
+                    "state": s.state,
+                    "depends_on": list(self.jobs[name].depends_on),
+                    "started_at": s.started_at,
+                    "finished_at": s.finished_at,
+                    "duration": s.duration,
+                    "returncode": s.returncode,
+                    "error": s.error,
+                    "output_version": self.state.get(name, {}).get("version", 0),
+                }
+                for name, s in self.statuses.items()
+            },
+        }
+
+    async def _input_key(self, job: Job) -> str | None:
+        if job.inputs is None and not job.depends_on:
+            return None
+        fingerprint = None
+        if job.inputs is not None:
+            try:
+                fingerprint = await job.inputs()
+            except Exception as e:
+                logger.warning(f"Could not fingerprint inputs of {job.name}: {e}")
+            if fingerprint is None:
+                return None
+        upstream = {dep: self.state.get(dep, {}).get("version", 0) for dep in job.depends_on}
+        return json.dumps({"inputs": fingerprint, "upstream": upstream}, sort_keys=True)
+
+    async def _execute(self, job: Job) -> None:
+        status = self.statuses[job.name]
+        proc = await asyncio.create_subprocess_exec(
+            *job.command,
+            cwd=job.cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        try:
+            output, _ = await asyncio.wait_for(proc.communicate(), job.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            proc.kill()
+            await proc.wait()
+            raise
+
+        status.returncode = proc.returncode
+        if proc.returncode != 0:
+            tail = output.decode(errors="replace").strip().splitlines()[-5:]
+            raise RuntimeError(f"exited with {proc.returncode}: {' | '.join(tail)}")
+
+    async def _run_job(self, name: str, done: dict[str, asyncio.Event], pool: ResourcePool) -> None:
+        job = self.jobs[name]
+        status = self.statuses[name]
+        try:
+            for dep in job.depends_on:
+                await done[dep].wait()
+            failed = [dep for dep in job.depends_on if self.statuses[dep].state in (FAILED, BLOCKED)]
+            if failed:
+                status.state = BLOCKED
+                status.error = f"upstream failed: {', '.join(failed)}"
+                logger.warning(f"Job {name} blocked by {', '.join(failed)}")
+                return
+
+            key = await self._input_key(job)
+            if key is not None and key == self.state.get(name, {}).get("input_key"):
+                status.state = SKIPPED
+                logger.info(f"Job {name} skipped: inputs unchanged")
+                return
+
+            await pool.acquire(job.resources)
+            try:
+                status.state = RUNNING
+                status.started_at = time.time()
+                logger.info(f"Job {name} started")
+                await self._execute(job)
+            finally:
+                status.finished_at = time.time()
+                await pool.release(job.resources)
+
+            status.state = SUCCEEDED
+            previous = self.state.get(name, {})
+            self.state[name] = {
+                "input_key": key,
+                "version": previous.get("version", 0) + 1,
+                "succeeded_at": status.finished_at,
+            }
+            self._save_state()
+            logger.info(f"Job {name} succeeded in {status.duration:.1f}s")
+
+        except Exception as e:
+            status.state = FAILED
+            status.error = str(e) or type(e).__name__
+            logger.error(f"Job {name} failed: {status.error}")
+        finally:
+            done[name].set()
+
+    async def run_once(self) -> dict:
+        """
+        Run one refresh cycle over the whole graph.
+
+        Returns:
+            The status snapshot after every job has finished, skipped or been blocked
+        """
+        self.cycle_started_at = time.time()
+        self.statuses = {name: JobStatus() for name in self.order}
+        pool = ResourcePool(self.limits)
+        done = {name: asyncio.Event() for name in self.order}
+
+        await asyncio.gather(*(self._run_job(name, done, pool) for name in self.order))
+
+        elapsed = time.time() - self.cycle_started_at
+        counts = {}
+        for s in self.statuses.values():
+            counts[s.state] = counts.get(s.state, 0) + 1
+        logger.info(f"Refresh cycle finished in {elapsed:.1f}s: {counts}")
+        return self.status()
+
+    async def run_forever(self, interval: float = REFRESH_INTERVAL) -> None:
+        """Run a refresh cycle every `interval` seconds, measured from each cycle's start."""
+        while True:
+            started = time.monotonic()
+            try:
+                await self.run_once()
+            except Exception:
+                # One bad cycle (unreadable state file, full disk...) must not stop the daemon
+                logger.exception("Refresh cycle failed; retrying next interval")
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def serve_status(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        """Answer every HTTP request on host:port with the status() JSON."""
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                await reader.readuntil(b"\r\n\r\n")
+                body = json.dumps(self.status(), indent=2).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        logger.info(f"Serving scheduler status on http://{host}:{port}/")
+        return server
+
+
+async def _validators(client, url: str) -> str:
+    """One file's ETag, Last-Modified and Content-Length, or a hash of its body when it has none."""
+    resp = await client.head(url)
+    resp.raise_for_status()
+    validators = [resp.headers.get(h, "") for h in ("etag", "last-modified", "content-length")]
+    if not any(validators):
+        body = await client.get(url)
+        body.raise_for_status()
+        validators = [hashlib.sha256(body.content).hexdigest()]
+    return f"{url}|{'|'.join(validators)}"
+
+
+def http_fingerprint(urls: list[str]) -> Fingerprint:
+    """
+    Fingerprint remote files by their validators (ETag, Last-Modified,
+    Content-Length) from a HEAD request, falling back to a hash of the body
+    when the server sends none.
+    """
+
+    async def fingerprint() -> str:
+        import httpx
+
+        async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+            parts = [await _validators(client, url) for url in urls]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    return fingerprint
+
+
+def listings_fingerprint(index_urls: list[str]) -> Fingerprint:
+    """
+    Fingerprint the data files linked from listings index pages.
+
+    The index pages carry no useful validators of their own, so each page is
+    read with the same link extraction fetch_listings uses and the linked
+    files are fingerprinted by their HEAD validators; a new, removed or
+    updated file changes the result.
+    """
+
+    async def fingerprint() -> str:
+        import httpx
+
+        # fetch_listings lives with the loaders in db/, which import each other by bare name
+        if str(DB_DIR) not in sys.path:
+            sys.path.insert(0, str(DB_DIR))
+        from fetch_listings import extract_download_links
+
+        parts = []
+        async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+            for index_url in index_urls:
+                page = await client.get(index_url)
+                page.raise_for_status()
+                for url in extract_download_links(page.text, str(page.url)):
+                    parts.append(await _validators(client, url))
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    return fingerprint
+
+
+def default_jobs() -> list[Job]:
+    """
+    The refresh graph for the existing loaders.
+
+    regions/metro_us (ingest, which also publishes the dashboard payloads and
+    the similarity table) must precede property_listings because of the
+    region foreign key; zillow_data has no dependencies.
+
+    Any job can run again whenever its fingerprint changes, so each one
+    replaces its data instead of appending to it: zillow_data through
+    reload_table, ingest through reload_metro's partition swaps, and
+    listings through keyed upserts.
+    """
+    python = sys.executable
+    zillow = http_fingerprint([ZILLOW_URL])
+    return [
+        Job("zillow_data", [python, "get_data.py"], SERVER_DIR, inputs=zillow),
+        Job("ingest", [python, "ingest.py"], DB_DIR, resources={"db": 1, "cpu": 1}, inputs=zillow),
+        Job(
+            "listings",
+            [python, "fetch_listings.py"],
+            DB_DIR,
+            depends_on=("ingest",),
+            resources={"db": 1, "cpu": 1},
+            inputs=listings_fingerprint(LISTINGS_INDEX_URLS),
+        ),
+    ]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Refresh daemon for the real estate loaders")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    parser.add_argument("--interval", type=float, default=REFRESH_INTERVAL, help="seconds between cycles")
+    parser.add_argument("--status-port", type=int, default=None, help="serve job status JSON on this port")
+    parser.add_argument("--state", type=Path, default=STATE_PATH, help="where input keys are persisted")
+    args = parser.parse_args()
+
+    scheduler = Scheduler(default_jobs(), state_path=args.state)
+    server = await scheduler.serve_status(port=args.status_port) if args.status_port else None
+    try:
+        if args.once:
+            status = await scheduler.run_once()
+            print(json.dumps(status, indent=2))
+        else:
+            await scheduler.run_forever(args.interval)
+    finally:
+        if server is not None:
+            server.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
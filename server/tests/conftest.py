@@ -0,0 +1,10 @@
+# conftest.py
+import sys
+from pathlib import Path
+
+# The server and db modules are run as scripts and import each other by bare
+# name, so put both directories on the path the same way running them does
+SERVER_DIR = Path(__file__).resolve().parent.parent
+for path in (SERVER_DIR, SERVER_DIR / "db"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
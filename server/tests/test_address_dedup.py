@@ -0,0 +1,84 @@
+# test_address_dedup.py
+import pandas as pd
+import pytest
+
+from address_dedup import (
+    StoredKeys,
+    cluster_listings,
+    dedupe_listings,
+    match_stored,
+    normalize_addresses,
+    normalize_keys,
+)
+
+
+def _listings(addresses: list[str], parcels: list[str] | None = None, last_change: list[str] | None = None):
+    n = len(addresses)
+    return pd.DataFrame({
+        "address": addresses,
+        "city": "Dallas",
+        "state": "tx",
+        "zip": "75001-1234",
+        "parcel": parcels or [""] * n,
+        "last_change": last_change or [None] * n,
+    })
+
+
+def _clusters(addresses: list[str], parcels: list[str] | None = None) -> list[int]:
+    return cluster_listings(normalize_keys(_listings(addresses, parcels))).tolist()
+
+
+def test_normalize_addresses():
+    normalized = normalize_addresses(pd.Series(["123 Main Street, Apt. 4", "123 MAIN ST #4", "9 north Elm Avenue"]))
+    assert normalized.tolist() == ["123 MAIN ST UNIT 4", "123 MAIN ST UNIT 4", "9 N ELM AVE"]
+
+
+def test_normalize_keys_truncates_zip_plus_four():
+    keys = normalize_keys(_listings(["1 Elm St"]))
+    assert (keys["zip"].iloc[0], keys["state"].iloc[0]) == ("75001", "TX")
+
+
+def test_same_address_spelled_differently_merges():
+    assert _clusters(["123 Main Street", "123 MAIN ST.", "123 main st"]) == [0, 0, 0]
+
+
+@pytest.mark.parametrize("other", ["123 Main Ct", "123 N Main St", "123 S Main St", "123 Main St N", "123 Main St Apt 2"])
+def test_different_suffix_directional_or_unit_never_merges(other):
+    assert _clusters(["123 Main St", other]) == [0, 1]
+
+
+def test_typo_in_street_name_merges():
+    assert _clusters(["789 Washington Blvd", "789 Washingtn Blvd"]) == [0, 0]
+
+
+def test_numbered_streets_stay_apart():
+    assert _clusters(["10 121st St", "10 122nd St", "10 131st St"]) == [0, 1, 2]
+
+
+def test_parcel_merges_only_same_unit():
+    addresses = ["456 Oak Ave Apt 1", "456 Oak Avenue Apt 2", "456 Oak Ave Unit 1", "12 Pine Rd"]
+    parcels = ["P-1", "P-1", "P-1", "P-1"]
+    # The unit-less row shares the parcel but not a unit with any other row
+    assert _clusters(addresses, parcels) == [0, 1, 0, 3]
+
+
+def test_dedupe_keeps_latest_row():
+    df = _listings(
+        ["123 Main Street", "123 Main St", "5 Elm St"],
+        last_change=["2024-03-01", "2024-01-01", "2024-02-01"],
+    )
+    out = dedupe_listings(df)
+    assert out["address"].tolist() == ["123 MAIN ST", "5 ELM ST"]
+    assert out["last_change"].tolist() == ["2024-03-01", "2024-02-01"]
+
+
+def test_match_stored_reuses_existing_keys_across_batches():
+    stored = StoredKeys(normalize_keys(_listings(["789 Washington Blvd", "5 Elm St"])))
+
+    first = match_stored(dedupe_listings(_listings(["789 Washingtn Boulevard", "12 Pine Rd"])), stored)
+    assert first["address"].tolist() == ["789 WASHINGTON BLVD", "12 PINE RD"]
+
+    # The new listing from the first batch is matched by the next one
+    second = match_stored(dedupe_listings(_listings(["12 Pine Road", "12 Pine Rd Apt 1"])), stored)
+    assert second["address"].tolist() == ["12 PINE RD", "12 PINE RD UNIT 1"]
+    assert len(stored) == 4
@@ -0,0 +1,229 @@
+# test_fetch_listings.py
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import fetch_listings
+import get_individual_listings
+import listings_merge
+import sampling
+import snapshots
+from fetch_listings import extract_download_links, fetch_listing_files
+
+FILES = {f"/files/{name}.csv": f"address,price\n{name} Main St,{i}\n".encode() for i, name in enumerate("abcdef")}
+BIG = b"".join(b"%d Elm St,%d\n" % (i, i) for i in range(200_000))
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Listings site stand-in; behaviour per path, with request counts and peak concurrency."""
+
+    index = ""
+    requests: dict[str, int] = {}
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", length: int | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body) if length is None else length))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            count = cls.requests[self.path] = cls.requests.get(self.path, 0) + 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            if self.path == "/index.html":
+                self._send(200, cls.index.encode())
+            elif self.path in FILES:
+                time.sleep(0.05)
+                self._send(200, FILES[self.path])
+            elif self.path == "/throttled.csv":
+                self._send(503) if count <= 2 else self._send(200, FILES["/files/a.csv"])
+            elif self.path == "/truncated.csv":
+                # First attempt promises more bytes than it sends, then drops the connection
+                if count == 1:
+                    self._send(200, BIG[:1000], length=len(BIG))
+                    self.close_connection = True
+                else:
+                    self._send(200, BIG)
+            elif self.path == "/chunked.csv":
+                self.send_response(200)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for start in range(0, len(BIG), 65536):
+                    piece = BIG[start:start + 65536]
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                self.wfile.write(b"0\r\n\r\n")
+            elif self.path == "/slow.csv":
+                time.sleep(2)
+                self._send(200, b"late\n")
+            else:
+                self._send(404)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+@pytest.fixture
+def site(monkeypatch):
+    StandIn.requests, StandIn.active, StandIn.peak = {}, 0, 0
+    monkeypatch.setattr(fetch_listings, "BACKOFF_BASE", 0)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def serve(*paths: str) -> list[str]:
+        StandIn.index = "".join(f'<a href="{p}">{p}</a>' for p in paths) + '<a href="/about">about</a>'
+        return [f"{base}/index.html"]
+
+    yield serve
+    server.shutdown()
+    server.server_close()
+
+
+def test_extract_download_links():
+    html = '<a href="a.csv">a</a><a href="/x/b.TSV">b</a><a href="a.csv">again</a><a href="c.zip">c</a>'
+    assert extract_download_links(html, "https://example.com/list/") == [
+        "https://example.com/list/a.csv",
+        "https://example.com/x/b.TSV",
+    ]
+
+
+def test_downloads_every_file_with_bounded_concurrency(site, tmp_path):
+    index = site(*FILES)
+    seen = []
+
+    async def on_downloaded(path):
+        seen.append(path.name)
+
+    paths = asyncio.run(fetch_listing_files(index, tmp_path, concurrency=2, on_downloaded=on_downloaded))
+
+    assert sorted(p.name for p in paths) == sorted(seen) == [f"{name}.csv" for name in "abcdef"]
+    assert all(p.read_bytes() == FILES[f"/files/{p.name}"] for p in paths)
+    assert StandIn.peak == 2
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_retries_throttling_and_dropped_connections(site, tmp_path):
+    index = site("/throttled.csv", "/truncated.csv")
+    paths = asyncio.run(fetch_listing_files(index, tmp_path))
+
+    assert {p.name for p in paths} == {"throttled.csv", "truncated.csv"}
+    assert StandIn.requests["/throttled.csv"] == 3
+    assert StandIn.requests["/truncated.csv"] == 2
+    assert (tmp_path / "truncated.csv").read_bytes() == BIG
+
+
+def test_streams_body_to_disk_in_chunks(site, tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_listings, "STREAM_CHUNK_SIZE", 16384)
+    writes = []
+    real_open = open
+
+    def spying_open(path, mode="r", *args, **kwargs):
+        f = real_open(path, mode, *args, **kwargs)
+        if "w" in mode:
+            write = f.write
+            f.write = lambda chunk: writes.append(len(chunk)) or write(chunk)
+        return f
+
+    monkeypatch.setattr(fetch_listings, "open", spying_open, raising=False)
+    paths = asyncio.run(fetch_listing_files(site("/chunked.csv"), tmp_path))
+
+    assert paths[0].read_bytes() == BIG
+    assert len(writes) > 1 and max(writes) <= 16384
+
+
+def test_failed_download_cancels_the_others(site, tmp_path):
+    index = site("/missing.csv", "/slow.csv")
+    started = time.perf_counter()
+    with pytest.raises(ExceptionGroup) as failure:
+        asyncio.run(fetch_listing_files(index, tmp_path))
+
+    assert failure.group_contains(httpx.HTTPStatusError)
+    assert time.perf_counter() - started < 1.5
+    assert not (tmp_path / "slow.csv").exists()
+
+
+class FakeConnector:
+    instances: list["FakeConnector"] = []
+
+    def __init__(self):
+        self.events = []
+        FakeConnector.instances.append(self)
+
+    async def connect(self):
+        self.events.append("connect")
+
+    async def disconnect(self):
+        self.events.append("disconnect")
+
+
+@pytest.fixture
+def offline_main(monkeypatch, tmp_path):
+    """fetch_listings.main with the database, archive and loader replaced by recorders."""
+    FakeConnector.instances = []
+    monkeypatch.setattr(fetch_listings, "AsyncPostgresConnector", FakeConnector)
+    # main imports its loaders when it runs, so they are replaced at their source
+    monkeypatch.setattr(snapshots, "archive_delimited", lambda path: None)
+
+    async def load_stored_keys(connector):
+        return None
+
+    async def refresh_sample(connector):
+        connector.events.append("refresh_sample")
+
+    monkeypatch.setattr(listings_merge, "load_stored_keys", load_stored_keys)
+    monkeypatch.setattr(sampling, "refresh_sample", refresh_sample)
+    return tmp_path
+
+
+def test_main_cleans_up_when_the_loader_fails(offline_main, monkeypatch):
+    async def load_tsv(connector, path, stored):
+        raise RuntimeError("bad file")
+
+    async def fetch(on_downloaded):
+        await on_downloaded(offline_main / "a.csv")
+        await asyncio.sleep(30)   # must be cancelled, not waited out
+
+    monkeypatch.setattr(get_individual_listings, "load_tsv", load_tsv)
+    monkeypatch.setattr(fetch_listings, "fetch_listing_files", fetch)
+
+    started = time.perf_counter()
+    with pytest.raises(ExceptionGroup) as failure:
+        asyncio.run(fetch_listings.main())
+    assert failure.group_contains(RuntimeError)
+    assert time.perf_counter() - started < 5
+    assert FakeConnector.instances[0].events == ["connect", "refresh_sample", "disconnect"]
+
+
+def test_main_cleans_up_when_a_download_fails(offline_main, monkeypatch):
+    loaded = []
+
+    async def load_tsv(connector, path, stored):
+        loaded.append(path)
+
+    async def fetch(on_downloaded):
+        await on_downloaded(offline_main / "a.csv")
+        await asyncio.sleep(0.05)
+        raise httpx.ConnectError("gone")
+
+    monkeypatch.setattr(get_individual_listings, "load_tsv", load_tsv)
+    monkeypatch.setattr(fetch_listings, "fetch_listing_files", fetch)
+
+    with pytest.raises(ExceptionGroup) as failure:
+        asyncio.run(fetch_listings.main())
+    assert failure.group_contains(httpx.ConnectError)
+    assert loaded == [str(offline_main / "a.csv")]
+    assert FakeConnector.instances[0].events == ["connect", "refresh_sample", "disconnect"]
@@ -0,0 +1,78 @@
+# test_listings_merge.py
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+
+from listings_merge import STORED_KEYS_SQL, backfill_stored_keys, load_stored_keys
+
+
+class FakeConnector:
+    """Answers the key reads with `rows` and records what the backfill writes."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.copied = []
+        self.executed = []
+
+    async def fetch_all(self, query, params=None):
+        self.queries.append(query)
+        if query == STORED_KEYS_SQL:
+            return [row[1:6] for row in self.rows]
+        return self.rows
+
+    @asynccontextmanager
+    async def transaction(self):
+        connector = self
+
+        class Copy:
+            async def write_row(self, row):
+                connector.copied.append(tuple(row))
+
+        class Cursor:
+            async def execute(self, query):
+                connector.executed.append(query)
+
+            @asynccontextmanager
+            async def copy(self, statement):
+                yield Copy()
+
+        class Conn:
+            @asynccontextmanager
+            async def cursor(self):
+                yield Cursor()
+
+        yield Conn()
+
+
+def _row(id, address, last_change):
+    return (id, address, "AUSTIN", "TX", "78701", "", date(2024, 1, last_change))
+
+
+def test_load_stored_keys_only_reads():
+    db = FakeConnector([_row(1, "123 MAIN ST", 1), _row(2, "9 OAK AVE", 2)])
+    stored = asyncio.run(load_stored_keys(db))
+    assert len(stored) == 2 and db.queries == [STORED_KEYS_SQL]
+    assert not db.executed
+
+
+def test_backfill_merges_raw_duplicates_into_the_latest_row():
+    db = FakeConnector([
+        _row(1, "123 Main Street", 1),
+        _row(2, "123 MAIN ST.", 5),
+        _row(3, "9 OAK AVE", 2),
+        _row(4, "5 Oak Avenue #1", 1),
+    ])
+    assert asyncio.run(backfill_stored_keys(db)) == (2, 1)
+    # (id, survivor_id, canonical key); row 3 is already canonical and untouched
+    assert sorted(db.copied) == [
+        (1, 2, "123 MAIN ST", "AUSTIN", "TX", "78701"),
+        (2, 2, "123 MAIN ST", "AUSTIN", "TX", "78701"),
+        (4, 4, "5 OAK AVE UNIT 1", "AUSTIN", "TX", "78701"),
+    ]
+
+
+def test_backfill_of_a_canonical_table_writes_nothing():
+    db = FakeConnector([_row(1, "123 MAIN ST", 1), _row(2, "9 OAK AVE", 2)])
+    assert asyncio.run(backfill_stored_keys(db)) == (0, 0)
+    assert not db.executed and not db.copied
@@ -0,0 +1,92 @@
+# test_main.py
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from main import App
+from payload_cache import FILTERS_KEY, region_key
+
+FILTERS = gzip.compress(json.dumps({"states": ["TX"], "regions": [], "years": [2024]}).encode())
+
+
+class FakeConnector:
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.events = []
+        self.blobs = {(FILTERS_KEY, "json"): FILTERS, (region_key(1), "json"): b"austin"}
+        self.payload_reads = 0
+        self.index_builds = 0
+
+    async def connect(self):
+        self.events.append("connect")
+
+    async def disconnect(self):
+        self.events.append("disconnect")
+
+    async def wait_ready(self, timeout):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("pool never filled")
+
+    def register_statement(self, name, query):
+        pass
+
+    async def fetch_prepared(self, name, params=None, as_dict=False, one=False):
+        if name == "payload_generation":
+            return (3,)
+        if name == "payload":
+            self.payload_reads += 1
+            generation, key, fmt = params
+            body = self.blobs.get((key, fmt))
+            return None if body is None else (body,)
+        return [{"region_id": 1, "region_name": "Austin", "state_name": "TX"}]
+
+    async def fetch_all(self, query, params=None):
+        # Region search index rows: region_id, region_name, state_name, size_rank
+        self.index_builds += 1
+        return [(1, "Austin, TX", "TX", 40)]
+
+
+def test_start_closes_the_pool_when_warmup_fails():
+    db = FakeConnector(fail=True)
+    with pytest.raises(ConnectionError):
+        asyncio.run(App(db).start())
+    assert db.events == ["connect", "disconnect"]
+
+
+def test_start_closes_the_pool_when_warmup_times_out():
+    db = FakeConnector(delay=5)
+    with pytest.raises(TimeoutError):
+        asyncio.run(App(db).start(timeout=0.05))
+    assert db.events == ["connect", "disconnect"]
+
+
+def test_start_keeps_the_pool_open_when_ready():
+    db = FakeConnector()
+    app = App(db)
+    asyncio.run(app.start())
+    assert app.ready.is_set() and len(app.regions) == 1
+    assert app.snapshot["states"] == ["TX"] and app.snapshot_generation == 3
+    assert db.events == ["connect"]
+    # The search index is built during warm-up, not on the first search
+    assert db.index_builds == 1
+    matches = asyncio.run(app.search_regions("aus"))
+    assert [m.region_id for m in matches] == [1] and db.index_builds == 1
+
+
+def test_requests_are_served_from_the_payload_cache():
+    db = FakeConnector()
+    app = App(db)
+
+    async def run():
+        await app.start()
+        assert await app.filters_payload() == FILTERS
+        assert await app.region_payload(1) == await app.region_payload(1) == b"austin"
+        assert await app.region_payload(2) is None
+
+    asyncio.run(run())
+    # Filters were cached at warm-up and each region blob is read once
+    assert db.payload_reads == 3
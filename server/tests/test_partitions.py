@@ -0,0 +1,75 @@
+# test_partitions.py
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+
+from partitions import _bounds, group_rows_by_year, metro_partition_name, reload_metro, row_year
+
+
+class RecordingConnector:
+    """Renders every statement to text; `existing` names the partitions to_regclass finds."""
+
+    def __init__(self, existing: set[str] = frozenset()):
+        self.existing = existing
+        self.statements: list[str] = []
+        self.transactions: list[list[str]] = []
+        self.copied: dict[str, list[tuple]] = {}
+
+    def _render(self, query) -> str:
+        return query if isinstance(query, str) else query.as_string(None)
+
+    async def execute(self, query, params=None):
+        self.statements.append(self._render(query))
+
+    async def copy_from(self, table, rows, columns):
+        self.copied[table] = list(rows)
+        return len(self.copied[table])
+
+    @asynccontextmanager
+    async def transaction(self):
+        recorded: list[str] = []
+        existing = self.existing
+
+        class Cursor:
+            def __init__(self, found):
+                self.found = found
+
+            async def fetchone(self):
+                return (self.found,)
+
+        class Conn:
+            async def execute(_, query, params=None):
+                recorded.append(self._render(query))
+                return Cursor(bool(params) and params[0] in existing)
+
+        yield Conn()
+        self.transactions.append(recorded)
+
+
+def test_partition_naming_and_bounds():
+    assert metro_partition_name(2024) == "metro_us_y2024"
+    assert _bounds(1999) == ("1999-01-01", "2000-01-01")
+    assert row_year(date(2021, 12, 31)) == row_year("2021-12-31") == 2021
+
+
+def test_group_rows_by_year():
+    rows = [(1, 0, "2020-12-31", 1.0), (1, 0, date(2021, 1, 31), 2.0), (2, 1, "2020-01-31", 3.0)]
+    groups = group_rows_by_year(rows)
+    assert sorted(groups) == [2020, 2021]
+    assert [r[3] for r in groups[2020]] == [1.0, 3.0]
+
+
+def test_reload_swaps_each_year_under_a_lock_timeout():
+    db = RecordingConnector(existing={"metro_us_y2020"})
+    rows = {2020: [(1, 0, "2020-01-31", 1.0)], 2021: iter([(1, 0, "2021-01-31", 2.0)])}
+    assert asyncio.run(reload_metro(db, rows)) == 2
+
+    assert set(db.copied) == {"metro_us_y2020_staging", "metro_us_y2021_staging"}
+    replaced, added = db.transactions
+    assert replaced[0] == added[0] == "SET LOCAL lock_timeout = '5s'"
+    assert any("DETACH PARTITION" in s for s in replaced)
+    assert not any("DETACH PARTITION" in s for s in added)
+    # Staging index names move to the partition's names only after the old partition is gone
+    rename = next(s for s in added if "RENAME TO" in s)
+    assert '"metro_us_y2021_staging_date_brin" RENAME TO "metro_us_y2021_date_brin"' in rename
+    assert "ATTACH PARTITION" in added[-1] and "'2021-01-01'" in added[-1]
@@ -0,0 +1,74 @@
+# test_payload_cache.py
+import asyncio
+
+from payload_cache import PayloadCache, region_key
+
+
+class FakeConnector:
+    """Holds published generations as {generation: {(key, fmt): body}} and counts queries."""
+
+    def __init__(self):
+        self.generations: dict[int, dict] = {}
+        self.queries = 0
+
+    def register_statement(self, name, sql):
+        pass
+
+    def publish(self, generation, blobs, keep=2):
+        self.generations[generation] = blobs
+        for old in [g for g in self.generations if g <= generation - keep]:
+            del self.generations[old]
+
+    async def fetch_prepared(self, name, params=(), one=False):
+        self.queries += 1
+        if name == "payload_generation":
+            return (max(self.generations, default=None),)
+        generation, key, fmt = params
+        body = self.generations.get(generation, {}).get((key, fmt))
+        return None if body is None else (body,)
+
+
+def test_miss_after_publish_and_prune_refreshes():
+    db = FakeConnector()
+    db.publish(1, {(region_key(1), "json"): b"one"})
+    cache = PayloadCache(db, max_age=3600)
+
+    async def run():
+        assert await cache.get(region_key(1)) == b"one"
+        db.publish(2, {(region_key(1), "json"): b"two", (region_key(2), "json"): b"new"})
+        db.publish(3, {(region_key(1), "json"): b"three", (region_key(2), "json"): b"new"})
+        # Generation 1 is pruned: the first uncached key moves the reader forward
+        assert await cache.get(region_key(2)) == b"new"
+        assert cache.generation == 3
+        assert await cache.get(region_key(1)) == b"three"
+        assert await cache.get(region_key(9)) is None
+
+    asyncio.run(run())
+
+
+def test_generation_is_rechecked_after_max_age():
+    db = FakeConnector()
+    db.publish(1, {(region_key(1), "json"): b"one"})
+
+    async def run(max_age):
+        cache = PayloadCache(db, max_age=max_age)
+        await cache.get(region_key(1))
+        db.publish(2, {(region_key(1), "json"): b"two"})
+        return await cache.get(region_key(1))
+
+    assert asyncio.run(run(3600)) == b"one"
+    db.generations.pop(2)
+    assert asyncio.run(run(0)) == b"two"
+
+
+def test_cached_hits_skip_the_database():
+    db = FakeConnector()
+    db.publish(1, {(region_key(1), "json"): b"one"})
+    cache = PayloadCache(db, max_age=3600)
+
+    async def run():
+        for _ in range(5):
+            assert await cache.get(region_key(1)) == b"one"
+
+    asyncio.run(run())
+    assert db.queries == 2
@@ -0,0 +1,150 @@
+# test_postgres_connector.py
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from psycopg import postgres
+
+from postgres_connector import _INDEXDEF_RE, SyncQueryBatch, _frame_from_csv, _ReloadPlan
+
+
+@pytest.mark.parametrize(
+    "definition, unique, body",
+    [
+        (
+            "CREATE INDEX idx_listings_state ON public.property_listings USING btree (state)",
+            None,
+            "USING btree (state)",
+        ),
+        (
+            "CREATE UNIQUE INDEX zillow_key ON ONLY public.zillow_data USING btree (region_id, date) "
+            "INCLUDE (avg_cost) WHERE (avg_cost IS NOT NULL)",
+            "UNIQUE ",
+            "USING btree (region_id, date) INCLUDE (avg_cost) WHERE (avg_cost IS NOT NULL)",
+        ),
+        (
+            'CREATE INDEX "Odd Name" ON public."Mixed" USING brin (date) WITH (pages_per_range=32)',
+            None,
+            "USING brin (date) WITH (pages_per_range=32)",
+        ),
+    ],
+)
+def test_indexdef_rewrite_keeps_everything_after_the_table(definition, unique, body):
+    match = _INDEXDEF_RE.match(definition)
+    assert match is not None
+    assert match.group(1) == unique
+    assert match.group(2) == body
+
+
+def test_indexdef_rejects_unexpected_shapes():
+    assert _INDEXDEF_RE.match("CREATE INDEX CONCURRENTLY i ON t USING btree (a)") is None
+
+
+def _oid(name: str) -> int:
+    return postgres.types[name].oid
+
+
+def test_frame_from_csv_types_columns_from_the_description():
+    columns = [
+        ("zip", _oid("text"), None, None),
+        ("beds", _oid("int4"), None, None),
+        ("price", _oid("numeric"), 15, 2),
+        ("ratio", _oid("numeric"), None, None),
+        ("listed", _oid("date"), None, None),
+        ("active", _oid("bool"), None, None),
+        ("zip", _oid("varchar"), None, None),
+    ]
+    data = b'01234,3,100000.50,0.5,2024-02-29,t,""\n,,,,,,NULL\n'
+    frame = _frame_from_csv(data, columns)
+
+    assert list(frame.columns) == ["zip", "beds", "price", "ratio", "listed", "active", "zip"]
+    first, second = frame.iloc[0].tolist(), frame.iloc[1].tolist()
+    assert first == ["01234", 3, Decimal("100000.50"), 0.5, date(2024, 2, 29), True, ""]
+    # An unquoted empty field is NULL; a quoted one, or the word NULL, is text
+    assert all(pd.isna(v) for v in second[:6]) and second[6] == "NULL"
+    assert str(frame.dtypes.iloc[2]) == "decimal128(15, 2)[pyarrow]"
+
+
+def test_frame_from_csv_of_an_empty_result_keeps_the_types():
+    frame = _frame_from_csv(b"", [("zip", _oid("text"), None, None), ("n", _oid("int8"), None, None)])
+    assert frame.empty and [str(t) for t in frame.dtypes] == ["string[pyarrow]", "int64[pyarrow]"]
+
+
+def test_frame_from_csv_column_type_override():
+    frame = _frame_from_csv(b"7\n", [("n", _oid("int4"), None, None)], {"n": pa.string()})
+    assert frame["n"].tolist() == ["7"]
+
+
+def _render(statements) -> list[str]:
+    return [s.as_string(None) for s in statements]
+
+
+def test_reload_plan_hands_serial_sequences_to_the_new_table():
+    plan = _ReloadPlan(
+        "zillow_data",
+        constraints=[("zillow_data_pkey", "PRIMARY KEY (id)")],
+        indexes=[("zillow_date", "CREATE INDEX zillow_date ON public.zillow_data USING btree (date)")],
+        owned_sequences=[("zillow_data_id_seq", "id")],
+        logged=True,
+    )
+    before, after, swap = _render(plan.before_copy), _render(plan.after_copy), _render(plan.swap)
+
+    assert before[:2] == ['DROP TABLE IF EXISTS "zillow_data_shadow"', 'DROP TABLE IF EXISTS "zillow_data_old"']
+    assert after[0] == 'ALTER TABLE "zillow_data_shadow" SET LOGGED'
+    assert 'CREATE INDEX "zillow_date_shadow" ON "zillow_data_shadow" USING btree (date)' in after
+    assert swap[0] == "SET LOCAL lock_timeout = '5s'"
+    owned = swap.index('ALTER SEQUENCE zillow_data_id_seq OWNED BY "zillow_data"."id"')
+    assert owned < swap.index('DROP TABLE "zillow_data_old"')
+    assert swap[-1] == 'ALTER INDEX "zillow_date_shadow" RENAME TO "zillow_date"'
+
+
+def test_reload_plan_rejects_indexes_it_cannot_rebuild():
+    with pytest.raises(ValueError):
+        _ReloadPlan("t", [], [("i", "CREATE INDEX CONCURRENTLY i ON t USING btree (a)")], [], logged=False)
+
+
+class FakePipelineConnection:
+    """Runs 'SELECT n' queries; records execution order and that a pipeline was used."""
+
+    def __init__(self):
+        self.executed = []
+        self.pipelined = False
+
+    @contextmanager
+    def pipeline(self):
+        self.pipelined = True
+        yield
+
+    def cursor(self, row_factory=None):
+        connection = self
+
+        class Cursor:
+            def execute(self, query, params=None, prepare=None):
+                connection.executed.append((query, params, prepare))
+                self.rows = [(params[0],), (params[0] + 1,)]
+
+            def fetchone(self):
+                return self.rows[0]
+
+            def fetchall(self):
+                return self.rows
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+
+def test_sync_batch_resolves_each_future_with_its_own_rows():
+    batch = SyncQueryBatch({"next": "SELECT %s"})
+    first = batch.fetch_prepared("next", (1,), one=True)
+    second = batch.fetch_all("SELECT %s", (10,))
+    conn = FakePipelineConnection()
+    batch.run(conn)
+
+    assert conn.pipelined
+    assert conn.executed == [("SELECT %s", (1,), True), ("SELECT %s", (10,), None)]
+    assert first.result() == (1,) and second.result() == [(10,), (11,)]
@@ -0,0 +1,120 @@
+# test_queries.py
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+from decimal import Decimal
+
+from psycopg.rows import dict_row
+
+from postgres_connector import AsyncPostgresConnector
+from queries import DASHBOARD_STATEMENTS, fetch_dashboard, register_dashboard_statements
+
+SERIES = [(date(2024, 1, 31), Decimal("350000.00")), (date(2024, 2, 29), Decimal("351000.00"))]
+REGIONS = [(1, "Austin, TX", "TX"), (2, "Dallas, TX", "TX")]
+YEARS = [(2024,), (2023,)]
+
+
+class FakePipelineConnection:
+    """Answers the dashboard statements by text; records the order they were sent in."""
+
+    def __init__(self):
+        self.sent = []
+        self.pipelined = False
+        self.answers = {
+            DASHBOARD_STATEMENTS["region_series"]: SERIES,
+            DASHBOARD_STATEMENTS["regions"]: REGIONS,
+            DASHBOARD_STATEMENTS["years"]: YEARS,
+        }
+
+    @asynccontextmanager
+    async def pipeline(self):
+        self.pipelined = True
+        yield
+
+    def cursor(self, row_factory=None):
+        connection = self
+
+        class Cursor:
+            async def execute(self, query, params=None, prepare=None):
+                connection.sent.append((query, params, prepare))
+                rows = connection.answers[query]
+                if row_factory is dict_row:
+                    rows = [dict(zip(["region_id", "region_name", "state_name"], r)) for r in rows]
+                self.rows = rows
+
+            async def fetchone(self):
+                return self.rows[0] if self.rows else None
+
+            async def fetchall(self):
+                return self.rows
+
+            async def close(self):
+                pass
+
+        return Cursor()
+
+
+class PipelineConnector(AsyncPostgresConnector):
+    """The real connector with every connection replaced by one fake."""
+
+    def __init__(self):
+        super().__init__()
+        self.connection = FakePipelineConnection()
+
+    def _get_connection(self):
+        connection = self.connection
+
+        @asynccontextmanager
+        async def checkout():
+            yield connection
+
+        return checkout()
+
+
+def test_batch_sends_in_order_and_maps_each_result_to_its_query():
+    db = PipelineConnector()
+    register_dashboard_statements(db)
+
+    async def run():
+        async with db.batch() as batch:
+            years = batch.fetch_prepared("years")
+            first = batch.fetch_prepared("region_series", (7,), one=True)
+            regions = batch.fetch_all(DASHBOARD_STATEMENTS["regions"])
+            assert not years.done()
+        return years.result(), first.result(), regions.result()
+
+    years, first, regions = asyncio.run(run())
+    assert (years, first, regions) == (YEARS, SERIES[0], REGIONS)
+    assert db.connection.pipelined
+    assert [(q, p, prep) for q, p, prep in db.connection.sent] == [
+        (DASHBOARD_STATEMENTS["years"], None, True),
+        (DASHBOARD_STATEMENTS["region_series"], (7,), True),
+        (DASHBOARD_STATEMENTS["regions"], None, None),
+    ]
+
+
+def test_batch_that_raises_sends_nothing():
+    db = PipelineConnector()
+    register_dashboard_statements(db)
+
+    async def run():
+        try:
+            async with db.batch() as batch:
+                batch.fetch_prepared("years")
+                raise KeyError("page gone")
+        except KeyError:
+            pass
+
+    asyncio.run(run())
+    assert db.connection.sent == []
+
+
+def test_fetch_dashboard_shapes_one_round_trip():
+    db = PipelineConnector()
+    register_dashboard_statements(db)
+    page = asyncio.run(fetch_dashboard(db, 1))
+
+    assert page["series"] == SERIES
+    assert page["regions"][0] == {"region_id": 1, "region_name": "Austin, TX", "state_name": "TX"}
+    assert page["years"] == [2024, 2023]
+    assert len(db.connection.sent) == 3
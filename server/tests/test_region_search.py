@@ -0,0 +1,80 @@
+# test_region_search.py
+import asyncio
+
+from region_search import RegionIndex, RegionSearch
+
+ROWS = [
+    (1, "San Francisco, CA", "CA", 12),
+    (2, "Francisco, TX", "TX", 500),
+    (3, "San Antonio, TX", "TX", 24),
+    (4, "San Diego, CA", "CA", 17),
+    (5, "Sanford, FL", "FL", 400),
+    (6, "Austin, TX", "TX", 26),
+    (7, "Santa Fe, NM", "NM", None),
+]
+
+
+def _names(matches) -> list[str]:
+    return [m.region_name for m in matches]
+
+
+def test_prefix_search_puts_name_prefixes_first_then_bigger_markets():
+    index = RegionIndex(ROWS)
+    assert _names(index.search("san fr")) == ["San Francisco, CA"]
+    # Name prefixes by size_rank; unranked regions last
+    assert _names(index.search("san")) == [
+        "San Francisco, CA", "San Diego, CA", "San Antonio, TX", "Sanford, FL", "Santa Fe, NM",
+    ]
+    # "francisco" only prefixes a later word of San Francisco, so Francisco, TX leads
+    assert _names(index.search("francisco")) == ["Francisco, TX", "San Francisco, CA"]
+    assert _names(index.search("san", limit=2)) == ["San Francisco, CA", "San Diego, CA"]
+
+
+def test_state_filter_and_state_tokens():
+    index = RegionIndex(ROWS)
+    assert _names(index.search("san", state="TX")) == ["San Antonio, TX"]
+    assert _names(index.search("tx", state="TX")) == ["San Antonio, TX", "Austin, TX", "Francisco, TX"]
+    assert index.search("austin", state="CA") == []
+
+
+def test_fuzzy_matches_rank_the_full_name_above_one_matching_word():
+    index = RegionIndex(ROWS)
+    matches = index.search("sna francisco")
+    assert _names(matches) == ["San Francisco, CA", "Francisco, TX"]
+    assert matches[0].score > matches[1].score
+    assert _names(index.search("snata fe")) == ["Santa Fe, NM"]
+    assert index.search("qqqq") == []
+
+
+class FakeConnector:
+    def __init__(self):
+        self.generation = 1
+        self.rows = ROWS[:2]
+        self.builds = 0
+
+    def register_statement(self, name, query):
+        pass
+
+    async def fetch_prepared(self, name, params=None, one=False):
+        return (self.generation,)
+
+    async def fetch_all(self, query, params=None):
+        self.builds += 1
+        return list(self.rows)
+
+
+def test_index_is_rebuilt_when_a_new_generation_is_published():
+    db = FakeConnector()
+    search = RegionSearch(db, max_age=0)
+
+    async def run():
+        await search.refresh()
+        assert _names(await search.search("austin")) == []
+        # Unchanged generation: checked again but not rebuilt
+        await search.search("san")
+        assert db.builds == 1
+        db.generation, db.rows = 2, ROWS
+        assert _names(await search.search("austin")) == ["Austin, TX"]
+        assert db.builds == 2 and search.generation == 2
+
+    asyncio.run(run())
@@ -0,0 +1,77 @@
+# test_sampling.py
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sampling import SAMPLE_COLUMNS, STRATA_COLUMNS, ListingSample, exact_aggregate
+
+
+def _listings(n: int, state: str, property_type: str, price: float, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "state": state,
+        "property_type": property_type,
+        "status": rng.choice(["for_sale", "sold"], n),
+        "price": rng.normal(price, price / 10, n),
+        "sqft": rng.integers(500, 3000, n),
+        "beds": 3,
+        "baths": 2.0,
+        "built_year": 1990,
+    })[SAMPLE_COLUMNS]
+
+
+def _sample(populations: dict[tuple[str, str], int], sampled: pd.DataFrame) -> ListingSample:
+    strata = pd.DataFrame(
+        [(state, property_type, n) for (state, property_type), n in populations.items()],
+        columns=STRATA_COLUMNS,
+    )
+    return ListingSample(sampled, strata)
+
+
+def test_fully_sampled_strata_are_exact():
+    rows = pd.concat([_listings(50, "VT", "house", 200_000, 0), _listings(80, "TX", "condo", 300_000, 1)])
+    sample = _sample({("VT", "house"): 50, ("TX", "condo"): 80}, rows)
+
+    counts = sample.aggregate("count", group_by="state").set_index("state")
+    assert counts.loc["TX", "estimate"] == 80 and counts.loc["VT", "estimate"] == 50
+    assert (counts["ci_low"] == counts["ci_high"]).all()
+
+    mean = sample.aggregate("mean", "price").iloc[0]
+    assert mean["estimate"] == pytest.approx(rows["price"].mean())
+    assert mean["ci_high"] - mean["ci_low"] == pytest.approx(0, abs=1e-6)
+
+
+def test_sampled_strata_are_weighted_by_population():
+    # Each stratum sampled at 100 rows; TX stands for ten times as many listings
+    rows = pd.concat([_listings(100, "VT", "house", 100_000, 2), _listings(100, "TX", "house", 400_000, 3)])
+    sample = _sample({("VT", "house"): 1_000, ("TX", "house"): 10_000}, rows)
+
+    count = sample.aggregate("count").iloc[0]
+    assert count["estimated_rows"] == pytest.approx(11_000)
+
+    mean = sample.aggregate("mean", "price").iloc[0]
+    expected = (1_000 * rows["price"][:100].mean() + 10_000 * rows["price"][100:].mean()) / 11_000
+    assert mean["estimate"] == pytest.approx(expected)
+    assert mean["ci_low"] < mean["estimate"] < mean["ci_high"]
+
+
+def test_filters_and_unknown_columns():
+    sample = _sample({("VT", "house"): 40}, _listings(40, "VT", "house", 100_000, 4))
+    sold = sample.aggregate("count", where={"status": "sold", "sqft": (None, 2000)}).iloc[0]
+    assert 0 < sold["estimate"] < 40
+    with pytest.raises(ValueError):
+        sample.aggregate("count", where={"agent": "x"})
+    with pytest.raises(ValueError):
+        sample.aggregate("mode")
+
+
+
+def test_unknown_metric_is_a_value_error_on_both_paths():
+    sample = _sample({("VT", "house"): 40}, _listings(40, "VT", "house", 100_000, 4))
+    with pytest.raises(ValueError):
+        sample.aggregate("mean", metric="lot_size")
+    # Rejected before the query is built, so no connection is needed
+    with pytest.raises(ValueError):
+        asyncio.run(exact_aggregate(None, "mean", metric="lot_size"))
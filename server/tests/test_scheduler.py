@@ -0,0 +1,111 @@
+# test_scheduler.py
+import asyncio
+import sys
+
+import httpx
+import pytest
+
+from scheduler import (
+    BLOCKED, FAILED, SKIPPED, SUCCEEDED, Job, Scheduler, listings_fingerprint, topological_order,
+)
+
+
+def _script(code: str) -> list[str]:
+    return [sys.executable, "-c", code]
+
+
+def _states(status: dict) -> dict[str, str]:
+    return {name: job["state"] for name, job in status["jobs"].items()}
+
+
+def test_topological_order_rejects_cycles():
+    with pytest.raises(ValueError):
+        topological_order([Job("a", [], depends_on=("b",)), Job("b", [], depends_on=("a",))])
+
+
+def test_reruns_only_when_inputs_change(tmp_path):
+    fingerprint = {"value": "v1"}
+
+    async def inputs():
+        return fingerprint["value"]
+
+    # Each run appends a line, so the file counts how often the job ran
+    runs = tmp_path / "runs.txt"
+    append = _script(f"open({str(runs)!r}, 'a').write('x\\n')")
+    jobs = [Job("load", append, inputs=inputs), Job("publish", append, depends_on=("load",))]
+    scheduler = Scheduler(jobs, state_path=tmp_path / "state.json")
+
+    async def cycles():
+        first = _states(await scheduler.run_once())
+        second = _states(await scheduler.run_once())
+        fingerprint["value"] = "v2"
+        third = _states(await scheduler.run_once())
+        return first, second, third
+
+    first, second, third = asyncio.run(cycles())
+    assert first == {"load": SUCCEEDED, "publish": SUCCEEDED}
+    assert second == {"load": SKIPPED, "publish": SKIPPED}
+    assert third == {"load": SUCCEEDED, "publish": SUCCEEDED}
+    assert runs.read_text().count("x") == 4
+
+
+def test_failure_blocks_downstream_until_fixed(tmp_path):
+    jobs = [
+        Job("ingest", _script("import sys; sys.exit(1)")),
+        Job("listings", _script("pass"), depends_on=("ingest",)),
+    ]
+    scheduler = Scheduler(jobs, state_path=tmp_path / "state.json")
+
+    status = asyncio.run(scheduler.run_once())
+    assert _states(status) == {"ingest": FAILED, "listings": BLOCKED}
+
+    # A re-runnable upstream job lets the next cycle recover
+    scheduler.jobs["ingest"].command = _script("pass")
+    assert _states(asyncio.run(scheduler.run_once())) == {"ingest": SUCCEEDED, "listings": SUCCEEDED}
+
+
+def test_listings_fingerprint_follows_the_linked_files(monkeypatch):
+    index = "https://data.example/for-sale/"
+    files = {"https://data.example/tx.csv": "v1", "https://data.example/ca.tsv": "v1"}
+    page = {"html": '<a href="/tx.csv">TX</a> <a href="/about">About</a> <a href="/ca.tsv">CA</a>'}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        if url == index:
+            # The page changes on every view, like a rendered timestamp would
+            return httpx.Response(200, text=page["html"] + f"<p>{id(request)}</p>")
+        assert request.method == "HEAD"
+        return httpx.Response(200, headers={"etag": files[url]})
+
+    class MockClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=httpx.MockTransport(handler), **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", MockClient)
+    fingerprint = listings_fingerprint([index])
+
+    first = asyncio.run(fingerprint())
+    assert asyncio.run(fingerprint()) == first
+    files["https://data.example/ca.tsv"] = "v2"
+    updated = asyncio.run(fingerprint())
+    assert updated != first
+    page["html"] = '<a href="/tx.csv">TX</a>'
+    assert asyncio.run(fingerprint()) not in (first, updated)
+
+
+def test_run_forever_survives_a_failing_cycle(tmp_path, monkeypatch):
+    scheduler = Scheduler([Job("noop", _script("pass"))], state_path=tmp_path / "state.json")
+    cycles = []
+
+    async def run_once():
+        cycles.append(len(cycles))
+        if len(cycles) == 1:
+            raise OSError("state file unwritable")
+        if len(cycles) == 3:
+            raise asyncio.CancelledError
+        return scheduler.status()
+
+    monkeypatch.setattr(scheduler, "run_once", run_once)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(scheduler.run_forever(interval=0))
+    assert len(cycles) == 3
@@ -0,0 +1,115 @@
+# test_series.py
+import gzip
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from payload_cache import build_payloads, region_key
+from series import SeriesTable
+from similarity import SimilarityIndex
+from validation import METRO_SCHEMA, flag_jumps, series_jumps, validate_frame, validate_series
+
+HEADER = "RegionID,SizeRank,RegionName,RegionType,StateName,2020-01-31,2020-02-29,2020-03-31"
+
+
+def test_from_csv_rejects_bad_cells_and_ragged_rows():
+    table = SeriesTable.from_csv([
+        HEADER,
+        "1,0,United States,country,,100,101,102",
+        "2,1,\"Austin, TX\",msa,TX,N/A,200,",
+        "3,2,Short,msa,TX,1,2",
+        "x,3,Bad Id,msa,CA,1,2,3",
+    ])
+    assert list(table.regions.region_ids) == [1, 2]
+    np.testing.assert_array_equal(table.matrix(), [[100, 101, 102], [np.nan, 200, np.nan]])
+    assert [r["reason"] for r in table.rejects] == [
+        "avg_cost invalid",
+        "7 fields, expected 8",
+        "RegionID or SizeRank invalid",
+    ]
+    assert table.rejects[0]["avg_cost"] == "N/A"
+
+
+def test_validate_series_blanks_rejected_cells():
+    table = SeriesTable.from_csv([
+        HEADER,
+        "1,0,A,msa,TX,100,-5,1e20",
+        "0,1,B,msa,TX,1,2,3",
+        "4,2,C,msa,TX,N/A,2,3",
+    ])
+    rejects = validate_series(table)
+    assert rejects["reason"].tolist() == [
+        "avg_cost invalid", "avg_cost invalid",
+        "region_id invalid", "region_id invalid", "region_id invalid",
+        "avg_cost invalid",
+    ]
+    # Every cell left behind passes the long-format rules too
+    valid, long_rejects = validate_frame(table.to_frame(), METRO_SCHEMA)
+    assert long_rejects.empty and len(valid) == table.n_cells() == 3
+
+
+def _random_table(n_regions: int = 60, n_months: int = 72, seed: int = 0) -> SeriesTable:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2015-01-31", periods=n_months, freq="ME").strftime("%Y-%m-%d")
+    lines = ["RegionID,SizeRank,RegionName,StateName," + ",".join(dates)]
+    for i in range(n_regions):
+        levels = 100 * np.cumprod(1 + rng.normal(0.003, 0.01, n_months))
+        levels[rng.random(n_months) < 0.1] = np.nan
+        levels[: rng.integers(0, 20)] = np.nan
+        if i % 5 == 0:
+            levels[rng.integers(30, n_months)] *= 1.6
+        cells = ("" if np.isnan(v) else f"{v:.2f}" for v in levels)
+        lines.append(f"{i + 1},{i},R{i},{'TX' if i % 2 else 'CA'}," + ",".join(cells))
+    return SeriesTable.from_csv(lines)
+
+
+def test_series_jumps_matches_long_format_flags():
+    table = _random_table()
+    frame = table.to_frame()
+    expected = frame.index[flag_jumps(frame, sigma=4)]
+    assert sorted(series_jumps(table, sigma=4).index) == sorted(expected)
+
+
+def test_similarity_from_table_matches_long_format_build():
+    table = _random_table()
+    wide = SimilarityIndex.from_table(table, k=5, window=48)
+    long = SimilarityIndex.build(table.to_frame(), k=5, window=48)
+    np.testing.assert_array_equal(wide.region_ids, long.region_ids)
+    np.testing.assert_array_equal(wide.indices, long.indices)
+
+
+def test_similarity_index_of_fewer_than_two_regions_is_empty():
+    for n in (0, 1):
+        index = SimilarityIndex.from_table(_random_table(n_regions=n), k=5, n_components=4, window=48)
+        assert index.indices.shape == (len(index.region_ids), 0)
+        assert index.rows() == []
+        assert all(index.neighbors(r) == [] for r in index.region_ids)
+
+
+def test_payloads_split_by_year_and_month():
+    table = _random_table(n_regions=3)
+    payloads = build_payloads(table, formats=("json", "arrow"))
+    region = json.loads(gzip.decompress(payloads[(region_key(2), "json")]))
+    row = table.matrix()[1]
+    assert region["region_name"] == "R1" and region["state_name"] == "TX"
+    assert sum(len(y["values"]) for y in region["years"].values()) == np.count_nonzero(~np.isnan(row))
+    assert all(d[5:7] == "01" for d in region["month_of_year"][0]["dates"])
+
+    filters = json.loads(gzip.decompress(payloads[("filters", "json")]))
+    assert filters["states"] == ["CA", "TX"]
+    assert filters["years"][0] == 2020
+
+
+def test_zillow_rows_skip_empty_cells_and_number_from_one():
+    table = SeriesTable.from_csv([
+        HEADER,
+        "1,0,United States,country,,100,,102",
+        "2,1,\"Austin, TX\",msa,TX,,200,",
+    ])
+    assert list(table.zillow_rows()) == [
+        (1, 1, 0, "United States", "", date(2020, 1, 31), 100.0),
+        (2, 1, 0, "United States", "", date(2020, 3, 31), 102.0),
+        (3, 2, 1, "Austin, TX", "TX", date(2020, 2, 29), 200.0),
+    ]
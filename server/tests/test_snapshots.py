@@ -0,0 +1,100 @@
+# test_snapshots.py
+from datetime import date
+
+import pyarrow.dataset as ds
+import pytest
+
+from snapshots import (
+    LISTINGS_DATASET,
+    ZHVI_DATASET,
+    archive_csv_bytes,
+    archive_delimited,
+    diff_snapshots,
+    read_snapshot,
+)
+
+ZHVI_V1 = (
+    "RegionID,SizeRank,RegionName,RegionType,StateName,2024-01-31,2024-02-29\n"
+    "1,0,United States,country,,100,101\n"
+    '2,1,"Austin, TX",msa,TX,200,N/A\n'
+)
+# Next month's file: a revised February value, a new month and a dropped region
+ZHVI_V2 = (
+    "RegionID,SizeRank,RegionName,RegionType,StateName,2024-01-31,2024-02-29,2024-03-31\n"
+    "1,0,United States,country,,100,102,103\n"
+)
+
+
+def test_quoted_header_keeps_leading_zeros_and_bom(tmp_path):
+    source = tmp_path / "listings.csv"
+    source.write_text(
+        '\ufeff"address","zip","price"\n"1 Main St","01234","350000"\n"2 Oak Ave","00501",""\n',
+        encoding="utf-8",
+    )
+    archive_delimited(source, fetch_date=date(2024, 3, 1), root=tmp_path)
+
+    frame = read_snapshot(LISTINGS_DATASET, root=tmp_path)
+    assert list(frame.columns) == ["address", "zip", "price"]
+    assert frame["zip"].tolist() == ["01234", "00501"]
+    assert frame["price"].tolist() == ["350000", ""]
+
+
+def test_raw_zillow_bytes_keep_unparsed_columns_and_cells(tmp_path):
+    archive_csv_bytes(ZHVI_V1.encode(), "Metro_zhvi.csv", fetch_date=date(2024, 3, 1), root=tmp_path)
+
+    frame = read_snapshot(ZHVI_DATASET, root=tmp_path)
+    assert frame["RegionType"].tolist() == ["country", "msa"]
+    assert frame["2024-02-29"].tolist() == ["101", "N/A"]
+
+
+def test_read_snapshot_as_of_and_filters(tmp_path):
+    for fetch_date, body in ((date(2024, 3, 1), ZHVI_V1), (date(2024, 4, 1), ZHVI_V2)):
+        archive_csv_bytes(body.encode(), "Metro_zhvi.csv", fetch_date=fetch_date, root=tmp_path)
+
+    assert "2024-03-31" in read_snapshot(ZHVI_DATASET, root=tmp_path).columns
+    # The latest snapshot fetched on or before the date
+    march = read_snapshot(ZHVI_DATASET, as_of=date(2024, 3, 15), root=tmp_path)
+    assert march["RegionID"].tolist() == ["1", "2"]
+    with pytest.raises(LookupError):
+        read_snapshot(ZHVI_DATASET, as_of=date(2024, 2, 1), root=tmp_path)
+
+    austin = read_snapshot(
+        ZHVI_DATASET, date(2024, 3, 1), ["RegionName"], ds.field("StateName") == "TX", tmp_path
+    )
+    assert austin["RegionName"].tolist() == ["Austin, TX"]
+    listed = read_snapshot(ZHVI_DATASET, date(2024, 3, 1), ["RegionID"], [("RegionID", "=", "1")], tmp_path)
+    assert listed["RegionID"].tolist() == ["1"]
+
+
+def test_diff_snapshots_compares_zillow_months(tmp_path):
+    for fetch_date, body in ((date(2024, 3, 1), ZHVI_V1), (date(2024, 4, 1), ZHVI_V2)):
+        archive_csv_bytes(body.encode(), "Metro_zhvi.csv", fetch_date=fetch_date, root=tmp_path)
+
+    diff = diff_snapshots(ZHVI_DATASET, date(2024, 3, 1), root=tmp_path)
+    changes = {
+        (row.RegionID, row.date): (row.change, row.avg_cost_old, row.avg_cost_new)
+        for row in diff.itertuples()
+    }
+    assert changes[("1", "2024-02-29")] == ("changed", "101", "102")
+    assert changes[("1", "2024-03-31")][0] == "added"
+    assert changes[("2", "2024-01-31")][0] == "removed"
+    assert changes[("2", "2024-02-29")][0] == "removed"
+    assert ("1", "2024-01-31") not in changes
+    assert len(changes) == 4
+
+
+def test_diff_snapshots_compares_listings(tmp_path):
+    header = "address\tcity\tstate\tzip\tprice\tstatus\n"
+    for day, rows in (
+        (1, ["1 Main St\tAustin\tTX\t78701\t350000\tfor_sale", "2 Oak Ave\tAustin\tTX\t78702\t1\tfor_sale"]),
+        (2, ["1 Main St\tAustin\tTX\t78701\t340000\tfor_sale", "3 Elm St\tAustin\tTX\t78703\t5\tsold"]),
+    ):
+        source = tmp_path / f"day{day}.tsv"
+        source.write_text(header + "\n".join(rows) + "\n")
+        archive_delimited(source, fetch_date=date(2024, 3, day), root=tmp_path / "archive")
+
+    diff = diff_snapshots(LISTINGS_DATASET, date(2024, 3, 1), date(2024, 3, 2), root=tmp_path / "archive")
+    assert dict(zip(diff["address"], diff["change"])) == {
+        "1 Main St": "changed", "2 Oak Ave": "removed", "3 Elm St": "added",
+    }
+    assert diff.loc[diff["address"] == "1 Main St", "price_new"].item() == "340000"
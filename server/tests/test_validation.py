@@ -0,0 +1,66 @@
+# test_validation.py
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+
+from listings_merge import row_hash
+from validation import LISTINGS_SCHEMA, METRO_SCHEMA, flag_jumps, frame_to_rows, validate_frame
+
+
+def test_rejects_carry_every_failed_rule():
+    raw = pd.DataFrame({
+        "region_id": ["1", "x", "3"],
+        "size_rank": ["1", "2", ""],
+        "date": ["2020-01-31", "2020-02-29", "bad"],
+        "avg_cost": ["100.5", "2e14", ""],
+    })
+    valid, rejects = validate_frame(raw, METRO_SCHEMA)
+    assert valid.index.tolist() == [0]
+    assert rejects["reason"].tolist() == [
+        "region_id invalid; avg_cost invalid",
+        "size_rank missing; date invalid",
+    ]
+
+
+def test_invalid_null_columns_load_as_null():
+    raw = pd.DataFrame({"address": ["1 Elm St"], "city": ["A"], "state": ["TX"], "zip": ["75001"], "last_change": ["soon"]})
+    valid, rejects = validate_frame(raw, LISTINGS_SCHEMA)
+    assert rejects.empty
+    assert valid["last_change"].iloc[0] is None
+
+
+def test_float_columns_stay_float_when_every_value_is_integral():
+    raw = pd.DataFrame({"address": ["1 Elm St"], "city": ["A"], "state": ["TX"], "zip": ["75001"], "price": ["100000"]})
+    valid, _ = validate_frame(raw, LISTINGS_SCHEMA)
+    assert valid["price"].dtype == "float64"
+    assert valid["sqft"].dtype == "Int64"
+
+
+def test_row_hash_ignores_number_representation():
+    key = ("1 ELM ST", "A", "TX", "75001")
+    rest = ("house", "for_sale")
+    as_int = key + (1000, 3, 2, 1990) + rest + (100000,)
+    as_float = key + (1000.0, 3, 2.0, 1990) + rest + (100000.0,)
+    as_decimal = key + (1000, 3, Decimal("2.0"), 1990) + rest + (Decimal("100000.00"),)
+    assert row_hash(as_int) == row_hash(as_float) == row_hash(as_decimal)
+    assert row_hash(as_int) != row_hash(key + (1000, 3, 2, 1990) + rest + (100001,))
+
+
+def test_hash_is_stable_across_chunks_with_different_dtypes():
+    columns = list(LISTINGS_SCHEMA)
+    base = {"address": "1 Elm St", "city": "A", "state": "TX", "zip": "75001", "last_change": "2024-01-01"}
+    integral = pd.DataFrame([{**base, "price": "250000"}])
+    mixed = pd.DataFrame([{**base, "price": "250000"}, {**base, "address": "2 Elm St", "price": "1.5"}])
+    first = frame_to_rows(validate_frame(integral, LISTINGS_SCHEMA)[0], columns)[0]
+    second = frame_to_rows(validate_frame(mixed, LISTINGS_SCHEMA)[0], columns)[0]
+    assert first[columns.index("last_change")] == date(2024, 1, 1)
+    assert row_hash(first) == row_hash(second)
+
+
+def test_flag_jumps_marks_only_the_outlier():
+    months = pd.date_range("2020-01-31", periods=36, freq="ME")
+    values = [100 + i for i in range(36)]
+    values[30] = 1000
+    df = pd.DataFrame({"region_id": 1, "date": months, "avg_cost": values})
+    assert flag_jumps(df, sigma=4).tolist().count(True) == 1